@@ -1,58 +1,177 @@
-from Belief_base.belief_base import BeliefBase, select_remainders, intersect_selected
+from collections import OrderedDict
+from Belief_base.belief_base import BeliefBase, select_remainders, intersect_selected, LEVELS, BEST
 from Belief_base.formula import Formula, Atom, Not, Or, And
-from Belief_base.entailment import resolution_entails
+from Belief_base.entailment import get_engine, TruthTableEngine, BDDEngine
+from Belief_base.parallel import entails_many
+from Belief_base import metrics
+from Belief_base.budget import RAISE, UNKNOWN_RESULT, BudgetExceeded, check_policy, decide
+from Belief_base.tseitin import DISTRIBUTE
+from Belief_base.truth_table import MAX_ATOMS
 
 class BeliefRevisionAgent:
-    def __init__(self):
-        self.base = BeliefBase()
+    # engine is the entailment procedure used by ask and contraction: "resolution", "cdcl" or "truth_table"
+    # Without an engine, questions with at most truth_table_atoms atoms are answered with truth tables and the rest
+    # with resolution. truth_table_atoms=0 always uses resolution
+    # bdd=True compiles the base into a BDD that ask answers from until the base changes, see BDDEngine. The engine
+    # chosen above handles what the BDD can't (contraction subsets, bases too large to compile)
+    # cnf_mode is passed on to the belief base: "distribute" (default) or "tseitin"
+    # remainder_method is how contraction finds the remainders: "levels" (default) or "mcs", or "best" to search
+    # for the highest priority remainders directly with branch and bound
+    # relevance=True makes ask only look at the beliefs that share atoms with the query
+    # cache_size is the number of ask answers remembered between calls, 0 turns the cache off
+    # workers > 1 lets contraction check the candidate remainders in that many processes
+    # budget limits every entailment check (see Belief_base/budget.py) and on_unknown says how a check that ran out
+    # is answered: "raise" (default), "entailed", "not_entailed" or "unknown" (ask returns UNKNOWN, contraction
+    # can't work with that and raises)
+    def __init__(self, engine=None, cnf_mode=DISTRIBUTE, remainder_method=LEVELS, relevance=False, cache_size=256,
+                 workers=None, budget=None, on_unknown=RAISE, truth_table_atoms=MAX_ATOMS, bdd=False):
+        check_policy(on_unknown)
+        self.base = BeliefBase(cnf_mode)
+        if engine is None and truth_table_atoms:
+            self.engine = TruthTableEngine(max_atoms=truth_table_atoms)
+        else:
+            self.engine = get_engine(engine)
+        if bdd:
+            self.engine = BDDEngine(fallback=self.engine)
+        self.remainder_method = remainder_method
+        self.workers = workers
+        self.budget = budget
+        self.on_unknown = on_unknown
+        self.relevance = relevance
+        # query -> (answer, base version it was computed at), least recently used first
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_base = self.base
+        self.cache_hits = 0
+        self.cache_misses = 0
         
     # Method to ask AI agent if a given belief base entails a query φ
+    # Formulas are interned, so equal queries (also p ∧ q and q ∧ p) are the same key. A cached answer is used if
+    # the base did not change since, or if it was True and the base only grew since (B ⊨ φ implies B ∪ {ψ} ⊨ φ)
     def ask(self,query: Formula) -> bool:
-        return resolution_entails(self.base, query)
+        answer = self._cache_lookup(query)
+        if answer is not None:
+            return answer
+        self.cache_misses += 1
+        try:
+            answer = self.engine.entails(self.base, query, relevance=self.relevance, budget=self.budget)
+        except BudgetExceeded as error:
+            # Not cached, the same question may get a real answer later
+            return decide(self.on_unknown, error)
+        self._cache_store(query, answer)
+        return answer
+    
+    # The cached answer for query if it is still valid, None otherwise
+    def _cache_lookup(self, query):
+        if self._cache_base is not self.base:
+            # The base object was replaced, its version numbers mean nothing to the cache
+            self._cache.clear()
+            self._cache_base = self.base
+        cached = self._cache.get(query)
+        if cached is not None:
+            answer, version = cached
+            if version == self.base.version or (answer and version >= self.base.shrink_version):
+                self._cache.move_to_end(query)
+                self.cache_hits += 1
+                return answer
+        return None
+    
+    def _cache_store(self, query, answer):
+        if self.cache_size > 0:
+            self._cache[query] = (answer, self.base.version)
+            self._cache.move_to_end(query)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    # Answers a list of queries against the current base, in the same order
+    # With workers > 1 the queries that are not in the cache are spread over a process pool (see parallel.py),
+    # the base clauses are built once and sent to each worker process only once
+    def ask_many(self, queries, workers=None):
+        queries = list(queries)
+        if workers is None or workers <= 1:
+            return [self.ask(query) for query in queries]
+        answers = {}
+        missing = []
+        for query in queries:
+            cached = self._cache_lookup(query)
+            if cached is not None:
+                answers[query] = cached
+            elif query not in answers:
+                answers[query] = None
+                missing.append(query)
+        self.cache_misses += len(missing)
+        for query, answer in zip(missing, entails_many(self.base, missing, self.engine, workers, self.budget)):
+            if answer is None:
+                # This query ran out of budget in its worker
+                answers[query] = decide(self.on_unknown, BudgetExceeded("budget of a worker exceeded"))
+                continue
+            answers[query] = answer
+            self._cache_store(query, answer)
+        return [answers[query] for query in queries]
+    
+    # Hit / miss counters of the ask cache, like functools.lru_cache's cache_info
+    def cache_info(self):
+        return {"hits": self.cache_hits, "misses": self.cache_misses,
+                "size": len(self._cache), "max_size": self.cache_size}
     
     # Method to add beliefs to the belief base with a given priority
     
     # Contract partial meet is a method that removves a belief from the belief base whilst still keeping the belief base consistent
+    # With metrics on (see Belief_base/metrics.py) each phase is timed and the sinks get one record per contraction
     def contract_partial_meet(self, formula: Formula):
+        with metrics.operation("contract_partial_meet"):
+            self._contract(formula)
+    
+    def _contract(self, formula: Formula):
+        # Contraction needs yes / no answers, so "unknown" falls back to raising
+        on_unknown = RAISE if self.on_unknown == UNKNOWN_RESULT else self.on_unknown
         
         # Vacuity check: if the belief base doesn't entail the formula, no need to contract
-        if not resolution_entails(self.base, formula):
+        with metrics.timer("contract.vacuity"):
+            try:
+                entailed = self.engine.entails(self.base, formula, budget=self.budget)
+            except BudgetExceeded as error:
+                entailed = decide(on_unknown, error)
+        if not entailed:
             return
         
-        # Compute all maximal subsets of the belief base that do not entail the formula
-        remainders = self.base.compute_remainders(formula)
+        if self.remainder_method == BEST:
+            # Branch and bound goes straight to the remainders select_remainders would pick
+            with metrics.timer("contract.remainders"):
+                selected = self.base.best_remainders(formula, engine=self.engine, budget=self.budget,
+                                                     on_unknown=on_unknown)
+        else:
+            # Compute all maximal subsets of the belief base that do not entail the formula
+            with metrics.timer("contract.remainders"):
+                remainders = self.base.compute_remainders(formula, engine=self.engine, method=self.remainder_method,
+                                                         workers=self.workers, budget=self.budget,
+                                                         on_unknown=on_unknown)
+            
+            with metrics.timer("contract.select"):
+                # Get the priority values in the same order as belief indices
+                priorities = [pri for _, pri in self.base.get_prioritized_beliefs()]
+                
+                # Select the remainders with the highest total priority
+                # If we have remainders = [{0, 1}, {0, 3}] and priorities = [1, 2, 3, 4]
+                # We compute the scores for each remainder: {0, 1} = 1 + 2 = 3 and {0, 3} = 1 + 4 = 5, we return the set with the highest score so {0, 3}
+                # If we have several sets with the same highest score, we return all of them
+                selected = select_remainders(remainders, priorities) if remainders else []
         
         # --- guard against empty remainders ---
-        if not remainders:
+        if not selected:
             # no way to remove formula; clear the base entirely
             self.base.clear()
             return
         
-        # Get the priority values in the same order as belief indices
-        priorities = [pri for _, pri in self.base.get_prioritized_beliefs()]
-        
-        # Select the remainders with the highest total priority
-        # If we have remainders = [{0, 1}, {0, 3}] and priorities = [1, 2, 3, 4]
-        # We compute the scores for each remainder: {0, 1} = 1 + 2 = 3 and {0, 3} = 1 + 4 = 5, we return the set with the highest score so {0, 3}
-        # If we have several sets with the same highest score, we return all of them
-        selected = select_remainders(remainders, priorities)
-        
-        # Intersect the slected remanders. If selected is [{0, 2}, {1, 2}], then the intersection is {2}
-        # If we only have one selected remainder, like {0, 2}, we return {0, 2}
-        keep_indexes = intersect_selected(selected)
-        
-        # Then rebuild KB in place: Keep only the beliefs in the intersection of all remainders
-        all_beliefs = self.base.get_prioritized_beliefs()
-        
-        # Filter the beliefs to keep only those indexes that were found in the intersection
-        new_beliefs = [all_beliefs[i] for i in sorted(keep_indexes)]
-        
-        # Clear the belief base because we want to add the new beliefs that were filtered by the intersection
-        self.base.clear()
-        
-        # Add the new beliefs to the belief base and its priorities
-        for belief, priority in new_beliefs:
-            self.base.add(belief, priority)
+        with metrics.timer("contract.rebuild"):
+            # Intersect the slected remanders. If selected is [{0, 2}, {1, 2}], then the intersection is {2}
+            # If we only have one selected remainder, like {0, 2}, we return {0, 2}
+            keep_indexes = intersect_selected(selected)
+            
+            # Then update KB in place: keep only the beliefs in the intersection of all remainders
+            # The kept beliefs stay as they are (CNF, clauses, index entries, SAT session), the rest is removed in
+            # one pass and the order by priority is already right
+            self.base.retain(keep_indexes)
             
     def expand(self, formula: Formula, priority: int = 0):
         # Fairly simple, we simply add φ (in CNF form) with the given priority.
@@ -62,8 +181,11 @@ class BeliefRevisionAgent:
 
     def revise(self, formula: Formula):
         # K * φ = (K - ¬φ) ∪ {φ} THIS IS CALLED THE LEVI IDENTITY
-        self.contract_partial_meet(Not(formula))
-        self.expand(formula)
+        with metrics.operation("revise"):
+            with metrics.timer("revise.contract"):
+                self.contract_partial_meet(Not(formula))
+            with metrics.timer("revise.expand"):
+                self.expand(formula)
         
 if __name__ == "__main__":
     import os
@@ -0,0 +1,231 @@
+import sys
+from typing import Dict, Iterable, List, Tuple
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+
+"""
+Reduced ordered binary decision diagrams (BDDs).
+
+A BDD node tests one atom and has a low child (the atom is false) and a high child (the atom is true), the leaves
+are FALSE (0) and TRUE (1). Atoms are always tested in the same order from the root down, and two rules keep the
+diagram reduced:
+
+    no node has low == high              the test would not matter, the child is used instead
+    no two nodes have the same (atom, low, high)     the unique table hands out the existing node
+
+With both rules every formula has exactly one node for a given order, so equivalent formulas get the same node
+and "is this a tautology" is "is this node TRUE". Example with the order p, q, for p → q:
+
+    p ── high ──> q ── high ──> TRUE
+    │             └─── low ───> FALSE
+    └─── low ───> TRUE
+
+The size depends a lot on the order, atoms that appear together should be close to each other (variable_order).
+Building can still blow up, so the manager stops with BDDTooLarge once it holds node_budget nodes.
+"""
+
+FALSE = 0
+TRUE = 1
+# Level of the two leaves, below every atom
+_LEAF = sys.maxsize
+
+# Operations for BDD.apply
+AND = "and"
+OR = "or"
+XOR = "xor"
+
+
+class BDDTooLarge(Exception):
+    """The diagram needs more nodes than the budget allows."""
+
+
+# Atoms in the order they are first met in a depth first walk over the formulas, the atoms of one formula end up
+# next to each other. For [p → q, r ∧ p] the order is p, q, r
+def variable_order(formulas: Iterable[Formula]) -> List[str]:
+    order = {}
+    seen = set()
+    for formula in formulas:
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if isinstance(node, Atom):
+                order.setdefault(node.name, None)
+            else:
+                # Reversed so the children are visited left to right
+                stack.extend(reversed(node.children()))
+    return list(order)
+
+
+class BDD:
+    """
+    A manager that owns every node: the unique table and the computed table (cache of apply results) are shared
+    by all diagrams built with it. Nodes are ints, 0 and 1 are the leaves.
+    """
+    def __init__(self, order: Iterable[str] = (), node_budget: int = None):
+        self.node_budget = node_budget
+        # atom name -> level, 0 is tested first
+        self.levels: Dict[str, int] = {}
+        self.names: List[str] = []
+        # Node n tests the atom at level[n] and continues with low[n] or high[n]
+        self.level: List[int] = [_LEAF, _LEAF]
+        self.low: List[int] = [FALSE, TRUE]
+        self.high: List[int] = [FALSE, TRUE]
+        # (level, low, high) -> node
+        self.unique: Dict[Tuple[int, int, int], int] = {}
+        # (operation, u, v) -> result of apply, and node -> its negation
+        self.computed: Dict[Tuple[str, int, int], int] = {}
+        self._negated: Dict[int, int] = {}
+        # (u, v) -> does u imply v
+        self._implied: Dict[Tuple[int, int], bool] = {}
+        for name in order:
+            self.atom_level(name)
+
+    def __len__(self):
+        # Number of nodes, the leaves included
+        return len(self.level)
+
+    # Number of nodes in the diagram of u, leaves included
+    def size(self, u: int) -> int:
+        seen = {u}
+        stack = [u]
+        while stack:
+            n = stack.pop()
+            if n > TRUE:
+                for child in (self.low[n], self.high[n]):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+        return len(seen)
+
+    # Level of an atom. An atom that is new to the manager goes below all others, so existing nodes stay valid
+    def atom_level(self, name: str) -> int:
+        level = self.levels.get(name)
+        if level is None:
+            level = len(self.names)
+            self.levels[name] = level
+            self.names.append(name)
+        return level
+
+    # The node (level, low, high), following both reduction rules
+    def node(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        found = self.unique.get(key)
+        if found is not None:
+            return found
+        if self.node_budget is not None and len(self.level) >= self.node_budget:
+            raise BDDTooLarge(f"more than {self.node_budget} BDD nodes")
+        found = len(self.level)
+        self.level.append(level)
+        self.low.append(low)
+        self.high.append(high)
+        self.unique[key] = found
+        return found
+
+    def variable(self, name: str) -> int:
+        return self.node(self.atom_level(name), FALSE, TRUE)
+
+    def negate(self, u: int) -> int:
+        if u <= TRUE:
+            return TRUE - u
+        result = self._negated.get(u)
+        if result is None:
+            result = self.node(self.level[u], self.negate(self.low[u]), self.negate(self.high[u]))
+            self._negated[u] = result
+            self._negated[result] = u
+        return result
+
+    # Combines two diagrams with AND, OR or XOR. Both are split on the atom that comes first, the halves are
+    # combined recursively, so the recursion is at most as deep as the number of atoms
+    def apply(self, op: str, u: int, v: int) -> int:
+        # The cases that need no splitting
+        if op == AND:
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            if v == TRUE:
+                return u
+        elif op == OR:
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            if v == FALSE:
+                return u
+        else:
+            if u == v:
+                return FALSE
+            if u == FALSE:
+                return v
+            if v == FALSE:
+                return u
+            if u == TRUE:
+                return self.negate(v)
+            if v == TRUE:
+                return self.negate(u)
+        # All three operations are commutative, so (u, v) and (v, u) share a cache entry
+        if u > v:
+            u, v = v, u
+        key = (op, u, v)
+        result = self.computed.get(key)
+        if result is not None:
+            return result
+        level = min(self.level[u], self.level[v])
+        u_low, u_high = (self.low[u], self.high[u]) if self.level[u] == level else (u, u)
+        v_low, v_high = (self.low[v], self.high[v]) if self.level[v] == level else (v, v)
+        result = self.node(level, self.apply(op, u_low, v_low), self.apply(op, u_high, v_high))
+        self.computed[key] = result
+        return result
+
+    # Is every model of u also a model of v? Nothing is built, so this can't run out of nodes
+    def implies(self, u: int, v: int) -> bool:
+        if u == FALSE or v == TRUE or u == v:
+            return True
+        if u == TRUE or v == FALSE:
+            return False
+        key = (u, v)
+        result = self._implied.get(key)
+        if result is None:
+            level = min(self.level[u], self.level[v])
+            u_low, u_high = (self.low[u], self.high[u]) if self.level[u] == level else (u, u)
+            v_low, v_high = (self.low[v], self.high[v]) if self.level[v] == level else (v, v)
+            result = self.implies(u_low, v_low) and self.implies(u_high, v_high)
+            self._implied[key] = result
+        return result
+
+    # The diagram of a formula. Subformulas are built once each, children before parents, without recursion
+    # over the formula (parsed formulas can be nested far deeper than the recursion limit)
+    def build(self, formula: Formula) -> int:
+        built: Dict[Formula, int] = {}
+        stack = [(formula, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if node in built:
+                continue
+            if isinstance(node, Atom):
+                built[node] = self.variable(node.name)
+                continue
+            children = node.children()
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if child not in built)
+                continue
+            if isinstance(node, Not):
+                result = self.negate(built[node.formula])
+            elif isinstance(node, (And, Or)):
+                op = AND if isinstance(node, And) else OR
+                result = TRUE if op == AND else FALSE
+                for child in node.formulas:
+                    result = self.apply(op, result, built[child])
+            elif isinstance(node, Implies):
+                result = self.apply(OR, self.negate(built[node.premise]), built[node.conclusion])
+            elif isinstance(node, Equiv):
+                result = self.negate(self.apply(XOR, built[node.left], built[node.right]))
+            else:
+                raise ValueError(f"Unsupported formula: {node}")
+            built[node] = result
+        return built[formula]
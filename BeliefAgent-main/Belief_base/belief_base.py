@@ -1,26 +1,143 @@
 from Belief_base.formula import Formula
 from itertools import combinations
-from Belief_base.entailment import resolution_entails
+from collections import OrderedDict, defaultdict
+from Belief_base.entailment import get_engine, formula_int_clauses, negated_query_clauses
+from Belief_base.tseitin import CNF_MODES, DISTRIBUTE
+from Belief_base.session import SolverSession
+from Belief_base.parallel import subset_pool, map_subsets
+from Belief_base.symbols import SymbolTable, is_int_tautology
+from Belief_base.subsumption import ClauseIndex, remove_subsumed
+from Belief_base import metrics
+from Belief_base.budget import RAISE, BudgetExceeded, check_policy, decide
 from functools import reduce
 from operator import and_
 
+# How compute_remainders searches: "levels" tries the subsets of each size from big to small,
+# "mcs" enumerates the maximal consistent subsets with the SAT session
+LEVELS = "levels"
+MCS = "mcs"
+REMAINDER_METHODS = (LEVELS, MCS)
+# Contraction can also skip the full list and search for the highest priority remainders directly, see best_remainders
+BEST = "best"
+
 class BeliefBase:
     """
     A belief base that stores propositional formulas with priorities.
     Higher priority values mean the belief is more important.
     """
-    def __init__(self):
+    # cnf_mode decides how beliefs become clauses: "distribute" stores each belief in CNF (the default),
+    # "tseitin" stores the belief as written and encodes it with auxiliary atoms when clauses are needed
+    def __init__(self, cnf_mode=DISTRIBUTE):
+        if cnf_mode not in CNF_MODES:
+            raise ValueError(f"Unknown CNF mode: {cnf_mode}")
+        self.cnf_mode = cnf_mode
         # List of (formula, priority) pairs
         self.beliefs = []
+        # Stable id of each belief, in the same order as self.beliefs. Indexes move when beliefs are added or
+        # removed, the ids don't, so anything cached per belief is keyed by id
+        self._ids = []
+        self._next_id = 0
+        # Atom numbering shared by everything that works on this base's integer clauses
+        self.symbols = SymbolTable()
+        # belief id -> the clauses of that belief, extracted once when it is added
+        self._clauses = {}
+        # Clauses of recently asked negated queries, a contraction asks about the same φ for every subset
+        self._query_clauses = OrderedDict()
+        # atom number -> ids of the beliefs whose clauses mention it, used to find the beliefs relevant to a query
+        # None means it has not been built yet (a base loaded from a snapshot builds it when it is first needed)
+        self._atom_index = defaultdict(set)
+        # Cached answer to "is the base consistent?", None when it has to be checked again
+        self._consistent = True
+        # Incremental SAT session, built the first time it is needed
+        self._session = None
+        # version goes up on every change. shrink_version is the version of the last change that took beliefs
+        # away, anything entailed at a version >= shrink_version is still entailed now (adding beliefs is monotone)
+        self.version = 0
+        self.shrink_version = 0
     
     def add(self, formula, priority=0):
         """Add a belief with the given priority."""
-        # Convert formula to CNF for more efficient entailment checking later
-        cnf_formula = formula.to_cnf()
+        cnf_formula = self._convert(formula)
+        belief_id = self._store(cnf_formula)
+        # Keep the beliefs sorted by priority (descending): the new belief goes after every belief with the same
+        # or a higher priority, exactly where appending and re-sorting with a stable sort would put it
+        pos = len(self.beliefs)
+        while pos > 0 and self.beliefs[pos - 1][1] < priority:
+            pos -= 1
         # Add the cnf_formula and its priority to the belief base
-        self.beliefs.append((cnf_formula, priority))
-        # Sort beliefs by priority (descending)
-        self.beliefs.sort(key=lambda x: x[1], reverse=True)
+        self.beliefs.insert(pos, (cnf_formula, priority))
+        self._ids.insert(pos, belief_id)
+        self.version += 1
+    
+    # Number of items add_many reads and converts before it stores them
+    BATCH_SIZE = 1024
+    
+    def add_many(self, items):
+        """
+        Add every (formula, priority) pair from an iterable, for example parser.iter_file(path).
+        The items are read and converted to CNF BATCH_SIZE at a time and the beliefs are sorted once at the end,
+        which gives the same order as calling add for each item. Returns the number of beliefs added.
+        If the iterable raises partway through (a ParseError from iter_file for example), every item read before
+        that is still added, sorted and counted in the version before the error goes on to the caller.
+        """
+        iterator = iter(items)
+        added = 0
+        try:
+            while True:
+                batch = []
+                try:
+                    for item in iterator:
+                        batch.append(item)
+                        if len(batch) == self.BATCH_SIZE:
+                            break
+                finally:
+                    added += self._store_batch(batch)
+                if len(batch) < self.BATCH_SIZE:
+                    break
+        finally:
+            if added:
+                # sorted is stable, so equal priorities keep the order they were added in
+                order = sorted(range(len(self.beliefs)), key=lambda i: -self.beliefs[i][1])
+                self.beliefs = [self.beliefs[i] for i in order]
+                self._ids = [self._ids[i] for i in order]
+                self.version += 1
+        return added
+    
+    # Converts a batch of (formula, priority) pairs and appends them, unsorted. All formulas are converted before
+    # anything is stored, so a formula that can't be converted leaves the whole batch out
+    def _store_batch(self, batch):
+        converted = [(self._convert(formula), priority) for formula, priority in batch]
+        for cnf_formula, priority in converted:
+            self.beliefs.append((cnf_formula, priority))
+            self._ids.append(self._store(cnf_formula))
+        return len(converted)
+    
+    # The formula that is stored for a belief
+    # Convert formula to CNF for more efficient entailment checking later
+    # In Tseitin mode the distribution would be the exponential part, so the formula is kept as it is
+    def _convert(self, formula):
+        return formula.to_cnf() if self.cnf_mode == DISTRIBUTE else formula
+    
+    # Records the clauses of a converted belief (see _convert), the caller puts it in self.beliefs at the right place
+    # Returns the new belief id
+    def _store(self, cnf_formula):
+        belief_id = self._next_id
+        self._next_id += 1
+        # Extract the clauses once, tautologies are dropped because they would break the refutation
+        # Clauses subsumed by another clause of the same belief are dropped too: (p ∧ q) ∨ p gives (p) and (p ∨ q),
+        # and (p) alone has the same models
+        clauses = formula_int_clauses(cnf_formula, self.symbols, self.cnf_mode)
+        self._clauses[belief_id] = remove_subsumed(c for c in clauses if not is_int_tautology(c))
+        if self._atom_index is not None:
+            for clause in self._clauses[belief_id]:
+                for lit in clause:
+                    self._atom_index[abs(lit)].add(belief_id)
+        # Adding a belief can make a consistent base inconsistent, but never the other way around
+        if self._consistent:
+            self._consistent = None
+        if self._session is not None:
+            self._session.add_belief(belief_id, self._clauses[belief_id])
+        return belief_id
     
     def get_beliefs(self):
         """Get all beliefs in the belief base without priorities."""
@@ -35,18 +152,174 @@ class BeliefBase:
         return "\n".join([f"{priority}: {formula}" for formula, priority in self.beliefs])
     
     # Update the beliefs list by removing any entry where the stored formula f in the existing list is equal to formula passed as an argument
-    # f != formula calls f.__eq__(formula) from the relevant formula class Atom, Not, Or etc
+    # Formulas are interned, so f != formula is just an identity check
     def remove(self, formula):
         """Remove a belief from the belief base."""
-        self.beliefs = [(f, p) for f, p in self.beliefs if f != formula]
+        return self.retain(i for i, (belief, _) in enumerate(self.beliefs) if belief != formula)
+    
+    # Keeps only the beliefs at the given indexes and removes the rest in one pass over the base
+    # The kept beliefs keep their ids, stored formulas and clauses, their place in the SAT session and their entries
+    # in the atom index, nothing is converted again and the priority order doesn't have to be restored
+    # Returns the removal delta: (belief id, formula, priority) of every removed belief, in base order, so anything
+    # that keeps its own per-belief data can drop exactly those entries
+    # Example: with beliefs [p (3), q (2), r (1)] retain([0, 2]) leaves [p, r] and returns [(id of q, q, 2)]
+    def retain(self, indexes):
+        """Keep only the beliefs at the given indexes."""
+        keep = set(indexes)
+        kept_beliefs, kept_ids, removed = [], [], []
+        for i, (belief, belief_id) in enumerate(zip(self.beliefs, self._ids)):
+            if i in keep:
+                kept_beliefs.append(belief)
+                kept_ids.append(belief_id)
+                continue
+            removed.append((belief_id,) + belief)
+            clauses = self._clauses.pop(belief_id)
+            if self._atom_index is not None:
+                for clause in clauses:
+                    for lit in clause:
+                        self._atom_index[abs(lit)].discard(belief_id)
+            if self._session is not None:
+                # Switch the belief off in the SAT session too
+                self._session.remove_belief(belief_id)
+        if removed:
+            # Removing beliefs can only make an inconsistent base consistent
+            if self._consistent is False:
+                self._consistent = None
+            self.version += 1
+            self.shrink_version = self.version
+        self.beliefs, self._ids = kept_beliefs, kept_ids
+        return removed
     
     def clear(self):
         """Remove all beliefs from the belief base."""
         self.beliefs = []
+        self._ids = []
+        self._clauses = {}
+        self._atom_index = defaultdict(set)
+        self._consistent = True
+        self._session = None
+        # The version keeps counting, so answers cached for the old contents can never match again
+        self.version += 1
+        self.shrink_version = self.version
+    
+    # The incremental SAT session over all current beliefs, see session.py
+    @property
+    def session(self) -> SolverSession:
+        if self._session is None:
+            self._session = SolverSession(self.symbols, self.cnf_mode)
+            for belief_id in self._ids:
+                self._session.add_belief(belief_id, self._clauses[belief_id])
+        return self._session
+    
+    # Stable ids of the beliefs at the given indexes
+    def ids_of(self, indexes):
+        return [self._ids[i] for i in indexes]
+    
+    # All stored clauses of the beliefs at the given indexes (every belief by default)
+    # Example: with beliefs [p → q, p] clauses_of() gives [(-1, 2), (1,)] and clauses_of([1]) gives [(1,)]
+    def clauses_of(self, indexes=None):
+        ids = self._ids if indexes is None else self.ids_of(indexes)
+        clauses = []
+        for belief_id in ids:
+            clauses.extend(self._clauses[belief_id])
+        return clauses
+    
+    # Indexes of the beliefs connected to the query: the beliefs that share an atom with the query, the beliefs that
+    # share an atom with those, and so on. Example: with beliefs [p → q, q → r, s] the query r gives [0, 1]
+    def relevant_indexes(self, query):
+        if self._atom_index is None:
+            self._atom_index = defaultdict(set)
+            for belief_id in self._ids:
+                for clause in self._clauses[belief_id]:
+                    for lit in clause:
+                        self._atom_index[abs(lit)].add(belief_id)
+        atoms = {abs(lit) for clause in self.query_clauses(query) for lit in clause}
+        seen_atoms = set(atoms)
+        relevant = set()
+        while atoms:
+            atom = atoms.pop()
+            for belief_id in self._atom_index.get(atom, ()):
+                if belief_id in relevant:
+                    continue
+                relevant.add(belief_id)
+                for clause in self._clauses[belief_id]:
+                    for lit in clause:
+                        if abs(lit) not in seen_atoms:
+                            seen_atoms.add(abs(lit))
+                            atoms.add(abs(lit))
+        return [i for i, belief_id in enumerate(self._ids) if belief_id in relevant]
+    
+    # Indexes of the beliefs that say nothing beyond the beliefs of higher or equal priority: every clause of such a
+    # belief is subsumed by a clause of one of them. Example: with beliefs [(p, 3), (p ∨ q, 1), (q → q, 0)] this
+    # gives [1, 2] (a tautology has no clauses, so it is always redundant)
+    # Beliefs that subsume each other, like two copies of p with the same priority, are not both reported: the one
+    # that comes first in the base is reported and the other one stays
+    def redundant_indexes(self):
+        redundant = []
+        # Clauses of the beliefs that can still make others redundant: clause -> ids of the beliefs that have it
+        owners = defaultdict(set)
+        index = ClauseIndex()
+        n = len(self.beliefs)
+        start = 0
+        while start < n:
+            # The group of beliefs with the same priority, they can make each other redundant
+            end = start
+            while end < n and self.beliefs[end][1] == self.beliefs[start][1]:
+                for clause in self._clauses[self._ids[end]]:
+                    owners[clause].add(self._ids[end])
+                    index.add(clause)
+                end += 1
+            for i in range(start, end):
+                belief_id = self._ids[i]
+                if all(any(owners[other] - {belief_id} for other in index.subsuming(clause))
+                       for clause in self._clauses[belief_id]):
+                    redundant.append(i)
+                    # A reported belief can't vouch for another one
+                    for clause in self._clauses[belief_id]:
+                        owners[clause].discard(belief_id)
+                        if not owners[clause]:
+                            index.remove(clause)
+            start = end
+        return redundant
+
+    # Is the base consistent? The answer is cached until a change can affect it
+    def is_consistent(self, engine=None, budget=None):
+        if self._consistent is None:
+            self._consistent = get_engine(engine).consistent(self, budget)
+        return self._consistent
+    
+    # Clauses of ¬query in this base's symbol table, cnf_mode defaults to the mode of the base
+    # Tseitin query clauses use scratch atoms past the end of the symbol table, a new atom can take such a number,
+    # so an entry is only used while the table has the size it was encoded with
+    def query_clauses(self, query, cnf_mode=None):
+        key = (query, cnf_mode or self.cnf_mode)
+        entry = self._query_clauses.get(key)
+        if entry is None or entry[1] != len(self.symbols):
+            clauses = negated_query_clauses(query, self.symbols, key[1])
+            self._query_clauses[key] = (clauses, len(self.symbols))
+            if len(self._query_clauses) > 32:
+                self._query_clauses.popitem(last=False)
+            return clauses
+        self._query_clauses.move_to_end(key)
+        return entry[0]
         
     # Computes all maximal subsets of the current belief base that do not entail formula phi
     # These subsets are the remainders and we need these for the partial meet contraction
-    def compute_remainders(self, phi: Formula):
+    # engine selects the entailment procedure by name ("resolution", "cdcl") or as an EntailmentEngine object
+    # method selects the search, see LEVELS and MCS above. "mcs" always uses the SAT session of this base
+    # workers > 1 checks the subsets of each level in that many processes (LEVELS only), the result is the same
+    # budget limits every single entailment check (see budget.py). A check that runs out is treated as entailed or
+    # not entailed depending on on_unknown, or raises BudgetExceeded (the default, and always with "mcs")
+    def compute_remainders(self, phi: Formula, engine=None, method=LEVELS, workers=None, budget=None,
+                           on_unknown=RAISE):
+        if method not in REMAINDER_METHODS:
+            raise ValueError(f"Unknown remainder method: {method}")
+        check_policy(on_unknown, allow_unknown=False)
+        if method == MCS:
+            return self._remainders_by_mcs(phi, budget)
+        engine = get_engine(engine)
+        if workers is not None and workers > 1:
+            return self._remainders_in_parallel(phi, engine, workers, budget, on_unknown)
         # Retrieve the belief base and its priorities in each element
         beliefs = self.get_prioritized_beliefs()
         # Get the number of beliefs in the belief base
@@ -63,17 +336,15 @@ class BeliefBase:
                 # THIS AVOIDS DUPLICATE REMAINDERS
                 # Example: If {0,1,2} already is a remainder, so we don't need to bother testing {0,1} or {1,2}
                 if any(set(indexes).issubset(rem) for rem in remainders):
+                    if metrics.ENABLED:
+                        metrics.count("remainders.pruned")
                     continue
+                if metrics.ENABLED:
+                    metrics.count("remainders.tested")
                 
-                # Create a temporary belief base from the subset
-                temp = BeliefBase()
-                # Add the beliefs in the current subset to the temporary belief base
-                for i in indexes:
-                    belief, pri = beliefs[i]
-                    temp.add(belief, priority=pri)
-
-                # Check if the temporary belief base entails phi
-                if not resolution_entails(temp, phi):
+                # Check if the beliefs in the current subset entail phi. The engines combine the clauses stored with
+                # those beliefs, the CDCL engine answers it in the incremental session of this base
+                if not self._entails_within(engine, indexes, phi, budget, on_unknown):
                     remainders.append(set(indexes))
             # If we found at least one remainder of size k, we can stop looking for smaller subsets
             if remainders:
@@ -81,6 +352,106 @@ class BeliefBase:
 
         return remainders
 
+    # The LEVELS search with the entailment checks of each level spread over a process pool (see parallel.py)
+    # The candidates of a level are pruned and sent off together, the answers come back in the order of
+    # combinations(), so the remainders are found in the same order as in the serial loop
+    def _remainders_in_parallel(self, phi: Formula, engine, workers, budget=None, on_unknown=RAISE):
+        n = len(self.beliefs)
+        remainders = []
+        with subset_pool(self, phi, engine, workers, budget) as pool:
+            for k in range(n, 0, -1):
+                if budget is not None:
+                    # The workers can't see the cancellation token, so it is checked here between the levels
+                    budget.start().check()
+                candidates = [indexes for indexes in combinations(range(n), k)
+                              if not any(set(indexes).issubset(rem) for rem in remainders)]
+                if metrics.ENABLED:
+                    metrics.count("remainders.tested", len(candidates))
+                for indexes, entailed in zip(candidates, map_subsets(pool, candidates, workers)):
+                    if entailed is None:
+                        # The worker ran out of budget on this subset
+                        entailed = decide(on_unknown, BudgetExceeded("budget of a worker exceeded"))
+                    if not entailed:
+                        remainders.append(set(indexes))
+                if remainders:
+                    break
+        return remainders
+
+    # Same result as the LEVELS search, but found by enumerating the maximal subsets that are consistent with ¬phi
+    # (the complements of the minimal correction subsets). Like LEVELS we only return the biggest ones, as sorted
+    # index sets, and an empty remainder is not reported
+    def _remainders_by_mcs(self, phi: Formula, budget=None):
+        index_of = {belief_id: i for i, belief_id in enumerate(self._ids)}
+        found = [sorted(index_of[i] for i in ids) for ids in self.session.maximal_satisfiable_subsets(phi, budget)]
+        found = [indexes for indexes in found if indexes]
+        if not found:
+            return []
+        largest = max(len(indexes) for indexes in found)
+        return [set(indexes) for indexes in sorted(found) if len(indexes) == largest]
+
+    # The remainders that select_remainders(compute_remainders(phi), priorities) would pick, found with a
+    # branch and bound search instead of listing every remainder first.
+    #
+    # compute_remainders keeps the biggest remainders and select_remainders the ones with the highest priority sum
+    # among those, so a subset is scored by (size, priority sum) and compared lexicographically. The search walks
+    # the beliefs in the order they are stored (highest priority first) and decides for each one: keep it, if the
+    # kept beliefs still do not entail phi, or leave it out. A branch is dropped when even keeping every remaining
+    # belief could not reach the best score found so far. Example: with priorities [3, 2, 1] and the first leaf
+    # {0, 2} (size 2, sum 4), the branch that left out 0 and 1 can reach at most size 1 and is never explored.
+    # budget and on_unknown work as in compute_remainders
+    def best_remainders(self, phi: Formula, engine=None, budget=None, on_unknown=RAISE):
+        check_policy(on_unknown, allow_unknown=False)
+        engine = get_engine(engine)
+        priorities = [priority for _, priority in self.beliefs]
+        n = len(priorities)
+        # rest[i] is the sum of the priorities from belief i to the end
+        rest = [0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            rest[i] = rest[i + 1] + priorities[i]
+        best = (1, None)  # best (size, priority sum) so far, empty remainders are never reported
+        found = []
+        kept = []
+        # Depth first without recursion, a base can have more beliefs than the recursion limit. An entry (i, score)
+        # decides belief i given the beliefs in kept, None takes the last kept belief out again. The branch that
+        # keeps belief i is explored before the branch that drops it
+        stack = [(0, 0)]
+        while stack:
+            entry = stack.pop()
+            if entry is None:
+                kept.pop()
+                continue
+            i, score = entry
+            # Optimistic bound: everything that is left is kept
+            size_bound = len(kept) + n - i
+            if size_bound < best[0]:
+                continue
+            if size_bound == best[0] and best[1] is not None and score + rest[i] < best[1]:
+                continue
+            if i == n:
+                if best[1] is None or (len(kept), score) > best:
+                    best = (len(kept), score)
+                    found.clear()
+                found.append(set(kept))
+                continue
+            stack.append((i + 1, score))
+            kept.append(i)
+            # If the kept beliefs entail phi then so does every superset, so that branch is dead
+            if self._entails_within(engine, kept, phi, budget, on_unknown):
+                kept.pop()
+            else:
+                stack.append(None)
+                stack.append((i + 1, score + priorities[i]))
+        return sorted(found, key=sorted)
+
+    # engine.entails_subset under a budget, a check that runs out is answered by the on_unknown policy
+    def _entails_within(self, engine, indexes, phi, budget, on_unknown):
+        if budget is None:
+            return engine.entails_subset(self, indexes, phi)
+        try:
+            return engine.entails_subset(self, indexes, phi, budget)
+        except BudgetExceeded as error:
+            return decide(on_unknown, error)
+
 # We take the remainders and sum up the priority values and return the set with the highest score
 # If we have several sets with the same highest score, we return all of them
 def select_remainders(remainders: list[set[int]], priorities: list[int]) -> list[set[int]]:
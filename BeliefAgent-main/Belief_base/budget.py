@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+
+"""
+Per-call resource limits for the entailment checks.
+
+A Budget says how much one check may use: wall time, number of generated clauses (resolvents for resolution,
+learned clauses for CDCL) and an estimate of the memory held by those clauses. It can also carry a
+CancellationToken that another thread sets to stop the work. Every check starts its own clock, so the limits apply
+to each entailment call separately:
+
+    budget = Budget(seconds=2, max_clauses=100_000)
+    resolution_entails(kb, query, budget=budget)    # raises BudgetExceeded if the check needs more
+
+The engines raise BudgetExceeded. The callers that have to turn that into an answer (ask, compute_remainders,
+contract_partial_meet) take an on_unknown policy:
+
+    "raise"          let BudgetExceeded through (the default)
+    "entailed"       act as if the query were entailed, the conservative choice for contraction
+    "not_entailed"   act as if it were not entailed
+    "unknown"        return UNKNOWN, only for ask because the other callers need a yes / no answer
+"""
+
+RAISE = "raise"
+ENTAILED = "entailed"
+NOT_ENTAILED = "not_entailed"
+UNKNOWN_RESULT = "unknown"
+ON_UNKNOWN = (RAISE, ENTAILED, NOT_ENTAILED, UNKNOWN_RESULT)
+
+# Rough size of the bookkeeping for one stored clause (set entry, heap entry, index lists) next to the tuple itself
+CLAUSE_OVERHEAD_BYTES = 100
+
+
+class BudgetExceeded(Exception):
+    """An entailment check ran out of its budget or was cancelled. reason says which limit was hit."""
+    def __init__(self, reason: str):
+        super().__init__(f"entailment check stopped: {reason}")
+        self.reason = reason
+
+
+class _Unknown:
+    """The answer of a check that was stopped. It is neither True nor False, so using it as a bool is an error."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNKNOWN"
+
+    def __bool__(self):
+        raise TypeError("UNKNOWN is neither True nor False, compare with `is UNKNOWN` first")
+
+    def __reduce__(self):
+        return "UNKNOWN"
+
+UNKNOWN = _Unknown()
+
+
+class CancellationToken:
+    """Shared flag to stop running checks from another thread, they notice it at their next step."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class Budget:
+    """Limits for one entailment check, None means no limit."""
+    def __init__(self, seconds=None, max_clauses=None, max_memory=None, token=None):
+        self.seconds = seconds
+        self.max_clauses = max_clauses
+        self.max_memory = max_memory
+        self.token = token
+
+    # The token only works inside this process, a copy sent to a worker process keeps the other limits
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["token"] = None
+        return state
+
+    def start(self) -> "Meter":
+        """Starts the clock for one check."""
+        return Meter(self)
+
+
+class Meter:
+    """What one running check has used so far, compared against its Budget."""
+    __slots__ = ("budget", "deadline", "clauses", "memory")
+
+    def __init__(self, budget: Budget):
+        self.budget = budget
+        self.deadline = None if budget.seconds is None else time.monotonic() + budget.seconds
+        self.clauses = 0
+        self.memory = 0
+
+    # Called for every clause the check generates and keeps
+    def add(self, clause):
+        self.clauses += 1
+        self.memory += sys.getsizeof(clause) + CLAUSE_OVERHEAD_BYTES
+        budget = self.budget
+        if budget.max_clauses is not None and self.clauses > budget.max_clauses:
+            raise BudgetExceeded(f"more than {budget.max_clauses} clauses generated")
+        if budget.max_memory is not None and self.memory > budget.max_memory:
+            raise BudgetExceeded(f"more than {budget.max_memory} bytes of clauses")
+
+    # Called once per step of the main loop
+    def check(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded(f"time limit of {self.budget.seconds}s reached")
+        token = self.budget.token
+        if token is not None and token.cancelled:
+            raise BudgetExceeded("cancelled")
+
+
+# Rejects unknown policies. allow_unknown=False is for callers that need a yes / no answer
+def check_policy(on_unknown: str, allow_unknown: bool = True):
+    if on_unknown not in ON_UNKNOWN or (on_unknown == UNKNOWN_RESULT and not allow_unknown):
+        raise ValueError(f"Unsupported on_unknown policy: {on_unknown}")
+
+# The answer a caller uses when a check was stopped, following its on_unknown policy
+def decide(on_unknown: str, error: BudgetExceeded):
+    if on_unknown == ENTAILED:
+        return True
+    if on_unknown == NOT_ENTAILED:
+        return False
+    if on_unknown == UNKNOWN_RESULT:
+        return UNKNOWN
+    raise error
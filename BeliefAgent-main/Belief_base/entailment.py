@@ -1,7 +1,18 @@
-from typing import List, Set, Tuple
+import sys
+from typing import Dict, List, Optional, Set, Tuple
 from Belief_base.formula import Formula, And, Or, Not, Atom
+from Belief_base.symbols import SymbolTable, IntClause, make_clause, is_int_tautology
+from Belief_base.sat import CDCLSolver
+from Belief_base.subsumption import ClauseIndex
+from Belief_base.truth_table import MAX_ATOMS, atom_tables, formula_atoms, formula_table, clauses_table
+from Belief_base.bdd import BDD, BDDTooLarge, TRUE, FALSE, AND, variable_order
+from Belief_base import metrics
+from Belief_base.budget import Budget, RAISE, BudgetExceeded, decide
+from Belief_base.tseitin import DISTRIBUTE, TSEITIN, tseitin_clauses
 # from Belief_base.belief_base import BeliefBase
-from itertools import combinations
+from collections import defaultdict
+from heapq import heappush, heappop
+from itertools import count
 
 # Literal is for (atom name, is_positive) example: ("p", False) means ¬p
 Literal = Tuple[str, bool]
@@ -39,6 +50,13 @@ via extract_clauses()
 
 """
 def extract_clauses(formula: Formula) -> List[Clause]:
+    # The work is done on integer clauses, we only translate back to (atom name, is_positive) at the end
+    symbols = SymbolTable()
+    return [symbols.decode_clause(c) for c in extract_int_clauses(formula, symbols)]
+
+# Same as extract_clauses but every literal is a signed int from the symbol table, so
+# And(Or(Atom("p"), Not(Atom("q"))), Atom("r")) gives [(-2, 1), (3,)] when p = 1, q = 2 and r = 3
+def extract_int_clauses(formula: Formula, symbols: SymbolTable) -> List[IntClause]:
     # print("Extraction started for formula:", formula)
     # Double check if the formula is in CNF
     cnf = formula.to_cnf()
@@ -52,8 +70,8 @@ def extract_clauses(formula: Formula) -> List[Clause]:
         # If there is no ∧, treat the whole formula as a single clause
         subformulas = [cnf]
         
-    # Create empty formula list 
-    clauses: List[Clause] = []
+    # Create empty clause list 
+    clauses: List[IntClause] = []
     
     # Now we split up the subformulas based on the ∨ operator
     for sub in subformulas:
@@ -65,23 +83,23 @@ def extract_clauses(formula: Formula) -> List[Clause]:
             # If there is no or operator, then we have a unit clause like Atom("p") or Not(Atom("q")) which is a single literal
             disjunctions = [sub]
             
-        # set of literals to turn each disjunction into a (atom, is_positive) tuple
-        lits: Set[Literal] = set()
+        # set of signed ints, p becomes 1 and ¬q becomes -2
+        lits: Set[int] = set()
         
         # Loop through each literal in the disjunctions list
         for lit in disjunctions:
             # Check if the literal is true
             if isinstance(lit, Atom):
-                lits.add((lit.name, True))  # Positive literal
+                lits.add(symbols.literal(lit.name, True))  # Positive literal
             # Check if the literal is a negation (false) and that it is an atom
             elif isinstance(lit, Not) and isinstance(lit.formula, Atom):
-                lits.add((lit.formula.name, False))
+                lits.add(symbols.literal(lit.formula.name, False))
             else:
                 # In every proper CNF, every literal must be either an Atom or Not(Atom)
                 raise ValueError(f"Non literal in clause: {lit}")
             
-        # Finally add the set of literals to the clauses list as a frozenset
-        clauses.append(frozenset(lits)) 
+        # Finally add the literals to the clauses list as a sorted tuple
+        clauses.append(make_clause(lits)) 
     
     return clauses
 
@@ -92,73 +110,494 @@ beliefs = [
 ]
 """
 
+# Clauses for one formula in the given CNF mode: "distribute" (equivalent CNF via to_cnf) or "tseitin" (equisatisfiable, with auxiliary atoms)
+# scratch=True numbers the Tseitin auxiliary atoms past the symbol table instead of adding them (see tseitin.py)
+def formula_int_clauses(formula: Formula, symbols: SymbolTable, cnf_mode: str = DISTRIBUTE,
+                        scratch: bool = False) -> List[IntClause]:
+    if cnf_mode == TSEITIN:
+        return tseitin_clauses(formula, symbols, scratch)
+    return extract_int_clauses(formula, symbols)
+
 # Query the clauses where we 
-def cnf_clauses_for_query(kb, query) -> List[Clause]:
-    from Belief_base.belief_base import BeliefBase
-    all_clauses: List[Clause] = []
+# cnf_mode is used for the negated query, by default it is the same mode as the belief base
+def cnf_clauses_for_query(kb, query, cnf_mode=None) -> List[Clause]:
+    # Public form of the clauses, the resolution loop itself uses cnf_int_clauses_for_query
+    return [kb.symbols.decode_clause(c) for c in cnf_int_clauses_for_query(kb, query, cnf_mode=cnf_mode)]
+
+# Clauses of ¬query without tautologies, this is what gets added to the belief base clauses for a refutation
+# In Tseitin mode the auxiliary atoms are scratch atoms, so asking many queries never grows the symbol table
+def negated_query_clauses(query: Formula, symbols: SymbolTable, cnf_mode: str = DISTRIBUTE) -> List[IntClause]:
+    return [c for c in formula_int_clauses(Not(query), symbols, cnf_mode, scratch=True) if not is_int_tautology(c)]
+
+# Without a symbol table (or with the base's own table) the clauses the belief base stored when each belief was
+# added are used directly, only ¬query is converted. Another symbol table means converting every belief again
+def cnf_int_clauses_for_query(kb, query, symbols: SymbolTable = None, cnf_mode=None) -> List[IntClause]:
+    if symbols is None or symbols is kb.symbols:
+        return kb.clauses_of() + kb.query_clauses(query, cnf_mode)
+
+    all_clauses: List[IntClause] = []
     
     # Iterate through each belief in the belief base
     # 1st iteration example: belief = Or(Not(Atom("p")), Atom("q"))
-    # Extract_clauses recognizes the OR and builds set frozenset({ ("p", False), ("q", True) })
+    # Extract_int_clauses recognizes the OR and builds the clause (-1, 2)
     # 2nd iteration example: belief = Atom("p")
-    # Extract_clauses recognizes the single atom and builds set frozenset({ ("p", True) })
+    # Extract_int_clauses recognizes the single atom and builds the clause (1,)
     for belief in kb.get_beliefs():
         # For each belief formula, get each 
-        all_clauses.extend(extract_clauses(belief))
+        all_clauses.extend(formula_int_clauses(belief, symbols, kb.cnf_mode))
     
-    # Negate the φ and convert to cnf
-    neg_query = Not(query).to_cnf()
+    # Negate the φ and convert to cnf, with Tseitin the auxiliary atoms are fresh so they can not clash with the base
+    query_mode = cnf_mode or kb.cnf_mode
+    neg_query = Not(query)
+    if query_mode == DISTRIBUTE:
+        neg_query = neg_query.to_cnf()
     
     # Add the negated φ to the clauses list (because resolution works by proof of contradition), so the final all_clauses in our example becomes: 
-    all_clauses.extend(extract_clauses(neg_query))
+    all_clauses.extend(formula_int_clauses(neg_query, symbols, query_mode, scratch=True))
     
     """ 
     [
-            frozenset({ ("p", False), ("q", True) }),   # (¬p ∨ q)   from Implies(p, q)
-            frozenset({ ("p", True) }),                 # (p)        from Atom(p)
-            frozenset({ ("q", False) })                  # (¬q)       from ¬query
+            (-1, 2),    # (¬p ∨ q)   from Implies(p, q)
+            (1,),       # (p)        from Atom(p)
+            (-2,)       # (¬q)       from ¬query
         ] 
         
         """
         
     # DROP ALL CLAUSES THAT ARE TAUTOLOGIES OR ELSE THE CONSISTENCY POSTULATE WILL FAIL
-    return [c for c in all_clauses if not is_tautology(c)]
+    return [c for c in all_clauses if not is_int_tautology(c)]
 
 # Method that takes in the belief base, query (phi) to check if the belief base entails the query kb ⊨ query?
-def resolution_entails(kb, query) -> bool:
-    from Belief_base.belief_base import BeliefBase
-    # Turn everything into clauses and cnf_clauses_for_query will also negate the query and return frozensets of literals
-    clauses = set(cnf_clauses_for_query(kb, query))
+# relevance=True only looks at the beliefs that share atoms with the query, see EntailmentEngine.entails
+# budget limits the check (see budget.py), on_unknown says what to return when it runs out: by default
+# BudgetExceeded is raised, "unknown" returns budget.UNKNOWN
+def resolution_entails(kb, query, relevance=False, budget: Budget = None, on_unknown=RAISE) -> bool:
+    try:
+        if relevance:
+            return ResolutionEngine().entails(kb, query, relevance=True, budget=budget)
+        # Turn everything into integer clauses and cnf_int_clauses_for_query will also negate the query
+        return resolution_refutes(cnf_int_clauses_for_query(kb, query), budget)
+    except BudgetExceeded as error:
+        return decide(on_unknown, error)
+
+# Simplifies a clause set before saturation without changing whether it is satisfiable, returns None when that
+# alone already derives the empty clause
+#
+# Unit propagation: a unit clause (p) makes p true, so every clause with p is satisfied and dropped and ¬p is
+# removed from every other clause. That can make new units, which are propagated the same way until none are left
+# Example: [(1,), (-1, 2), (-2, 3, 4)] propagates p then q and leaves [(3, 4)]
+# Pure literals: if ¬r occurs nowhere, making r true satisfies every clause with r, so those clauses are dropped.
+# Dropping clauses can make other literals pure, so this is repeated as well
+def simplify_clauses(clause_list: List[IntClause]) -> Optional[List[IntClause]]:
+    clauses: List[IntClause] = []
+    seen: Set[IntClause] = set()
+    for clause in clause_list:
+        if not clause:
+            return None
+        if clause not in seen and not is_int_tautology(clause):
+            seen.add(clause)
+            clauses.append(clause)
+
+    # occurs[lit] lists the positions of the clauses that contain lit
+    occurs: Dict[int, List[int]] = defaultdict(list)
+    for i, clause in enumerate(clauses):
+        for lit in clause:
+            occurs[lit].append(i)
+
+    # Literals made true by propagation, and which clauses are still in the set
+    true: Set[int] = set()
+    alive = [True] * len(clauses)
+    units = [clause[0] for clause in clauses if len(clause) == 1]
+    while units:
+        lit = units.pop()
+        if lit in true:
+            continue
+        if -lit in true:
+            # (p) and (¬p) both had to hold
+            return None
+        true.add(lit)
+        for i in occurs[lit]:
+            alive[i] = False
+        # Every clause with ¬lit lost a literal, look at what is left of it
+        for i in occurs[-lit]:
+            if not alive[i]:
+                continue
+            rest = [l for l in clauses[i] if -l not in true]
+            if not rest:
+                return None
+            if len(rest) == 1:
+                units.append(rest[0])
+
+    # What is left of the surviving clauses once the false literals are removed, (¬p ∨ q) and (q) both become (q)
+    # so the duplicates are dropped again. A clause with a true literal is never alive here, it was dropped when
+    # that literal was propagated
+    clauses = list(dict.fromkeys(tuple(l for l in clause if -l not in true)
+                                 for clause, keep in zip(clauses, alive) if keep))
 
-    # new_clauses to store any new clauses generated during resolution
-    new_clauses = set()
     while True:
-        # Loop over all pairs of existing clauses
-        # We try to resolve each pair -- that is, find complementary pairs like p and ¬p so that they cancel out
-        for C1, C2 in combinations(clauses, 2):
-            # For each literal (symbol, is_positive) in C1, check if the opposite literal exists in C2
-            # Example: C1 = [("p", False), ("q", True)] and C2 = [("p", True)]
-            for (sym, pos) in C1:
-                # We take the first element ("p", False) and define pair comp as ("p", True)
-                comp = (sym, not pos)
-                # If ("p", True) is in C2 (in our example it is), we can resolve C1 and C2
-                if comp in C2:
-                    # C1 | C2 is the set union between C1 and C2 combining all literals
-                    # So in our example, that would be {("p", False), ("q", True), ("p", True)} and we take
-                    # this and remove the complementary pair in our case ("p", True) and ("p", False)
-                    # and we are left with only ("q", True)
-                    R = frozenset((C1 | C2) - {(sym,pos), comp})
-                    # If the set is empty, that means we have derived the empty clause, which means we have a contradiction
+        literals = {lit for clause in clauses for lit in clause}
+        pure = {lit for lit in literals if -lit not in literals}
+        if not pure:
+            break
+        clauses = [clause for clause in clauses if pure.isdisjoint(clause)]
+
+    if metrics.ENABLED:
+        metrics.count("preprocess.units", len(true))
+        metrics.count("preprocess.removed", len(seen) - len(clauses))
+    return clauses
+
+# Saturates the clause set with resolution and returns True if the empty clause is derived (the set is unsatisfiable)
+#
+# This is the given-clause (Otter) loop. Clauses wait in "unprocessed" until they are picked as the given clause,
+# the given clause is resolved against every processed clause that holds a complementary literal, and then it joins
+# "processed" itself. So every pair of clauses is resolved at most once, and only pairs that can actually resolve are tried.
+# With a budget the loop checks the limits once per given clause and raises BudgetExceeded when one is hit
+#
+# The clauses go through simplify_clauses first (preprocess=False skips it). Unit facts are then used up by
+# propagation instead of being resolved pairwise against everything, and many questions are settled right there:
+# an empty clause means unsatisfiable, no clauses left means satisfiable
+#
+# Redundant clauses are thrown away as they come (subsumption=False keeps them all): a clause that a kept clause
+# subsumes is never queued (forward), and a new clause removes the kept clauses it subsumes (backward), see
+# subsumption.py. Example: once (q) is derived, (q ∨ r) and (¬p ∨ q) are gone and never picked or resolved again
+def resolution_refutes(clause_list: List[IntClause], budget: Budget = None, preprocess: bool = True,
+                       subsumption: bool = True) -> bool:
+    meter = budget.start() if budget is not None else None
+    # Work done, reported to metrics.py when instrumentation is on
+    rounds = resolvents = subsumed = 0
+    try:
+        if preprocess:
+            clause_list = simplify_clauses(clause_list)
+            if clause_list is None or not clause_list:
+                if metrics.ENABLED:
+                    metrics.count("preprocess.settled")
+                return clause_list is None
+        # Every clause we have ever seen, so that the same resolvent is never queued twice
+        seen: Set[IntClause] = set()
+        # Unprocessed clauses as a heap ordered by length, short clauses (especially units) are picked first
+        unprocessed = []
+        counter = count()
+        # Every clause that is still kept, processed or not. A clause removed by backward subsumption is skipped
+        # when it comes out of the heap and when it is met in an occurs list
+        kept = ClauseIndex() if subsumption else None
+
+        # Queues a clause unless a kept clause subsumes it, and drops the kept clauses it subsumes
+        def keep(clause):
+            nonlocal subsumed
+            if kept is not None:
+                if next(kept.subsuming(clause), None) is not None:
+                    subsumed += 1
+                    return
+                for old in kept.subsumed_by(clause):
+                    kept.remove(old)
+                    subsumed += 1
+                kept.add(clause)
+            heappush(unprocessed, (len(clause), next(counter), clause))
+
+        # Shortest first, so the input clauses that are subsumed by other input clauses are never queued
+        for clause in sorted(clause_list, key=len):
+            # The empty clause is already a contradiction
+            if not clause:
+                return True
+            if clause not in seen:
+                seen.add(clause)
+                keep(clause)
+
+        # occurs[lit] lists the processed clauses that contain lit
+        # Example: occurs[-1] = [(-1, 2)] when the processed clause ¬p ∨ q is the only one with ¬p
+        occurs: Dict[int, List[IntClause]] = defaultdict(list)
+
+        while unprocessed:
+            _, _, given = heappop(unprocessed)
+            if kept is not None and given not in kept:
+                continue
+            rounds += 1
+            if meter is not None:
+                meter.check()
+            for lit in given:
+                # Only the processed clauses with the complement of lit can be resolved with the given clause on lit
+                # Example: given = (1,) (p) and occurs[-1] = [(-1, 2)] gives the resolvent (2,) (q)
+                for other in occurs[-lit]:
+                    if kept is not None and other not in kept:
+                        continue
+                    # Union of both clauses without the complementary pair
+                    R = make_clause(l for l in given + other if l != lit and l != -lit)
+                    resolvents += 1
+                    # If the clause is empty, that means we have derived the empty clause, which means we have a contradiction
                     # and therefore the original query is entailed by the belief base
                     if len(R) == 0:
                         return True
-                    # If the set is not empty, we add it to the new_clauses set
-                    new_clauses.add(R)
-                    
-        # Below we add new_clauses to clauses and so if new_clauses is a subset of clauses, that means we have not made any new unique pair
-        # and so KB ⊭ query
-        if new_clauses.issubset(clauses):
-            return False
-        
-        # Add new_clauses to clauses
-        clauses |= new_clauses
+                    # A resolvent like (¬s ∨ s ∨ ¬p) is always true and tells us nothing. Keeping it is even unsound:
+                    # resolving (¬s ∨ s) with (s) on s would remove both s and ¬s and give a false empty clause
+                    if R in seen or is_int_tautology(R):
+                        continue
+                    seen.add(R)
+                    if meter is not None:
+                        meter.add(R)
+                    keep(R)
+            # The given clause is now processed and can be found through each of its literals, unless one of its
+            # own resolvents subsumed it, like (q) from (p ∨ q) and (¬p)
+            if kept is not None and given not in kept:
+                continue
+            for lit in given:
+                occurs[lit].append(given)
+
+        # Nothing new can be derived and we never reached the empty clause, so KB ⊭ query
+        return False
+    finally:
+        if metrics.ENABLED:
+            metrics.count("resolution.calls")
+            metrics.count("resolution.rounds", rounds)
+            metrics.count("resolution.resolvents", resolvents)
+            metrics.count("resolution.subsumed", subsumed)
+
+
+class EntailmentEngine:
+    """
+    Interface for the procedures that decide KB ⊨ φ.
+    Every engine gets the clauses of KB ∪ {¬φ} and answers whether they are unsatisfiable.
+    """
+    name = None
+
+    # KB ⊨ φ exactly when KB ∪ {¬φ} has no model
+    #
+    # With relevance=True only the beliefs that are connected to φ through shared atoms are used. If KB is
+    # consistent, the other beliefs have a model of their own that can be combined with any model of the connected
+    # part, so they can't change the answer. An inconsistent KB entails everything, which is why the consistency
+    # of the base is checked first (the answer is cached in the belief base)
+    #
+    # Every method takes an optional budget (see budget.py) and raises BudgetExceeded when it runs out
+    def entails(self, kb, query, relevance=False, budget: Budget = None) -> bool:
+        if relevance:
+            if not kb.is_consistent(self, budget):
+                return True
+            return self.entails_subset(kb, kb.relevant_indexes(query), query, budget)
+        return self.unsatisfiable(cnf_int_clauses_for_query(kb, query), budget)
+
+    # True if the belief base has a model
+    def consistent(self, kb, budget: Budget = None) -> bool:
+        return not self.unsatisfiable(kb.clauses_of(), budget)
+
+    # Does the part of kb made of the beliefs at the given indexes entail φ?
+    # The clauses stored with those beliefs are combined directly, nothing is converted again
+    def entails_subset(self, kb, indexes, query, budget: Budget = None) -> bool:
+        return self.unsatisfiable(kb.clauses_of(indexes) + kb.query_clauses(query), budget)
+
+    def unsatisfiable(self, clauses: List[IntClause], budget: Budget = None) -> bool:
+        raise NotImplementedError
+
+class ResolutionEngine(EntailmentEngine):
+    """The resolution prover above, this is the reference engine."""
+    name = "resolution"
+
+    def unsatisfiable(self, clauses: List[IntClause], budget: Budget = None) -> bool:
+        return resolution_refutes(clauses, budget)
+
+class CDCLEngine(EntailmentEngine):
+    """Decides KB ∪ {¬φ} with the CDCL SAT solver from sat.py."""
+    name = "cdcl"
+
+    # Questions about a belief base go to its incremental session (see session.py), which keeps its
+    # learned clauses from one question to the next
+    def entails(self, kb, query, relevance=False, budget: Budget = None) -> bool:
+        if relevance:
+            return super().entails(kb, query, relevance, budget)
+        return kb.session.entails(kb.ids_of(range(len(kb.beliefs))), query, budget)
+
+    def consistent(self, kb, budget: Budget = None) -> bool:
+        return kb.session.consistent(kb.ids_of(range(len(kb.beliefs))), budget)
+
+    def entails_subset(self, kb, indexes, query, budget: Budget = None) -> bool:
+        return kb.session.entails(kb.ids_of(indexes), query, budget)
+
+    def unsatisfiable(self, clauses: List[IntClause], budget: Budget = None) -> bool:
+        solver = CDCLSolver()
+        for clause in clauses:
+            if not solver.add_clause(clause):
+                return True
+        return not solver.solve(budget=budget)
+
+class TruthTableEngine(EntailmentEngine):
+    """
+    Model checking over all assignments at once with the bit tables from truth_table.py.
+    Questions with more than max_atoms atoms are handed to the fallback engine (resolution by default).
+    """
+    name = "truth_table"
+
+    def __init__(self, max_atoms: int = MAX_ATOMS, fallback=None):
+        self.max_atoms = max_atoms
+        self.fallback = get_engine(fallback)
+        # Atom order of the last belief base, with the base and version it was worked out for
+        self._base = None
+        self._base_version = None
+        self._base_atoms = []
+        # Column order the memo below belongs to, and formula -> table for that order
+        self._columns_key = None
+        self._memo = {}
+
+    # The memo can hold megabytes of tables, a copy sent to a worker process starts without it
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_base=None, _base_version=None, _base_atoms=[], _columns_key=None, _memo={})
+        return state
+
+    # The formulas are evaluated as they are stored, so a Tseitin base doesn't bring its auxiliary atoms along
+    def entails(self, kb, query, relevance=False, budget: Budget = None) -> bool:
+        if relevance:
+            return super().entails(kb, query, relevance, budget)
+        return self.entails_subset(kb, range(len(kb.beliefs)), query, budget)
+
+    def consistent(self, kb, budget: Budget = None) -> bool:
+        formulas = kb.get_beliefs()
+        setup = self._columns(kb, [])
+        if setup is None:
+            return self.fallback.consistent(kb, budget)
+        return self._models(formulas, setup, budget) != 0
+
+    # The columns cover every atom of the base (plus those of the query), so all subsets of one contraction share
+    # them and each belief's table is only computed once
+    def entails_subset(self, kb, indexes, query, budget: Budget = None) -> bool:
+        formulas = [kb.beliefs[i][0] for i in indexes]
+        setup = self._columns(kb, [query])
+        if setup is None:
+            return self.fallback.entails_subset(kb, indexes, query, budget)
+        # ¬query goes first, it usually rules out the most assignments and the loop stops as soon as none are left
+        return self._models([Not(query)] + formulas, setup, budget) == 0
+
+    def unsatisfiable(self, clauses: List[IntClause], budget: Budget = None) -> bool:
+        atoms = sorted({abs(lit) for clause in clauses for lit in clause})
+        if len(atoms) > self.max_atoms:
+            return self.fallback.unsatisfiable(clauses, budget)
+        if metrics.ENABLED:
+            metrics.count("truth_table.checks")
+        return clauses_table(clauses, atoms, budget.start() if budget is not None else None) == 0
+
+    # (atom name -> table, table of "true", memo) for the atoms of the base and of the extra formulas,
+    # or None when there are more than max_atoms of them
+    def _columns(self, kb, extra):
+        if self._base is not kb or self._base_version != kb.version:
+            self._base, self._base_version = kb, kb.version
+            self._base_atoms = sorted(formula_atoms(kb.get_beliefs()))
+        names = self._base_atoms
+        if len(names) <= self.max_atoms:
+            names = names + sorted(formula_atoms(extra).difference(names))
+        if len(names) > self.max_atoms:
+            if metrics.ENABLED:
+                metrics.count("truth_table.fallbacks")
+            return None
+        key = tuple(names)
+        if key != self._columns_key:
+            self._columns_key = key
+            self._memo = {}
+        tables, everything = atom_tables(len(names))
+        # Bound the memo to about 32 MiB of tables
+        if len(self._memo) > max(64, (1 << 28) >> len(names)):
+            self._memo = {}
+        return dict(zip(names, tables)), everything, self._memo
+
+    # Table of the conjunction of the formulas, 0 means they have no model together
+    def _models(self, formulas, setup, budget):
+        columns, everything, memo = setup
+        meter = budget.start() if budget is not None else None
+        if metrics.ENABLED:
+            metrics.count("truth_table.checks")
+        result = everything
+        for formula in formulas:
+            if meter is not None:
+                meter.check()
+            result &= formula_table(formula, columns, everything, memo)
+            if not result:
+                break
+        return result
+
+class BDDEngine(EntailmentEngine):
+    """
+    Compiles the whole belief base into one BDD (see bdd.py) and answers KB ⊨ φ by checking that the diagram of KB
+    implies the diagram of φ. The compiled base is kept until the base changes (its version moves on), so a run of
+    asks against the same base costs one compilation and then only the query diagrams.
+    Whatever doesn't fit in node_budget nodes, and the subset questions of contraction (each subset would need its
+    own compilation), go to the fallback engine.
+    """
+    name = "bdd"
+    NODE_BUDGET = 100_000
+
+    def __init__(self, node_budget: int = NODE_BUDGET, fallback=None):
+        self.node_budget = node_budget
+        self.fallback = get_engine(fallback)
+        # The base and version the diagram below was compiled for, manager is None when it was too large
+        self._base = None
+        self._base_version = None
+        self._manager = None
+        self._root = FALSE
+
+    # A copy sent to a worker process compiles again if it needs to
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_base=None, _base_version=None, _manager=None, _root=FALSE)
+        return state
+
+    # The manager holding the compiled base (compiled now if the base changed), or None if it didn't fit
+    def _compiled(self, kb, budget: Budget = None):
+        if self._base is kb and self._base_version == kb.version:
+            return self._manager
+        meter = budget.start() if budget is not None else None
+        formulas = kb.get_beliefs()
+        order = variable_order(formulas)
+        manager, root = None, FALSE
+        # apply recurses once per atom, a very wide vocabulary is left to the fallback
+        if len(order) < sys.getrecursionlimit() // 4:
+            manager, root = BDD(order, self.node_budget), TRUE
+            try:
+                for formula in formulas:
+                    if meter is not None:
+                        meter.check()
+                    root = manager.apply(AND, root, manager.build(formula))
+            except BDDTooLarge:
+                manager, root = None, FALSE
+        if metrics.ENABLED:
+            metrics.count("bdd.compilations" if manager is not None else "bdd.fallbacks")
+        self._base, self._base_version = kb, kb.version
+        self._manager, self._root = manager, root
+        return manager
+
+    # relevance changes nothing here, the compiled base already answers every query directly
+    def entails(self, kb, query, relevance=False, budget: Budget = None) -> bool:
+        manager = self._compiled(kb, budget)
+        if manager is not None and len(manager.names) < sys.getrecursionlimit() // 4:
+            try:
+                return manager.implies(self._root, manager.build(query))
+            except BDDTooLarge:
+                # The query diagrams filled the unique table, the next question compiles the base again from scratch
+                self._base = None
+        if metrics.ENABLED:
+            metrics.count("bdd.fallbacks")
+        return self.fallback.entails(kb, query, relevance, budget)
+
+    def consistent(self, kb, budget: Budget = None) -> bool:
+        if self._compiled(kb, budget) is not None:
+            return self._root != FALSE
+        return self.fallback.consistent(kb, budget)
+
+    def entails_subset(self, kb, indexes, query, budget: Budget = None) -> bool:
+        return self.fallback.entails_subset(kb, indexes, query, budget)
+
+    def unsatisfiable(self, clauses: List[IntClause], budget: Budget = None) -> bool:
+        return self.fallback.unsatisfiable(clauses, budget)
+
+# Engines that can be selected by name, for example BeliefRevisionAgent(engine="cdcl")
+ENGINES = {
+    ResolutionEngine.name: ResolutionEngine,
+    CDCLEngine.name: CDCLEngine,
+    TruthTableEngine.name: TruthTableEngine,
+    BDDEngine.name: BDDEngine,
+}
+
+# Turns an engine name (or None for the default) into an engine object, engine objects are passed through
+def get_engine(engine=None) -> EntailmentEngine:
+    if engine is None:
+        engine = ResolutionEngine.name
+    if isinstance(engine, EntailmentEngine):
+        return engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown entailment engine: {engine}")
+    return ENGINES[engine]()
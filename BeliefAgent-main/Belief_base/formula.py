@@ -1,7 +1,71 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from operator import attrgetter
+from weakref import KeyedRef
+from Belief_base import metrics
+
+# Every live formula node, keyed by its structure. Building a formula that already exists gives back the same object
+# (hash consing), so Atom("p") is Atom("p") and And(p, q) is And(q, p). The values are weak references, so nodes that
+# nobody uses any more are dropped from the table automatically
+#
+# ∧, ∨ and ↔ don't care about the order of their operands, so their operands are put in a fixed order (and ∧ / ∨
+# drop duplicates) before the lookup. The node then looks the same however it was built, in every run:
+#
+#     Or(q, p), Or(p, q, p)     both are the node with formulas (p, q), printed as (p) ∨ (q)
+#     Equiv(q, p)               left is p and right is q
+#
+# The order (_order) puts literals first, by atom name with p before ¬p, and then the other subformulas by a
+# fingerprint of their structure
+_TABLE = {}
+
+# Called when an interned node is garbage collected, removes its entry unless a newer node already took the key
+def _forget(ref):
+    if _TABLE.get(ref.key) is ref:
+        del _TABLE[ref.key]
+
+# Returns the live node stored under key, or None
+def _lookup(key):
+    ref = _TABLE.get(key)
+    return ref() if ref is not None else None
+
+# Sort key of a formula in the operands of ∧, ∨ and ↔, the last item is a fingerprint of the structure
+# Atom("p") is (0, "p", 0, fp), Not(Atom("p")) is (0, "p", 1, fp), anything else is (1, "", 0, fp)
+#
+# The fingerprint of an atom is a 64 bit blake2b of its name, computed once per atom. hash() of a string is different
+# in every run, but hash() of a tuple of ints is not, so every other node combines its type tag with the
+# fingerprints of its children in one tuple hash. The order is then the same in every run, at the cost of one small
+# tuple per new node
+def _atom_order(name):
+    return (0, name, 0, int.from_bytes(blake2b(name.encode(), digest_size=8).digest(), "big"))
+
+def _compound_order(cls, children):
+    fingerprint = hash((cls._tag,) + tuple([child._order[3] for child in children]))
+    if cls is Not and type(children[0]) is Atom:
+        return (0, children[0].name, 1, fingerprint)
+    return (1, "", 0, fingerprint)
+
+_by_order = attrgetter("_order")
+
+# The operands of ∧ and ∨ without duplicates and in the fixed order. Example: (q, p, q) gives (p, q)
+# The children are interned already, so dict.fromkeys drops the duplicates with identity checks
+def _normalized(formulas):
+    return tuple(sorted(dict.fromkeys(formulas), key=_by_order))
+
+# Stores a freshly built node under key. The hash is computed once here instead of on every lookup
+def _register(node, key):
+    node._hash = hash(key)
+    node._is_cnf = False
+    _TABLE[key] = KeyedRef(node, _forget, key)
+    return node
+
 class Formula:
     """
     This is an abstract base class (a.k.a interface) for all formula types, like a template.
+    Nodes are immutable and interned, so two structurally equal formulas are the same object.
     """
+    # _is_cnf marks nodes that came out of to_cnf, converting them again returns them straight away
+    # _order is the sort key used for the operands of ∧, ∨ and ↔ (see the top of this file)
+    __slots__ = ("_hash", "_is_cnf", "_order", "__weakref__")
     
     # The datastructure used is an Abstract Syntax Tree (AST) where each node is a formula, each leaf is a variable.
     """   p ∧ (q ∨ ¬r)
@@ -27,6 +91,24 @@ class Formula:
     def __str__(self):
         raise NotImplementedError
     
+    # Because of interning, structurally equal formulas are the same object, so equality is an identity check
+    # And(p, q) == And(q, p)  # True, it is the same node
+    def __eq__(self, other):
+        return self is other
+    
+    def __ne__(self, other):
+        return self is not other
+    
+    # The hash is precomputed when the node is created
+    def __hash__(self):
+        return self._hash
+    
+    # The direct subformulas, in order. Atom("p").children() is () and Implies(p, q).children() is (p, q)
+    # Code that walks a formula without recursion uses this to push the children on its stack
+    def children(self):
+        """Returns the tuple of direct subformulas."""
+        raise NotImplementedError
+    
     # Example: And(Atom("p"), Atom("q")).symbols() becomes {"p", "q"}
     def symbols(self):
         """Returns the set of propositional symbols in the formula."""
@@ -46,32 +128,82 @@ class Formula:
     # (¬r ∨ p ∨ s) ∧ (¬(p ∨ s) ∨ r ) then the right side of ∧ via demorgan's law becomes
     # (¬r ∨ p ∨ s) ∧ ((¬p ∧ ¬s) ∨ r ), now the right side can use distributive law to become
     # (¬r ∨ p ∨ s) ∧ (¬p ∨ r ) ∧ (¬s ∨ r ) to be in CNF form
+    #
+    # This is done in two passes: to_nnf removes → and ↔ and pushes the negations down to the atoms, then the
+    # node specific _nnf_to_cnf distributes ∨ over ∧. Both passes are memoized per node, and since nodes are
+    # interned, converting the same subformula again (or a formula that is already in CNF) costs nothing
     def to_cnf(self):
         """Converts the formula to Conjunctive Normal Form."""
+        if self._is_cnf:
+            return self
+        # A literal or a clause of literals is its own CNF, it skips the caches. Duplicates were dropped when the Or was
+        # built, and a tautology like p ∨ ¬p is kept as it is, just like _build_cnf keeps a formula made only of them
+        if _is_clause(self):
+            self._is_cnf = True
+            return self
+        cnf = _CNF_CACHE.get(self)
+        if cnf is None:
+            nnf = self.to_nnf()
+            # Only NNF nodes distribute directly, anything else is converted through its NNF (which is cached too)
+            if nnf is self:
+                cnf = nnf._nnf_to_cnf()
+                if metrics.ENABLED:
+                    metrics.count("to_cnf.conversions")
+                    metrics.count("to_cnf.clauses", len(_cnf_clauses(cnf)))
+            else:
+                cnf = nnf.to_cnf()
+            cnf._is_cnf = True
+            _CNF_CACHE.put(self, cnf)
+        elif metrics.ENABLED:
+            metrics.count("to_cnf.cache_hits")
+        return cnf
+    
+    # Negation normal form: only ∧, ∨ and ¬ in front of atoms, no → and ↔
+    # Example: ¬(p → q) becomes (p) ∧ (¬(q))
+    def to_nnf(self):
+        """Converts the formula to Negation Normal Form."""
+        nnf = _NNF_CACHE.get(self)
+        if nnf is None:
+            nnf = self._to_nnf()
+            _NNF_CACHE.put(self, nnf)
+        return nnf
+    
+    # The node specific part of to_nnf
+    def _to_nnf(self):
+        raise NotImplementedError
+    
+    # The node specific part of to_cnf, only called on nodes that are already in NNF
+    def _nnf_to_cnf(self):
         raise NotImplementedError
 
 # Each atom represents a propositional symbol, like "p", "q", "r" etc
 # This inherits the interface of Formula and MUST implement all these methods
 class Atom(Formula):
     """A propositional symbol/atom."""
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    # Atom("p") is Atom("p")  # True, the second call returns the node built by the first
+    def __new__(cls, name):
+        key = (cls, name)
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.name = name
+            node._order = _atom_order(name)
+            _register(node, key)
+        return node
+    
+    # Pickling rebuilds the node through __new__ so it is interned again on the other side
+    def __reduce__(self):
+        return (Atom, (self.name,))
+    
+    def children(self):
+        return ()
         
     # print(Atom("p"))  # Output: p
     def __str__(self):
         return self.name
     
-    # Atom("p") == Atom("p")  # True
-    # Atom("p") == Atom("q")  # False
-    def __eq__(self, other):
-        if isinstance(other, Atom):
-            return self.name == other.name
-        return False
-    
-    # This function is here so that if we have a1 = Atom("p") and a2 = Atom("q"), it will only keep one of them in a set to avoid duplicates!
-    def __hash__(self):
-        return hash(self.name)
-    
     # Returns the set of symbols used in the formula — in this case, just the one atom itself.
     # Like Atom("p").symbols()  # {'p'}
     def symbols(self):
@@ -86,27 +218,38 @@ class Atom(Formula):
     # Atoms are already in Conjunctive Normal Form by definition. "p" is as simple as it gets
     def to_cnf(self):
         return self
+    
+    def to_nnf(self):
+        return self
 
 # Represents the negation of a formula, like ¬p or ¬(p ∧ q)
 class Not(Formula):
     """Negation of a formula."""
-    def __init__(self, formula):
-        self.formula = formula
+    __slots__ = ("formula",)
+    # Type tag for the order fingerprints
+    _tag = 1
+
+    # Not(And(p, q)) is Not(And(q, p)) because And(p, q) and And(q, p) are already the same node
+    def __new__(cls, formula):
+        key = (cls, formula)
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.formula = formula
+            node._order = _compound_order(cls, (formula,))
+            _register(node, key)
+        return node
+    
+    def __reduce__(self):
+        return (Not, (self.formula,))
+    
+    def children(self):
+        return (self.formula,)
     
     # print(Not(Atom("p")))  # Output: ¬(p)
     def __str__(self):
         return f"¬({str(self.formula)})"
     
-    # Formula to check if two Not objects are equal
-    def __eq__(self, other):
-        if isinstance(other, Not):
-            return self.formula == other.formula
-        return False
-    
-    # Without it, order sensitive like Not(And(p, q)) != Not(And(q, p)) # True so we need this to avoid that 
-    def __hash__(self):
-        return hash(("not", hash(self.formula)))
-    
     # Returns all variables inside the negated formulas
     # Not(And(Atom("p"), Atom("q"))).symbols()
     # becomes {"p", "q"}
@@ -119,52 +262,61 @@ class Not(Formula):
     def evaluate(self, assignment):
         return not self.formula.evaluate(assignment)
     
-    # Method to recursively convert the negation to CNF
-    def to_cnf(self):
-        # Handle negation of complex formulas based on DeMorgan's laws and double negation
+    # Pushes the negation one level down, based on DeMorgan's laws and double negation
+    def _to_nnf(self):
         if isinstance(self.formula, Not):
             # Double negation: ¬¬A ≡ A
-            # Example: f = Not(Not(Atom("p"))) the system checks f is a Not object, then calls f.to_cnf() again
-            # Then in this stack, we have f.formula and we check if this is a Not object again, which it is and we call f.formula.to_cnf()
-            # We are now in f.formula.formula which is Atom("p") and we return that as the CNF, which we can see in the else at the bottom of this function
-            return self.formula.formula.to_cnf()
+            # Example: Not(Not(Atom("p"))) becomes Atom("p")
+            return self.formula.formula.to_nnf()
         elif isinstance(self.formula, And):
             # DeMorgan: ¬(A ∧ B) ≡ ¬A ∨ ¬B
-            return Or(*[Not(f).to_cnf() for f in self.formula.formulas]).to_cnf()
+            return Or(*[Not(f).to_nnf() for f in self.formula.formulas])
         elif isinstance(self.formula, Or):
             # DeMorgan: ¬(A ∨ B) ≡ ¬A ∧ ¬B
-            return And(*[Not(f).to_cnf() for f in self.formula.formulas]).to_cnf()
+            return And(*[Not(f).to_nnf() for f in self.formula.formulas])
         elif isinstance(self.formula, Implies):
             # ¬(A → B) ≡ A ∧ ¬B
-            return And(self.formula.premise.to_cnf(), Not(self.formula.conclusion).to_cnf()).to_cnf()
+            return And(self.formula.premise.to_nnf(), Not(self.formula.conclusion).to_nnf())
         elif isinstance(self.formula, Equiv):
             # ¬(A ↔ B) ≡ (A ∧ ¬B) ∨ (¬A ∧ B)
             a, b = self.formula.left, self.formula.right
-            return Or(And(a, Not(b)), And(Not(a), b)).to_cnf()
+            return Or(And(a.to_nnf(), Not(b).to_nnf()), And(Not(a).to_nnf(), b.to_nnf()))
         else:
             # For atoms, just return the negation
             return self
+    
+    # In NNF the negation is directly in front of an atom, so ¬p is a literal and already in CNF
+    def _nnf_to_cnf(self):
+        return self
 
 class And(Formula):
+    __slots__ = ("formulas",)
+    # Type tag for the order fingerprints
+    _tag = 2
     
     # Pass arguments And(p,q,r) because *formulas means we can pass any number of arguments
-    def __init__(self, *formulas):
-        self.formulas = formulas
+    # The operands are sorted and duplicates dropped, so And(q, p, q) is And(p, q) and its formulas are (p, q)
+    def __new__(cls, *formulas):
+        formulas = _normalized(formulas)
+        key = (cls,) + formulas
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.formulas = formulas
+            node._order = _compound_order(cls, formulas)
+            _register(node, key)
+        return node
+    
+    def __reduce__(self):
+        return (And, self.formulas)
+    
+    def children(self):
+        return self.formulas
     
     # print(And(Atom("p"), Atom("q")))  # Output: (p) ∧ (q)
     def __str__(self):
         return " ∧ ".join(f"({str(f)})" for f in self.formulas)
     
-    # And(p, q) == And(q, p)  # True
-    def __eq__(self, other):
-        if isinstance(other, And):
-            return set(self.formulas) == set(other.formulas)
-        return False
-    
-    # Hashes so that we can use And(p, q) and And(q, p) in a set and it will only keep one of them
-    def __hash__(self):
-        return hash(("and", frozenset(self.formulas)))
-    
     # Returns all symbols inside the And formula example: And(Atom("p"), Atom("q")).symbols() becomes {"p", "q"}
     def symbols(self):
         return set().union(*[f.symbols() for f in self.formulas])
@@ -173,46 +325,49 @@ class And(Formula):
     def evaluate(self, assignment):
         return all(f.evaluate(assignment) for f in self.formulas)
     
+    # And(p, Implies(q, r)) becomes And(p, Or(Not(q), r))
+    def _to_nnf(self):
+        return And(*[f.to_nnf() for f in self.formulas])
+    
     # Takes something like p ∧ (q ∧ r) which is the same as And(p, And(q, r)) and returns 
     # a flat, clean CNF friendly version And(p,q,r)
-    def to_cnf(self):
-        # Convert all subformulas to CNF first
-        # If we have And(p, Implies(q, r)), the Imples(q,r) becomes Or(Not(q), r) and p.to_cnf() becomes p
-        # cnf_formulas = [p, Or(Not(q), r)]
-        cnf_formulas = [f.to_cnf() for f in self.formulas]
-        
-        # Flatten nested ANDs
-        # If there's for example And(p, And(q, r)), we want to flatten it to And(p, q, r)
-        # In our example, our cnf_formulas is [p, Or(Not(q), r)], but there is no And inside it so we just return it as is
-        flattened = []
-        for f in cnf_formulas:
-            if isinstance(f, And):
-                flattened.extend(f.formulas)
-            else:
-                flattened.append(f)
-        
-        return And(*flattened)
+    def _nnf_to_cnf(self):
+        # Convert all subformulas to CNF first (each one is memoized) and collect all their clauses
+        # If we have And(p, Or(Not(q), r)), the clauses are [(p,), (Not(q), r)]
+        clauses = []
+        for f in self.formulas:
+            clauses.extend(_cnf_clauses(f.to_cnf()))
+        return _build_cnf(clauses)
 
 class Or(Formula):
+    __slots__ = ("formulas",)
+    # Type tag for the order fingerprints
+    _tag = 3
+    
     # Pass arguments Or(p,q,r) because *formulas means we can pass any number of arguments
-    def __init__(self, *formulas):
-        self.formulas = formulas
+    # We don't care about the order of the formulas inside the Or formula, so Or(q, p) is Or(p, q)
+    # Like And, the operands are sorted and duplicates dropped
+    def __new__(cls, *formulas):
+        formulas = _normalized(formulas)
+        key = (cls,) + formulas
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.formulas = formulas
+            node._order = _compound_order(cls, formulas)
+            _register(node, key)
+        return node
+    
+    def __reduce__(self):
+        return (Or, self.formulas)
+    
+    def children(self):
+        return self.formulas
     
     # print(Or(Atom("p"), Atom("q")))  # Output: (p) ∨ (q)
     def __str__(self):
         return " ∨ ".join(f"({str(f)})" for f in self.formulas)
     
-    # Or(Atom("p"), Atom("q")) == Or(Atom("q"), Atom("p"))  # True regardless of order
-    def __eq__(self, other):
-        if isinstance(other, Or):
-            return set(self.formulas) == set(other.formulas)
-        return False
-    
-    # We need this because we don't care about the order of the formulas inside the Or formula
-    # set([Or(p, q), Or(q, p)])  # Only one element stored
-    def __hash__(self):
-        return hash(("or", frozenset(self.formulas)))
-    
     # Or(Atom("p"), Not(Atom("q"))).symbols() # returns {"p", "q"}
     def symbols(self):
         return set().union(*[f.symbols() for f in self.formulas])
@@ -221,70 +376,52 @@ class Or(Formula):
     def evaluate(self, assignment):
         return any(f.evaluate(assignment) for f in self.formulas)
     
+    def _to_nnf(self):
+        return Or(*[f.to_nnf() for f in self.formulas])
+    
     # Example Or(p, And(q, r)) gives p ∨ (q ∧ r)
-    def to_cnf(self):
-        # Convert all subformulas to CNF first
-        # p.cnf() = p, And(q, r).cnf() = And(q, r) so cnf_formulas = [p, And(q, r)] in our example
-        cnf_formulas = [f.to_cnf() for f in self.formulas]
-        
-        # Flatten nested ORs
-        # Our example cnf_formulas = [p, And(q, r)] has no Or inside it so we just return it as is
-        flattened = []
-        for f in cnf_formulas:
-            if isinstance(f, Or):
-                flattened.extend(f.formulas)
-            else:
-                flattened.append(f)
-        
-        # Apply distributivity of OR over AND
-        # We check for AND formulas and in our example we have one! So we get and_formulas = [And(q, r)]
-        and_formulas = [f for f in flattened if isinstance(f, And)]
-        # If and formulas is empty, we can just return the flattened list as is, but our example is not empty so we continue
-        if not and_formulas:
-            return Or(*flattened)
-        
-        # Pick an AND to distribute over
-        # We pick the first value in the and_formulas list, which is just one formula And(q, r) in our example
-        and_formula = and_formulas[0]
-        # We then take the original flattened list and get the non AND formulas from it
-        # Other_formulas = [p] in our example
-        other_formulas = [f for f in flattened if f != and_formula]
-        
-        # Distribute OR over AND
-        distributed = []
-        # and_formula.formulas in our case is [q, r] so first iteration is q, second r
-        for conj in and_formula.formulas:
-            # Take the current conj (q in first iteration) and combine it with the other formulas (p in our example)
-            new_or = Or(conj, *other_formulas).to_cnf() # Or(q, p) in our example
-            # Add the new_or to the distributed list
-            distributed.append(new_or)
-        
-        # In our example we have distributed = [Or(q, p), Or(r, p)] and we wrap it in AND to get the final result
-        # And(Or(q, p), Or(r, p)) which is the CNF form of Or(p, And(q, r))
-        return And(*distributed)
+    def _nnf_to_cnf(self):
+        # Convert all subformulas to CNF first and distribute OR over AND on their clauses
+        # p.to_cnf() has the clauses [(p,)] and And(q, r).to_cnf() has [(q,), (r,)]
+        # Every combination of one clause from each side becomes one clause: [(p, q), (p, r)]
+        combined = [()]
+        for f in self.formulas:
+            clauses = _cnf_clauses(f.to_cnf())
+            # dict.fromkeys drops repeated literals but keeps their order
+            combined = [tuple(dict.fromkeys(left + right)) for left in combined for right in clauses]
+        # In our example we get And(Or(p, q), Or(p, r)) which is the CNF form of Or(p, And(q, r))
+        return _build_cnf(combined)
 
 class Implies(Formula):
     """Implication formula (P → Q)."""
     # Extract the premise and conclusion from the implication
     # Example: Implies(Atom("p"), Atom("q")) gives p → q
-    def __init__(self, premise, conclusion):
-        self.premise = premise
-        self.conclusion = conclusion
+    # The order matters here, Implies(p, q) is not Implies(q, p)
+    __slots__ = ("premise", "conclusion")
+    # Type tag for the order fingerprints
+    _tag = 4
+
+    def __new__(cls, premise, conclusion):
+        key = (cls, premise, conclusion)
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.premise = premise
+            node.conclusion = conclusion
+            node._order = _compound_order(cls, (premise, conclusion))
+            _register(node, key)
+        return node
+    
+    def __reduce__(self):
+        return (Implies, (self.premise, self.conclusion))
+    
+    def children(self):
+        return (self.premise, self.conclusion)
     
     # print(Implies(Atom("p"), Atom("q")))  # Output: (p) → (q)
     def __str__(self):
         return f"({str(self.premise)}) → ({str(self.conclusion)})"
     
-    # Implies(p, q) == Implies(p, q)  → True
-    def __eq__(self, other):
-        if isinstance(other, Implies):
-            return self.premise == other.premise and self.conclusion == other.conclusion
-        return False
-    
-    # Makes the implication usable in sets and dictionaries
-    def __hash__(self):
-        return hash(("implies", hash(self.premise), hash(self.conclusion)))
-    
     # Returns the set of symbols in the implication
     # Example: Implies(Atom("p"), Atom("q")).symbols() gives {"p", "q"}
     def symbols(self):
@@ -296,32 +433,42 @@ class Implies(Formula):
         return (not self.premise.evaluate(assignment)) or self.conclusion.evaluate(assignment)
     
     # We can rewrite P → Q as ¬P ∨ Q, this is necessary if we want to convert it to CNF
-    def to_cnf(self):
+    def _to_nnf(self):
         # P → Q is equivalent to ¬P ∨ Q
-        return Or(Not(self.premise), self.conclusion).to_cnf()
+        return Or(Not(self.premise).to_nnf(), self.conclusion.to_nnf())
 
 class Equiv(Formula):
     """Equivalence formula (P ↔ Q)."""
     # Equiv(p, q) becomes (p ↔ q)
-    def __init__(self, left, right):
-        self.left = left
-        self.right = right
+    __slots__ = ("left", "right")
+    # Type tag for the order fingerprints
+    _tag = 5
+
+    # Equiv(p, q) is Equiv(q, p) because p ↔ q is logically symmetric, the two sides are put in the fixed order
+    # Equiv(p, p) keeps both sides
+    def __new__(cls, left, right):
+        if _by_order(right) < _by_order(left):
+            left, right = right, left
+        key = (cls, left, right)
+        node = _lookup(key)
+        if node is None:
+            node = object.__new__(cls)
+            node.left = left
+            node.right = right
+            node._order = _compound_order(cls, (left, right))
+            _register(node, key)
+        return node
+    
+    def __reduce__(self):
+        return (Equiv, (self.left, self.right))
+    
+    def children(self):
+        return (self.left, self.right)
     
     # print(Equiv(Atom("p"), Atom("q")))  # Output: (p) ↔ (q)
     def __str__(self):
         return f"({str(self.left)}) ↔ ({str(self.right)})"
     
-    # Equiv(p, q) == Equiv(q, p)  # True because p ↔ q is logically symmetric
-    def __eq__(self, other):
-        if isinstance(other, Equiv):
-            return (self.left == other.left and self.right == other.right) or \
-                  (self.left == other.right and self.right == other.left)
-        return False
-    
-    # Again hashing to ignore order of the formulas inside the Equiv formula
-    def __hash__(self):
-        return hash(("equiv", frozenset([hash(self.left), hash(self.right)])))
-    
     # Equiv(Atom("p"), Not(Atom("q"))).symbols() leads to {'p', 'q'}
     def symbols(self):
         return self.left.symbols().union(self.right.symbols())
@@ -330,9 +477,74 @@ class Equiv(Formula):
     def evaluate(self, assignment):
         return self.left.evaluate(assignment) == self.right.evaluate(assignment)
     
-    def to_cnf(self):
+    def _to_nnf(self):
         # P ↔ Q is equivalent to (P → Q) ∧ (Q → P). it could also be (¬P ∨ Q) ∧ (¬Q ∨ P)
         return And(
-            Or(Not(self.left), self.right),
-            Or(Not(self.right), self.left)
-        ).to_cnf()
+            Or(Not(self.left).to_nnf(), self.right.to_nnf()),
+            Or(Not(self.right).to_nnf(), self.left.to_nnf())
+        )
+
+# p and ¬p are literals, ¬¬p and ¬(p ∧ q) are not
+def _is_literal(f):
+    return type(f) is Atom or (type(f) is Not and type(f.formula) is Atom)
+
+# A literal, or an Or of literals like p ∨ ¬q
+def _is_clause(f):
+    if type(f) is Or:
+        return all(_is_literal(g) for g in f.formulas)
+    return _is_literal(f)
+
+# Splits a formula that is already in CNF into its clauses, each clause is a tuple of literals
+# And(Or(p, Not(q)), r) gives [(p, Not(q)), (r,)]
+def _cnf_clauses(cnf):
+    conjuncts = cnf.formulas if isinstance(cnf, And) else (cnf,)
+    return [c.formulas if isinstance(c, Or) else (c,) for c in conjuncts]
+
+# Builds the CNF formula back from its clauses: a single literal stays a literal, a single clause stays an Or
+# [(p, Not(q)), (r,)] gives And(Or(p, Not(q)), r) and [(p,)] gives just p
+# Repeated clauses are dropped, and so are tautologies like (p ∨ ¬p) because they are always true. Without this
+# every distribution step would multiply them. A formula made only of tautologies keeps one so it is not left empty
+def _build_cnf(clauses):
+    kept, seen = [], set()
+    for clause in clauses:
+        key = frozenset(clause)
+        if key in seen:
+            continue
+        seen.add(key)
+        if not any(isinstance(lit, Not) and lit.formula in key for lit in clause):
+            kept.append(clause)
+    if not kept and clauses:
+        kept = [clauses[0]]
+    nodes = [c[0] if len(c) == 1 else Or(*c) for c in kept]
+    return nodes[0] if len(nodes) == 1 else And(*nodes)
+
+class _BoundedCache:
+    """Least recently used cache with a maximum number of entries."""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            # Forget the least recently used conversion
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        self.entries.clear()
+
+# Memoized conversions, the number of formulas remembered by each pass
+CNF_CACHE_SIZE = 100_000
+_CNF_CACHE = _BoundedCache(CNF_CACHE_SIZE)
+_NNF_CACHE = _BoundedCache(CNF_CACHE_SIZE)
+
+# Drops every memoized NNF / CNF conversion (the results stay correct without the caches, just slower)
+def clear_conversion_caches():
+    _CNF_CACHE.clear()
+    _NNF_CACHE.clear()
@@ -0,0 +1,145 @@
+import logging
+import re
+import time
+from collections import defaultdict
+
+"""
+Optional counters and timers for the hot paths, off by default.
+
+The instrumented code checks the module flag first, so with metrics off a call site costs one attribute lookup:
+
+    if metrics.ENABLED:
+        metrics.count("resolution.resolvents", generated)
+
+Counters that are recorded:
+
+    to_cnf.conversions, to_cnf.clauses      CNF conversions that were actually computed and the clauses they made
+    to_cnf.cache_hits                       conversions answered from the memo cache
+    resolution.calls, .rounds, .resolvents  refutations, given clauses processed and resolvents generated
+    resolution.subsumed                     clauses dropped by forward or backward subsumption
+    truth_table.checks, .fallbacks          questions answered with truth tables / handed on for too many atoms
+    bdd.compilations, bdd.fallbacks         belief bases compiled to a BDD / questions handed to the fallback engine
+    preprocess.units, .removed, .settled    literals fixed by unit propagation, clauses dropped before saturation
+                                            and refutations decided by the preprocessing alone
+    session.dropped, session.rebuilds       switched off clauses dropped from the SAT session / times it was rebuilt
+    remainders.tested, remainders.pruned    subsets checked for entailment / skipped as covered by a bigger remainder
+
+and timers (seconds and number of runs) for the phases of contract_partial_meet (contract.vacuity,
+contract.remainders, contract.select, contract.rebuild) and revise (revise.contract, revise.expand).
+
+Each operation(...) block sends one record to every sink when it ends: a dict with the operation name, its wall
+time and the counters and timers that changed during the block. A sink is any callable taking that dict, see
+logging_sink. prometheus_text() dumps the running totals in the Prometheus text format.
+"""
+
+ENABLED = False
+
+# Running totals since the last reset: counter name -> value, timer name -> [runs, seconds]
+counters = defaultdict(int)
+timers = defaultdict(lambda: [0, 0.0])
+# Callables that get a record at the end of every operation
+sinks = []
+
+def enable(*new_sinks):
+    """Turns recording on and adds the given sinks."""
+    global ENABLED
+    ENABLED = True
+    sinks.extend(new_sinks)
+
+def disable():
+    """Turns recording off and drops the sinks, the totals are kept until reset()."""
+    global ENABLED
+    ENABLED = False
+    sinks.clear()
+
+def reset():
+    counters.clear()
+    timers.clear()
+
+def count(name: str, amount: int = 1):
+    counters[name] += amount
+
+# Records one run of a timed section
+def add_time(name: str, seconds: float):
+    entry = timers[name]
+    entry[0] += 1
+    entry[1] += seconds
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class _Operation(_Timer):
+    __slots__ = ("before_counters", "before_timers")
+
+    def __enter__(self):
+        self.before_counters = dict(counters)
+        self.before_timers = {name: tuple(entry) for name, entry in timers.items()}
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        add_time(self.name, seconds)
+        record = {
+            "operation": self.name,
+            "seconds": seconds,
+            "counters": {name: value - self.before_counters.get(name, 0) for name, value in counters.items()
+                         if value != self.before_counters.get(name, 0)},
+            "timers": {name: entry[1] - self.before_timers.get(name, (0, 0.0))[1] for name, entry in timers.items()
+                       if entry[0] != self.before_timers.get(name, (0, 0.0))[0] and name != self.name},
+        }
+        for sink in sinks:
+            sink(record)
+        return False
+
+class _Nothing:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOTHING = _Nothing()
+
+# with metrics.timer("contract.select"): ... adds the time of the block to that timer, does nothing when off
+def timer(name: str):
+    return _Timer(name) if ENABLED else _NOTHING
+
+# Like timer, and when the block ends every sink gets a record of what happened inside it
+def operation(name: str):
+    return _Operation(name) if ENABLED else _NOTHING
+
+# A sink that writes each record to a logger, for example metrics.enable(metrics.logging_sink())
+def logging_sink(logger=None, level=logging.INFO):
+    logger = logger or logging.getLogger("belief_agent.metrics")
+    def sink(record):
+        logger.log(level, "%s took %.6fs counters=%s timers=%s", record["operation"], record["seconds"],
+                   record["counters"], record["timers"])
+    return sink
+
+# resolution.rounds becomes belief_agent_resolution_rounds
+def _metric_name(name: str) -> str:
+    return "belief_agent_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def prometheus_text() -> str:
+    """The running totals in the Prometheus text exposition format."""
+    lines = []
+    for name, value in sorted(counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, (runs, seconds) in sorted(timers.items()):
+        metric = _metric_name(name) + "_seconds"
+        lines += [f"# TYPE {metric} summary", f"{metric}_sum {seconds}", f"{metric}_count {runs}"]
+    return "\n".join(lines) + "\n"
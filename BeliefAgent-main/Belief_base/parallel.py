@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence
+from Belief_base.entailment import get_engine, negated_query_clauses
+from Belief_base.budget import BudgetExceeded
+from Belief_base.formula import Formula
+
+"""
+Answering many entailment questions about one belief base with a pool of worker processes.
+
+The clauses of the base are computed once in the parent and handed to every worker a single time through the pool
+initializer, so a task only has to carry its query formula (or, for remainders, its tuple of belief indexes).
+Each worker then adds the clauses of ¬query to its copy of the base clauses and runs the engine on them.
+"""
+
+# State of a worker process, set once by _init_worker: (engine, base clauses, symbol table, cnf mode, budget)
+_WORKER = None
+# State of a remainder worker, set once by _init_subset_worker: (engine, clauses of each belief, clauses of ¬φ, budget)
+# A worker that runs out of budget answers None, the parent decides what that means
+_SUBSET_WORKER = None
+
+def _init_worker(engine, clauses, symbols, cnf_mode, budget):
+    global _WORKER
+    _WORKER = (engine, clauses, symbols, cnf_mode, budget)
+
+# Runs in a worker: KB ⊨ query iff KB ∪ {¬query} is unsatisfiable
+# New atoms in the query are numbered in the worker's own copy of the symbol table, which is fine because the
+# numbers never leave the worker
+def _entails(query: Formula) -> bool:
+    engine, clauses, symbols, cnf_mode, budget = _WORKER
+    try:
+        return engine.unsatisfiable(clauses + negated_query_clauses(query, symbols, cnf_mode), budget)
+    except BudgetExceeded:
+        return None
+
+def entails_many(kb, queries: Sequence[Formula], engine=None, workers=None, budget=None) -> List[bool]:
+    """
+    Does kb entail each of the queries? The answers come back in the same order as the queries.
+    With a budget every query gets it on its own, a query that runs out is answered with None.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    engine = get_engine(engine)
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps the pool busy without sending every query on its own
+    chunksize = max(1, len(queries) // (workers * 4))
+    initargs = (engine, kb.clauses_of(), kb.symbols, kb.cnf_mode, budget)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(_entails, queries, chunksize=chunksize))
+
+def _init_subset_worker(engine, belief_clauses, query_clauses, budget):
+    global _SUBSET_WORKER
+    _SUBSET_WORKER = (engine, belief_clauses, query_clauses, budget)
+
+# Runs in a worker: does the subset of beliefs with these indexes entail φ?
+def _subset_entails(indexes) -> bool:
+    engine, belief_clauses, query_clauses, budget = _SUBSET_WORKER
+    clauses = list(query_clauses)
+    for i in indexes:
+        clauses.extend(belief_clauses[i])
+    try:
+        return engine.unsatisfiable(clauses, budget)
+    except BudgetExceeded:
+        return None
+
+def subset_pool(kb, phi: Formula, engine, workers: int, budget=None) -> ProcessPoolExecutor:
+    """
+    A pool whose workers answer "do the beliefs at these indexes entail phi?" for kb, see _subset_entails.
+    Every worker gets the clauses of each belief and of ¬phi once, when it starts.
+    """
+    engine = get_engine(engine)
+    belief_clauses = [kb.clauses_of([i]) for i in range(len(kb.beliefs))]
+    initargs = (engine, belief_clauses, kb.query_clauses(phi), budget)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_subset_worker, initargs=initargs)
+
+# Same as pool.map(_subset_entails, candidates) with a chunk size that suits the number of candidates
+def map_subsets(pool: ProcessPoolExecutor, candidates: List[tuple], workers: int) -> List[bool]:
+    chunksize = max(1, len(candidates) // (workers * 4))
+    return list(pool.map(_subset_entails, candidates, chunksize=chunksize))
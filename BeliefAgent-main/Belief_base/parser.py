@@ -11,79 +11,128 @@ TOKENS = {
     "RPAREN": ")"
 }
 
+# match any of →, ↔, ¬, ∧, ∨, parentheses or alphanumeric names, compiled once for every parse
+_TOKEN_RE = re.compile(r"\s*(→|↔|¬|∧|∨|\(|\)|[A-Za-z0-9]+)\s*")
+
 def _tokenize(expr: str):
     """Split input into tokens: parentheses, connectives, atoms."""
-    # match any of →, ↔, ¬, ∧, ∨, parentheses or alphanumeric names
-    pattern = r"\s*(→|↔|¬|∧|∨|\(|\)|[A-Za-z0-9]+)\s*"
-    tokens = re.findall(pattern, expr)
-    return tokens
+    return _TOKEN_RE.findall(expr)
+
+# Binding strength of the binary connectives, all of them group to the left: p → q → r is (p → q) → r
+# ¬ binds tighter than all of them
+_BINARY = {
+    TOKENS["EQU"]: (1, Equiv),
+    TOKENS["IMP"]: (2, Implies),
+    TOKENS["OR"]: (3, Or),
+    TOKENS["AND"]: (4, And),
+}
+_NOT_PRECEDENCE = 5
 
 def parse_formula(s: str) -> Formula:
-    """Recursive-descent parser handling parentheses depth and edge cases."""
+    """
+    Operator precedence (shunting-yard) parser: ↔ < → < ∨ < ∧ < ¬, binary connectives are left associative.
+    It works with two explicit stacks instead of recursion, so very long or deeply nested formulas parse in
+    linear time without hitting Python's recursion limit.
+    """
     tokens = _tokenize(s)
-    # We'll parse equivalences → implications → OR → AND → NOT → atoms
+    # operands holds finished subformulas, operators holds "(" and the connectives still waiting for operands
+    operands = []
+    operators = []
+    
+    # Pops one connective and combines the operands it applies to
+    def reduce_top():
+        op = operators.pop()
+        if op == TOKENS["NOT"]:
+            operands.append(Not(operands.pop()))
+        else:
+            right = operands.pop()
+            operands.append(_BINARY[op][1](operands.pop(), right))
+    
+    def precedence(op):
+        return _NOT_PRECEDENCE if op == TOKENS["NOT"] else _BINARY[op][0]
+    
+    # expect_operand is True where an atom, ¬ or ( has to come next, and False right after a complete operand
+    expect_operand = True
+    for index, t in enumerate(tokens):
+        if expect_operand:
+            if t == TOKENS["NOT"] or t == TOKENS["LPAREN"]:
+                operators.append(t)
+            elif t in _BINARY or t == TOKENS["RPAREN"]:
+                raise ValueError(f"Unexpected token: {t}")
+            else:
+                operands.append(Atom(t))
+                expect_operand = False
+        elif t in _BINARY:
+            # Everything on the stack that binds at least as tightly is complete now (this makes it left associative)
+            prec = _BINARY[t][0]
+            while operators and operators[-1] != TOKENS["LPAREN"] and precedence(operators[-1]) >= prec:
+                reduce_top()
+            operators.append(t)
+            expect_operand = True
+        elif t == TOKENS["RPAREN"]:
+            while operators and operators[-1] != TOKENS["LPAREN"]:
+                reduce_top()
+            if not operators:
+                raise ValueError(f"Extra tokens after parsing: {tokens[index:]}")
+            operators.pop()
+        elif TOKENS["LPAREN"] in operators:
+            # Two operands in a row inside parentheses, like (p q)
+            raise ValueError("Missing closing parenthesis.")
+        else:
+            raise ValueError(f"Extra tokens after parsing: {tokens[index:]}")
+    
+    if expect_operand:
+        raise ValueError("Unexpected end of tokens.")
+    while operators:
+        if operators[-1] == TOKENS["LPAREN"]:
+            raise ValueError("Missing closing parenthesis.")
+        reduce_top()
+    return operands[0]
 
-    def parse_equiv(index=0):
-        node, index = parse_imp(index)
-        while index < len(tokens) and tokens[index] == TOKENS["EQU"]:
-            index += 1
-            right_node, index = parse_imp(index)
-            node = Equiv(node, right_node)
-        return node, index
 
-    def parse_imp(index=0):
-        node, index = parse_or(index)
-        while index < len(tokens) and tokens[index] == TOKENS["IMP"]:
-            index += 1
-            right_node, index = parse_or(index)
-            node = Implies(node, right_node)
-        return node, index
+class ParseError(ValueError):
+    """A line of a belief file that could not be parsed. line_number counts from 1."""
+    def __init__(self, message: str, line_number: int, line: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.message = message
+        self.line_number = line_number
+        self.line = line
 
-    def parse_or(index=0):
-        node, index = parse_and(index)
-        while index < len(tokens) and tokens[index] == TOKENS["OR"]:
-            index += 1
-            right_node, index = parse_and(index)
-            node = Or(node, right_node)
-        return node, index
 
-    def parse_and(index=0):
-        node, index = parse_not(index)
-        while index < len(tokens) and tokens[index] == TOKENS["AND"]:
-            index += 1
-            right_node, index = parse_not(index)
-            node = And(node, right_node)
-        return node, index
+# Parses one "formula ; priority" line, the priority is 0 if it is missing
+def parse_line(line: str) -> tuple[Formula, int]:
+    if ";" in line:
+        formula_str, priority_str = line.split(";")
+        return parse_formula(formula_str.strip()), int(priority_str.strip())
+    return parse_formula(line), 0
 
-    def parse_not(index=0):
-        while index < len(tokens) and tokens[index] == TOKENS["NOT"]:
-            index += 1
-            sub_node, index = parse_not(index)
-            return Not(sub_node), index
-        return parse_atom(index)
 
-    def parse_atom(index=0):
-        if index >= len(tokens):
-            raise ValueError("Unexpected end of tokens.")
-        t = tokens[index]
-        if t == TOKENS["LPAREN"]:
-            node, new_idx = parse_equiv(index+1)
-            if new_idx >= len(tokens) or tokens[new_idx] != TOKENS["RPAREN"]:
-                raise ValueError("Missing closing parenthesis.")
-            return node, new_idx+1
-        elif re.fullmatch(r"[a-zA-Z0-9]+", t):
-            return Atom(t), index+1
-        else:
-            raise ValueError(f"Unexpected token: {t}")
+def iter_lines(lines, on_error=None):
+    """
+    Lazily parses "formula ; priority" lines and yields (Formula, priority) tuples, empty lines are skipped.
+    A bad line becomes a ParseError with its line number. If on_error is given it is called with the error and
+    parsing goes on with the next line, otherwise the error is raised.
+    Example: errors = []; list(iter_lines(["p ; 1", "p ∧"], on_error=errors.append)) gives [(p, 1)] and one error
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = parse_line(line)
+        except (ValueError, RecursionError) as e:
+            error = ParseError(str(e), line_number, line)
+            if on_error is None:
+                raise error from e
+            on_error(error)
+            continue
+        yield item
 
-    root, next_pos = parse_equiv()
-    if next_pos != len(tokens):
-        raise ValueError(f"Extra tokens after parsing: {tokens[next_pos:]}")
-    
-    # remove or comment out the debug print below
-    # print(f"Parsed formula: {root}")
-    
-    return root
+
+def iter_file(file_path: str, on_error=None):
+    """Streaming version of parse_file: the file is read one line at a time, see iter_lines for on_error."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from iter_lines(f, on_error)
 
 
 def parse_file(file_path: str) -> list[tuple[Formula, int]]:
@@ -91,23 +140,6 @@ def parse_file(file_path: str) -> list[tuple[Formula, int]]:
     Parses a file with each line formatted as: formula ; priority
     Returns a list of (Formula, priority) tuples.
     """
-    results = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                if ";" in line:
-                    formula_str, priority_str = line.split(";")
-                    formula = parse_formula(formula_str.strip())
-                    priority = int(priority_str.strip())
-                    results.append((formula, priority))
-                else:
-                    # default priority 0 if missing
-                    formula = parse_formula(line)
-                    results.append((formula, 0))
-            except Exception as e:
-                print(f"Error parsing '{line}': {e}")
-                continue
-    return results
+    def report(error: ParseError):
+        print(f"Error parsing '{error.line}': {error.message}")
+    return list(iter_file(file_path, on_error=report))
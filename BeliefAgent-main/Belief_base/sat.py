@@ -0,0 +1,441 @@
+from heapq import heappush, heappop
+from typing import Iterable, List, Optional
+
+# Conflict driven clause learning (CDCL) SAT solver written from scratch.
+# It works on the same integer literals as the resolution engine: atom 3 is the literal 3 and ¬3 is -3.
+#
+#   solver = CDCLSolver()
+#   solver.add_clause([-1, 2])   # ¬p ∨ q
+#   solver.add_clause([1])       # p
+#   solver.solve()               # True, there is a model with p and q true
+#   solver.solve([-2])           # False, no model where q is false (assumption ¬q)
+#
+# The main ingredients are:
+#   - two watched literals per clause, so unit propagation only looks at clauses whose watch became false
+#   - first unique implication point (1UIP) conflict analysis to learn a new clause from every conflict
+#   - VSIDS style branching, variables seen in recent conflicts get a higher activity and are picked first
+#   - restarts following the Luby sequence, learned clauses and activities survive a restart
+#   - assumptions, extra literals that only hold for one call to solve(), used for incremental querying
+
+class _Clause:
+    """A clause in the solver. The literals at position 0 and 1 are the watched ones."""
+    __slots__ = ("lits", "learnt", "activity", "deleted")
+
+    def __init__(self, lits, learnt=False):
+        self.lits = lits
+        self.learnt = learnt
+        self.activity = 0.0
+        self.deleted = False
+
+# The Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ... used to space out the restarts
+def _luby(i: int) -> int:
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+class CDCLSolver:
+    """
+    Incremental CDCL SAT solver over DIMACS style integer literals.
+    Clauses can be added between calls to solve(), and learned clauses are kept between calls.
+    """
+    # Number of conflicts before the first restart, later restarts are multiplied by the Luby sequence
+    RESTART_BASE = 100
+    VAR_DECAY = 0.95
+    CLAUSE_DECAY = 0.999
+
+    def __init__(self):
+        self.num_vars = 0
+        # Original (problem) clauses and learned clauses
+        self.clauses: List[_Clause] = []
+        self.learnts: List[_Clause] = []
+        # watches[lit] is the list of clauses that currently watch lit, they are visited when lit becomes false
+        self.watches = {}
+        # Per variable state, index 0 is unused so that variable v lives at index v
+        self.assigns = [0]        # 1 true, -1 false, 0 unassigned
+        self.level = [0]          # decision level the variable was assigned at
+        self.reason = [None]      # clause that forced the assignment, None for decisions
+        self.activity = [0.0]     # VSIDS score
+        self.polarity = [False]   # saved phase, the value the variable had last time
+        self.seen = [False]       # scratch space for conflict analysis
+        # The trail is every assigned literal in order, trail_lim[i] is where decision level i + 1 starts
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+        self.var_inc = 1.0
+        self.cla_inc = 1.0
+        # Heap of (-activity, var) used to pick the next branching variable. Entries can be stale,
+        # they are skipped when the variable is already assigned
+        self.heap = []
+        self.max_learnts = 1000.0
+        # False once the clauses are unsatisfiable without any assumptions
+        self.ok = True
+        # Assignment found by the last successful solve(), model[v] is True or False
+        self.model: Optional[List[bool]] = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    # ---------- variables and clauses ----------
+
+    def new_var(self) -> int:
+        """Creates a new variable and returns its number."""
+        self.num_vars += 1
+        v = self.num_vars
+        self.assigns.append(0)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.polarity.append(False)
+        self.seen.append(False)
+        self.watches[v] = []
+        self.watches[-v] = []
+        heappush(self.heap, (0.0, v))
+        return v
+
+    def ensure_vars(self, n: int):
+        """Makes sure that the variables 1..n exist."""
+        while self.num_vars < n:
+            self.new_var()
+
+    # value of a literal: 1 true, -1 false, 0 unassigned
+    def value(self, lit: int) -> int:
+        a = self.assigns[abs(lit)]
+        return a if lit > 0 else -a
+
+    def add_clause(self, lits: Iterable[int]) -> bool:
+        """
+        Adds a clause. Returns False if the clause set became unsatisfiable without any assumptions.
+        Tautologies are ignored and literals that are already false at the top level are dropped.
+        """
+        if not self.ok:
+            return False
+        # Clauses are always added at the top level
+        self._cancel_until(0)
+        lits = set(lits)
+        if lits:
+            self.ensure_vars(max(abs(l) for l in lits))
+        kept = []
+        for lit in lits:
+            if -lit in lits:
+                return True
+            val = self.value(lit)
+            if val == 1:
+                # Already satisfied for good
+                return True
+            if val == 0:
+                kept.append(lit)
+        if not kept:
+            self.ok = False
+            return False
+        if len(kept) == 1:
+            self._enqueue(kept[0], None)
+            if self._propagate() is not None:
+                self.ok = False
+                return False
+            return True
+        clause = _Clause(kept)
+        self.clauses.append(clause)
+        self._attach(clause)
+        return True
+
+    def simplify(self) -> int:
+        """
+        Drops every clause (original or learned) that is satisfied for good by a literal that is true at the top
+        level. An incremental user that switches clauses off with a unit clause ¬s calls this so the switched off
+        clauses stop costing memory and watch list visits. Returns the number of clauses dropped.
+        """
+        if not self.ok:
+            return 0
+        self._cancel_until(0)
+        if self._propagate() is not None:
+            self.ok = False
+            return 0
+        dropped = 0
+        for clauses in (self.clauses, self.learnts):
+            kept = []
+            for clause in clauses:
+                if any(self.value(lit) == 1 for lit in clause.lits):
+                    clause.deleted = True
+                    dropped += 1
+                else:
+                    kept.append(clause)
+            clauses[:] = kept
+        if dropped:
+            for lit, ws in self.watches.items():
+                self.watches[lit] = [clause for clause in ws if not clause.deleted]
+            # Top level assignments never need their reasons (conflict analysis skips level 0), and the reason
+            # may just have been dropped
+            for lit in self.trail:
+                self.reason[abs(lit)] = None
+        return dropped
+
+    def _attach(self, clause: _Clause):
+        self.watches[clause.lits[0]].append(clause)
+        self.watches[clause.lits[1]].append(clause)
+
+    # ---------- search ----------
+
+    def _decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    def _enqueue(self, lit: int, reason):
+        v = abs(lit)
+        self.assigns[v] = 1 if lit > 0 else -1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    # Undo every assignment made above the given decision level
+    def _cancel_until(self, level: int):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            # Phase saving: remember the last value for the next time we branch on v
+            self.polarity[v] = lit > 0
+            self.assigns[v] = 0
+            self.reason[v] = None
+            heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+        # Throw away the stale heap entries once in a while
+        if len(self.heap) > 4 * self.num_vars + 64:
+            self.heap = [(-self.activity[v], v) for v in range(1, self.num_vars + 1) if self.assigns[v] == 0]
+            self.heap.sort()
+
+    # Unit propagation with two watched literals, returns the conflicting clause or None
+    def _propagate(self):
+        trail = self.trail
+        assigns = self.assigns
+        watches = self.watches
+        while self.qhead < len(trail):
+            p = trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            false_lit = -p
+            ws = watches[false_lit]
+            watches[false_lit] = kept = []
+            i, n = 0, len(ws)
+            while i < n:
+                clause = ws[i]
+                i += 1
+                if clause.deleted:
+                    continue
+                lits = clause.lits
+                # Make sure the false literal is at position 1
+                if lits[0] == false_lit:
+                    lits[0], lits[1] = lits[1], false_lit
+                first = lits[0]
+                a = assigns[abs(first)]
+                if (a if first > 0 else -a) == 1:
+                    # Clause is already satisfied by the other watch
+                    kept.append(clause)
+                    continue
+                # Look for a new literal to watch that is not false
+                for k in range(2, len(lits)):
+                    lit = lits[k]
+                    a = assigns[abs(lit)]
+                    if (a if lit > 0 else -a) != -1:
+                        lits[1], lits[k] = lit, false_lit
+                        watches[lit].append(clause)
+                        break
+                else:
+                    # No new watch, the clause is unit or conflicting
+                    kept.append(clause)
+                    a = assigns[abs(first)]
+                    if (a if first > 0 else -a) == -1:
+                        kept.extend(ws[i:])
+                        self.qhead = len(trail)
+                        return clause
+                    self._enqueue(first, clause)
+        return None
+
+    def _bump_var(self, v: int):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            # Rescale every activity to avoid overflowing the floats
+            for i in range(1, self.num_vars + 1):
+                self.activity[i] *= 1e-100
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.num_vars + 1) if self.assigns[u] == 0]
+            self.heap.sort()
+        if self.assigns[v] == 0:
+            heappush(self.heap, (-self.activity[v], v))
+
+    def _bump_clause(self, clause: _Clause):
+        clause.activity += self.cla_inc
+        if clause.activity > 1e20:
+            for c in self.learnts:
+                c.activity *= 1e-20
+            self.cla_inc *= 1e-20
+
+    # 1UIP conflict analysis: walk back over the trail from the conflict until only one literal
+    # of the current decision level is left. Returns the learned clause and the level to jump back to
+    def _analyze(self, conflict: _Clause):
+        seen = self.seen
+        learnt = [0]  # position 0 is filled with the asserting literal at the end
+        path_count = 0
+        p = None
+        index = len(self.trail) - 1
+        current = self._decision_level()
+        clause = conflict
+        while True:
+            if clause.learnt:
+                self._bump_clause(clause)
+            # For a reason clause the implied literal p sits at position 0 and is skipped
+            for q in (clause.lits if p is None else clause.lits[1:]):
+                v = abs(q)
+                if not seen[v] and self.level[v] > 0:
+                    seen[v] = True
+                    self._bump_var(v)
+                    if self.level[v] >= current:
+                        path_count += 1
+                    else:
+                        learnt.append(q)
+            # Next literal of the trail that takes part in the conflict
+            while not seen[abs(self.trail[index])]:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            clause = self.reason[abs(p)]
+            seen[abs(p)] = False
+            path_count -= 1
+            if path_count == 0:
+                break
+        learnt[0] = -p
+        for q in learnt[1:]:
+            seen[abs(q)] = False
+        # Backjump to the second highest level in the clause and watch that literal
+        if len(learnt) == 1:
+            return learnt, 0
+        best = 1
+        for i in range(2, len(learnt)):
+            if self.level[abs(learnt[i])] > self.level[abs(learnt[best])]:
+                best = i
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def _pick_branch_lit(self):
+        while self.heap:
+            _, v = heappop(self.heap)
+            if self.assigns[v] == 0:
+                return v if self.polarity[v] else -v
+        return None
+
+    # Forget half of the learned clauses, the ones with the lowest activity first.
+    # Binary clauses and clauses that are currently a reason are kept
+    def _reduce_db(self):
+        self.learnts.sort(key=lambda c: c.activity)
+        limit = len(self.learnts) // 2
+        kept = []
+        for i, clause in enumerate(self.learnts):
+            first = clause.lits[0]
+            locked = self.reason[abs(first)] is clause and self.value(first) == 1
+            if i < limit and len(clause.lits) > 2 and not locked:
+                clause.deleted = True
+            else:
+                kept.append(clause)
+        self.learnts = kept
+
+    def _search(self, conflict_budget: int, assumptions: List[int], meter=None):
+        conflicts_here = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts_here += 1
+                if self._decision_level() == 0:
+                    self.ok = False
+                    return False
+                learnt, back_level = self._analyze(conflict)
+                if meter is not None:
+                    # Every learned clause counts against the budget, and the limits are checked once per conflict
+                    meter.add(learnt)
+                    meter.check()
+                self._cancel_until(back_level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    clause = _Clause(learnt, learnt=True)
+                    self.learnts.append(clause)
+                    self._attach(clause)
+                    self._bump_clause(clause)
+                    self._enqueue(learnt[0], clause)
+                self.var_inc /= self.VAR_DECAY
+                self.cla_inc /= self.CLAUSE_DECAY
+                continue
+
+            if conflicts_here >= conflict_budget:
+                # Restart
+                self._cancel_until(0)
+                return None
+            if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                self._reduce_db()
+
+            # Assumptions are decided first, one per decision level
+            next_lit = None
+            while self._decision_level() < len(assumptions):
+                lit = assumptions[self._decision_level()]
+                val = self.value(lit)
+                if val == 1:
+                    # Already true, open an empty level so that the levels stay in line with the assumptions
+                    self.trail_lim.append(len(self.trail))
+                elif val == -1:
+                    # The clauses force the assumption to be false
+                    return False
+                else:
+                    next_lit = lit
+                    break
+            if next_lit is None:
+                next_lit = self._pick_branch_lit()
+                if next_lit is None:
+                    # Every variable is assigned without conflict, we have a model
+                    self.model = [False] + [a > 0 for a in self.assigns[1:]]
+                    return True
+                self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(next_lit, None)
+
+    def solve(self, assumptions: Iterable[int] = (), budget=None) -> bool:
+        """
+        Returns True if the clauses together with the assumption literals are satisfiable.
+        On success the assignment is stored in self.model.
+        With a budget (see budget.py) it raises BudgetExceeded when a limit is hit. The solver is left at level 0
+        with its learned clauses, so it can be used again afterwards.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        assumptions = list(assumptions)
+        if assumptions:
+            self.ensure_vars(max(abs(l) for l in assumptions))
+        self._cancel_until(0)
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+        self.max_learnts = max(self.max_learnts, len(self.clauses) / 3)
+        meter = budget.start() if budget is not None else None
+        restarts = 0
+        try:
+            while True:
+                status = self._search(self.RESTART_BASE * _luby(restarts), assumptions, meter)
+                if status is not None:
+                    break
+                restarts += 1
+                self.max_learnts *= 1.1
+        finally:
+            self._cancel_until(0)
+        return status
+
+    def model_value(self, lit: int) -> bool:
+        """Truth value of a literal in the last model found."""
+        value = self.model[abs(lit)]
+        return value if lit > 0 else not value
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from typing import Iterable
+from Belief_base import metrics
+from Belief_base.formula import Formula
+from Belief_base.entailment import negated_query_clauses
+from Belief_base.sat import CDCLSolver
+from Belief_base.symbols import SymbolTable, IntClause
+from Belief_base.tseitin import DISTRIBUTE
+
+"""
+A long lived incremental SAT session for one belief base.
+
+Every belief gets a selector atom s and its clauses are stored guarded by it: the clause (¬p ∨ q) of belief 4
+is added as (¬s4 ∨ ¬p ∨ q). Assuming s4 switches the belief on, assuming ¬s4 switches it off. The negated query
+gets an activation atom the same way. So "does the subset {0, 2} entail φ" is a single solve() call
+
+    assumptions: s0, ¬s1, s2, a_φ        unsatisfiable  ⇔  {B0, B2} ⊨ φ
+
+on one solver that keeps its learned clauses between calls. Learned clauses only mention selectors negatively
+(they are consequences of the guarded clauses), so they stay valid for every later subset and query.
+
+A selector or activation atom that is no longer needed (removed belief, query dropped from the MAX_QUERIES most
+recent, finished enumeration) is retired with the unit clause ¬s, which satisfies every clause it guards. Every
+GC_INTERVAL retirements those clauses are dropped from the solver (CDCLSolver.simplify). The retired atoms are
+still variables of the solver, so after MAX_RETIRED of them the solver is rebuilt from the live beliefs alone,
+which also forgets the learned clauses and the loaded queries.
+
+The session numbers its variables itself: atom numbers of the symbol table are mapped to solver variables the first
+time they are used and selectors are new solver variables, so no selector is added to the shared symbol table and a
+rebuild starts again from the atoms the live beliefs use. The scratch atoms of a Tseitin query (see tseitin.py) are
+reused by every encoding, so they are mapped to solver variables of their own for each loaded query.
+"""
+class SolverSession:
+    # Number of negated queries kept loaded, the oldest one is retired when there are more
+    MAX_QUERIES = 64
+    # Retired atoms between two clean ups of the clauses they switched off
+    GC_INTERVAL = 64
+    # Retired atoms before the solver is rebuilt from the live beliefs
+    MAX_RETIRED = 1024
+
+    def __init__(self, symbols: SymbolTable, cnf_mode: str = DISTRIBUTE):
+        self.symbols = symbols
+        self.cnf_mode = cnf_mode
+        # belief id -> its clauses, numbered with the symbol table, kept to load them again after a rebuild
+        self.beliefs = {}
+        # Running maximal_satisfiable_subsets enumerations, the solver is not rebuilt under them
+        self._enumerations = 0
+        self._reset()
+
+    # A new empty solver with all live beliefs loaded
+    def _reset(self):
+        self.solver = CDCLSolver()
+        # symbol table atom -> solver variable
+        self._vars = {}
+        # belief id -> selector atom
+        self.selectors = {}
+        # query formula -> activation atom, least recently used first
+        self.queries = OrderedDict()
+        self.retired = 0
+        for belief_id, clauses in self.beliefs.items():
+            self._load_belief(belief_id, clauses)
+
+    # The solver literal for a literal of the symbol table
+    def _literal(self, lit: int) -> int:
+        var = self._vars.get(abs(lit))
+        if var is None:
+            var = self._vars[abs(lit)] = self.solver.new_var()
+        return var if lit > 0 else -var
+
+    # Adds clause guarded by the atom: (¬guard ∨ clause)
+    def _add_guarded(self, guard: int, clause: IntClause):
+        self.solver.add_clause([-guard] + [self._literal(lit) for lit in clause])
+
+    # Switches a selector or activation atom off for good, and cleans up or rebuilds the solver when it is time
+    def _retire(self, atom: int):
+        self.solver.add_clause((-atom,))
+        self.retired += 1
+        if self.retired >= self.MAX_RETIRED and not self._enumerations:
+            if metrics.ENABLED:
+                metrics.count("session.rebuilds")
+            self._reset()
+        elif self.retired % self.GC_INTERVAL == 0:
+            dropped = self.solver.simplify()
+            if metrics.ENABLED:
+                metrics.count("session.dropped", dropped)
+
+    def _load_belief(self, belief_id: int, clauses: Iterable[IntClause]):
+        selector = self.solver.new_var()
+        for clause in clauses:
+            self._add_guarded(selector, clause)
+        self.selectors[belief_id] = selector
+
+    # Loads the clauses of a belief (already encoded with the same symbol table), guarded by a new selector atom
+    def add_belief(self, belief_id: int, clauses: Iterable[IntClause]):
+        self.beliefs[belief_id] = clauses
+        self._load_belief(belief_id, clauses)
+
+    # A removed belief is switched off for good with the unit clause ¬s, its clauses are then always satisfied
+    def remove_belief(self, belief_id: int):
+        self.beliefs.pop(belief_id, None)
+        selector = self.selectors.pop(belief_id, None)
+        if selector is not None:
+            self._retire(selector)
+
+    # Activation atom for ¬query, the clauses are only loaded the first time a query is seen
+    def _query_literal(self, query: Formula) -> int:
+        literal = self.queries.get(query)
+        if literal is not None:
+            self.queries.move_to_end(query)
+            return literal
+        literal = self.solver.new_var()
+        scratch = {}
+        for clause in negated_query_clauses(query, self.symbols, self.cnf_mode):
+            lits = [-literal]
+            for lit in clause:
+                if self.symbols.is_scratch(lit):
+                    var = scratch.get(abs(lit))
+                    if var is None:
+                        var = scratch[abs(lit)] = self.solver.new_var()
+                    lits.append(var if lit > 0 else -var)
+                else:
+                    lits.append(self._literal(lit))
+            self.solver.add_clause(lits)
+        self.queries[query] = literal
+        if len(self.queries) > self.MAX_QUERIES:
+            _, oldest = self.queries.popitem(last=False)
+            self._retire(oldest)
+            # A rebuild dropped every query, this one included
+            if query not in self.queries:
+                return self._query_literal(query)
+        return literal
+
+    def entails(self, belief_ids: Iterable[int], query: Formula, budget=None) -> bool:
+        """Does the set of beliefs with the given ids entail query? Beliefs that are not listed are switched off."""
+        # Loading the query can rebuild the solver, so it comes before the selectors are read
+        query_literal = self._query_literal(query)
+        included = set(belief_ids)
+        assumptions = [s if belief_id in included else -s for belief_id, s in self.selectors.items()]
+        assumptions.append(query_literal)
+        # Unsatisfiable means the chosen beliefs together with ¬query have no model
+        return not self.solver.solve(assumptions, budget)
+
+    def consistent(self, belief_ids: Iterable[int], budget=None) -> bool:
+        """Do the beliefs with the given ids have a model together?"""
+        included = set(belief_ids)
+        assumptions = [s if belief_id in included else -s for belief_id, s in self.selectors.items()]
+        return self.solver.solve(assumptions, budget)
+
+    def maximal_satisfiable_subsets(self, query: Formula, budget=None):
+        """
+        Yields every maximal set of belief ids that is consistent with ¬query, so every maximal subset that does not
+        entail query. Their complements are the minimal correction subsets (MCS) of B ∪ {¬query} with ¬query hard.
+
+        Each round finds a model, grows the beliefs it satisfies into a maximal set one belief at a time, and then
+        blocks that set with a clause saying "at least one belief outside it must be on". The cost grows with the
+        number of remainders instead of with the 2^n subsets.
+        Every solver call gets the budget on its own, BudgetExceeded stops the enumeration.
+        """
+        query_literal = self._query_literal(query)
+        # The blocking clauses only hold while this atom is assumed, so they never affect later questions
+        block = self.solver.new_var()
+        solver = self.solver
+        self._enumerations += 1
+        try:
+            while solver.solve([query_literal, block], budget):
+                # Start from every belief that is already satisfied by the model
+                current = {i for i, s in self.selectors.items() if solver.model_value(s)}
+                # Grow: try to switch on each remaining belief
+                for belief_id, selector in self.selectors.items():
+                    if belief_id in current:
+                        continue
+                    assumptions = [query_literal, selector] + [self.selectors[i] for i in current]
+                    if solver.solve(assumptions, budget):
+                        current |= {i for i, s in self.selectors.items() if solver.model_value(s)}
+                yield current
+                # Block every subset of current: one of the beliefs outside it has to be switched on
+                outside = [s for i, s in self.selectors.items() if i not in current]
+                solver.add_clause([-block] + outside)
+        finally:
+            # Retire the blocking clauses for good
+            self._enumerations -= 1
+            self._retire(block)
@@ -0,0 +1,205 @@
+import mmap
+import struct
+import sys
+from array import array
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, And, Or, Implies, Equiv
+from Belief_base.tseitin import CNF_MODES
+
+"""
+Binary snapshots of a compiled BeliefBase, so a restarted agent does not have to parse and convert to CNF again.
+
+File layout (all numbers little endian):
+
+    header    magic, format version, cnf mode, number of symbols, number of beliefs and the offset of every section
+    symbols   for each atom number 1, 2, ...: a flag (1 = named atom, 0 = auxiliary atom) and its UTF-8 name
+    formulas  the nodes of the stored formulas, children before parents, shared subformulas written once
+    beliefs   for each belief in priority order: priority, root formula node, where its clauses start and how many
+              ints they take
+    clauses   one int32 stream, every clause is written as its length followed by its literals
+
+load_snapshot maps the file into memory. The symbol table and the formulas are read right away, the clauses of a
+belief are only decoded from the mapped file the first time something needs them, so the agent can answer ask
+without running to_cnf and without reading clauses it never uses.
+"""
+
+MAGIC = b"BBSNAP\x00\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIII4Q")
+_BELIEF = struct.Struct("<qIQI")
+_U32 = struct.Struct("<I")
+
+# Formula classes and their codes in the file
+_NODE_TYPES = (Atom, Not, And, Or, Implies, Equiv)
+_NODE_CODES = {cls: code for code, cls in enumerate(_NODE_TYPES)}
+
+
+class SnapshotError(ValueError):
+    """The file is not a belief base snapshot this version can read."""
+
+
+# Little endian int32 array from raw bytes, whatever the byte order of this machine is
+def _int32s(data) -> array:
+    values = array("i")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _int32_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("i", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+# Writes every distinct node reachable from the roots, children first, and returns node -> position in the file
+# Iterative on purpose, formulas coming from the parser can be nested far deeper than the recursion limit
+def _write_nodes(roots, out: bytearray):
+    position = {}
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if node in position:
+                continue
+            cls = type(node)
+            if cls is Atom:
+                name = node.name.encode("utf-8")
+                out += bytes((_NODE_CODES[cls],)) + _U32.pack(len(name)) + name
+            elif not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children()) if child not in position)
+                continue
+            else:
+                children = node.children()
+                out += bytes((_NODE_CODES[cls],)) + _U32.pack(len(children))
+                out += b"".join(_U32.pack(position[child]) for child in children)
+            position[node] = len(position)
+    return position
+
+def _read_nodes(buffer, offset: int, count: int):
+    nodes = []
+    for _ in range(count):
+        cls = _NODE_TYPES[buffer[offset]]
+        (size,) = _U32.unpack_from(buffer, offset + 1)
+        offset += 5
+        if cls is Atom:
+            nodes.append(Atom(bytes(buffer[offset:offset + size]).decode("utf-8")))
+            offset += size
+        else:
+            children = struct.unpack_from(f"<{size}I", buffer, offset)
+            offset += 4 * size
+            nodes.append(cls(*(nodes[i] for i in children)))
+    return nodes
+
+
+def save_snapshot(kb: BeliefBase, path: str):
+    """Writes kb to path, see the layout above."""
+    names = bytearray()
+    for num in range(1, len(kb.symbols) + 1):
+        name = kb.symbols.names[num].encode("utf-8")
+        names += bytes((0 if kb.symbols.is_auxiliary(num) else 1,)) + _U32.pack(len(name)) + name
+
+    nodes = bytearray()
+    formulas = [formula for formula, _ in kb.beliefs]
+    position = _write_nodes(formulas, nodes)
+
+    beliefs = bytearray()
+    clauses = array("i")
+    for (formula, priority), belief_id in zip(kb.beliefs, kb._ids):
+        start = len(clauses)
+        for clause in kb._clauses[belief_id]:
+            clauses.append(len(clause))
+            clauses.extend(clause)
+        beliefs += _BELIEF.pack(priority, position[formula], start, len(clauses) - start)
+
+    names_at = _HEADER.size
+    nodes_at = names_at + len(names)
+    beliefs_at = nodes_at + 4 + len(nodes)
+    clauses_at = beliefs_at + len(beliefs)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, CNF_MODES.index(kb.cnf_mode), len(kb.symbols), len(kb.beliefs),
+                          names_at, nodes_at, beliefs_at, clauses_at)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(names)
+        f.write(_U32.pack(len(position)))
+        f.write(nodes)
+        f.write(beliefs)
+        f.write(_int32_bytes(clauses))
+
+
+class _MappedClauses(dict):
+    """
+    belief id -> clauses, filled from the mapped snapshot the first time a belief is looked up.
+    Beliefs added after loading are stored in the dict as usual.
+    """
+    def __init__(self, buffer, clauses_at: int, spans):
+        super().__init__()
+        self._buffer = buffer
+        self._clauses_at = clauses_at
+        # belief id -> (first int, number of ints) in the clause stream, for the beliefs not decoded yet
+        self._spans = spans
+
+    def __missing__(self, belief_id):
+        start, size = self._spans.pop(belief_id)
+        at = self._clauses_at + 4 * start
+        ints = _int32s(self._buffer[at:at + 4 * size])
+        clauses = []
+        i = 0
+        while i < len(ints):
+            length = ints[i]
+            clauses.append(tuple(ints[i + 1:i + 1 + length]))
+            i += 1 + length
+        self[belief_id] = clauses
+        return clauses
+
+    def pop(self, belief_id, *default):
+        if belief_id in self._spans:
+            self[belief_id]
+        return super().pop(belief_id, *default)
+
+
+def load_snapshot(path: str) -> BeliefBase:
+    """Builds a BeliefBase from a snapshot written by save_snapshot, without any CNF conversion."""
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            raise SnapshotError(f"{path} is empty") from None
+    if len(buffer) < _HEADER.size:
+        raise SnapshotError(f"{path} is too short to be a snapshot")
+    magic, version, mode, n_symbols, n_beliefs, names_at, nodes_at, beliefs_at, clauses_at = \
+        _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a belief base snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"{path} has snapshot format {version}, only {FORMAT_VERSION} is supported")
+
+    kb = BeliefBase(CNF_MODES[mode])
+    offset = names_at
+    for num in range(1, n_symbols + 1):
+        named = buffer[offset]
+        (size,) = _U32.unpack_from(buffer, offset + 1)
+        name = bytes(buffer[offset + 5:offset + 5 + size]).decode("utf-8")
+        offset += 5 + size
+        kb.symbols.names.append(name)
+        if named:
+            kb.symbols.ids[name] = num
+
+    (n_nodes,) = _U32.unpack_from(buffer, nodes_at)
+    nodes = _read_nodes(buffer, nodes_at + 4, n_nodes)
+
+    spans = {}
+    for belief_id in range(n_beliefs):
+        priority, root, start, size = _BELIEF.unpack_from(buffer, beliefs_at + belief_id * _BELIEF.size)
+        kb.beliefs.append((nodes[root], priority))
+        kb._ids.append(belief_id)
+        spans[belief_id] = (start, size)
+    kb._next_id = n_beliefs
+    kb._clauses = _MappedClauses(buffer, clauses_at, spans)
+    # The index and the consistency answer need every clause, they are worked out when first asked for
+    kb._atom_index = None
+    kb._consistent = None if n_beliefs else True
+    return kb
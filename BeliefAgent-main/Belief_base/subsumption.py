@@ -0,0 +1,105 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Set
+from Belief_base.symbols import IntClause
+
+"""
+Subsumption between integer clauses.
+
+A clause C subsumes a clause D when every literal of C is also in D, for example (p) subsumes (p ∨ q). Any model of
+C is a model of D, so next to C the clause D says nothing new and can be dropped from a clause set without changing
+its models.
+
+ClauseIndex keeps a set of clauses so both directions can be answered without comparing against every clause:
+
+    forward    is the new clause subsumed by a stored one?   only stored clauses whose first literal is in it can be
+    backward   which stored clauses does the new one subsume? only clauses in the occurrence list of its rarest literal
+
+and every candidate is first compared by signature: a 64 bit mask with one bit per literal, so C ⊆ D is only worth
+checking when sig(C) & ~sig(D) == 0.
+"""
+
+# One bit per literal, folded into 64 bits. p (1) and ¬p (-1) get different bits
+def signature(clause: IntClause) -> int:
+    sig = 0
+    for lit in clause:
+        sig |= 1 << ((2 * abs(lit) + (lit < 0)) & 63)
+    return sig
+
+# Does clause c subsume clause d?
+def subsumes(c: IntClause, d: IntClause) -> bool:
+    return len(c) <= len(d) and signature(c) & ~signature(d) == 0 and set(c) <= set(d)
+
+
+class ClauseIndex:
+    """A set of clauses that can answer forward and backward subsumption questions, see above."""
+    def __init__(self, clauses: Iterable[IntClause] = ()):
+        # clause -> signature, this is also the set of stored clauses
+        self._signatures: Dict[IntClause, int] = {}
+        # literal -> stored clauses that contain it
+        self._occurs: Dict[int, Set[IntClause]] = defaultdict(set)
+        # literal -> stored clauses whose first literal it is
+        self._first: Dict[int, Set[IntClause]] = defaultdict(set)
+        for clause in clauses:
+            self.add(clause)
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, clause):
+        return clause in self._signatures
+
+    def __iter__(self):
+        return iter(self._signatures)
+
+    def add(self, clause: IntClause):
+        if clause in self._signatures:
+            return
+        self._signatures[clause] = signature(clause)
+        for lit in clause:
+            self._occurs[lit].add(clause)
+        if clause:
+            self._first[clause[0]].add(clause)
+
+    def remove(self, clause: IntClause):
+        if self._signatures.pop(clause, None) is None:
+            return
+        for lit in clause:
+            self._occurs[lit].discard(clause)
+        if clause:
+            self._first[clause[0]].discard(clause)
+
+    # Forward: yields the stored clauses that subsume clause (clause itself too, if it is stored)
+    # A stored C ⊆ clause has its first literal in clause, so only those lists are looked at, and each C only once
+    def subsuming(self, clause: IntClause) -> Iterator[IntClause]:
+        if () in self._signatures:
+            yield ()
+        sig = signature(clause)
+        for lit in clause:
+            for stored in self._first.get(lit, ()):
+                if len(stored) <= len(clause) and self._signatures[stored] & ~sig == 0 and set(stored) <= set(clause):
+                    yield stored
+
+    # Backward: the stored clauses (other than clause itself) that clause subsumes
+    # Every one of them contains all literals of clause, so the shortest occurrence list has all of them
+    def subsumed_by(self, clause: IntClause) -> List[IntClause]:
+        if not clause:
+            return [stored for stored in self._signatures if stored]
+        candidates = min((self._occurs.get(lit, ()) for lit in clause), key=len)
+        sig = signature(clause)
+        literals = set(clause)
+        return [stored for stored in candidates
+                if len(stored) > len(clause) and sig & ~self._signatures[stored] == 0 and literals <= set(stored)]
+
+
+# The clauses that are not subsumed by another clause of the list, in their original order, duplicates dropped
+# Example: [(1, 2), (1,), (2, 3), (1,)] gives [(1,), (2, 3)]
+def remove_subsumed(clauses: Iterable[IntClause]) -> List[IntClause]:
+    clauses = list(dict.fromkeys(clauses))
+    if len(clauses) < 2:
+        return clauses
+    index = ClauseIndex()
+    # Shorter clauses first, then a clause can only be subsumed by one that is already in the index
+    for clause in sorted(clauses, key=len):
+        if next(index.subsuming(clause), None) is None:
+            index.add(clause)
+    return [clause for clause in clauses if clause in index]
@@ -0,0 +1,76 @@
+from typing import Dict, FrozenSet, List, Tuple
+
+# A literal is a signed integer in DIMACS style: atom number 3 is the literal 3, its negation is -3
+IntLiteral = int
+# A clause is a sorted tuple of integer literals, so (-1, 2) means ¬p ∨ q when p = 1 and q = 2
+IntClause = Tuple[int, ...]
+
+class SymbolTable:
+    """
+    Maps atom names to positive integers so that clauses can be stored as tuples of ints.
+    Index 0 is never used because 0 has no sign.
+    """
+    def __init__(self):
+        # name -> number, for example {"p": 1, "q": 2}
+        self.ids: Dict[str, int] = {}
+        # number -> name, names[1] == "p". Position 0 is a placeholder
+        self.names: List[str] = [""]
+
+    def __len__(self):
+        # Number of atoms in the table (not counting the placeholder)
+        return len(self.names) - 1
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    # Returns the number of an atom, allocating a new one the first time we see the name
+    # Example: table.atom("p") gives 1, table.atom("q") gives 2, table.atom("p") gives 1 again
+    def atom(self, name: str) -> int:
+        num = self.ids.get(name)
+        if num is None:
+            num = len(self.names)
+            self.ids[name] = num
+            self.names.append(name)
+        return num
+
+    # Allocates an auxiliary atom (used by the Tseitin encoding) that has no user visible name.
+    # It gets a display name like "_7" which the parser can never produce, so it can not clash with a real atom
+    def fresh(self) -> int:
+        num = len(self.names)
+        self.names.append(f"_{num}")
+        return num
+
+    # Auxiliary atoms are the ones that were never looked up by name
+    def is_auxiliary(self, num: int) -> bool:
+        return self.ids.get(self.names[num]) != num
+
+    # Numbers past the end of the table are scratch atoms: auxiliary atoms of one encoding (a Tseitin query, see
+    # tseitin.py) that are never stored here. The next atom added to the table can get the same number, so scratch
+    # literals only mean something inside the clause list they came with
+    def is_scratch(self, lit: IntLiteral) -> bool:
+        return abs(lit) >= len(self.names)
+
+    # ("p", True) becomes 1 and ("p", False) becomes -1
+    def literal(self, name: str, positive: bool = True) -> IntLiteral:
+        num = self.atom(name)
+        return num if positive else -num
+
+    # -1 becomes ("p", False), this is the translation back to the public (name, is_positive) form
+    # A scratch atom gets the display name it would have had as a fresh atom
+    def decode_literal(self, lit: IntLiteral) -> Tuple[str, bool]:
+        num = abs(lit)
+        return (self.names[num] if num < len(self.names) else f"_{num}", lit > 0)
+
+    # (-1, 2) becomes frozenset({("p", False), ("q", True)})
+    def decode_clause(self, clause: IntClause) -> FrozenSet[Tuple[str, bool]]:
+        return frozenset(self.decode_literal(lit) for lit in clause)
+
+
+# Builds the canonical clause form from any iterable of literals: duplicates are removed and the literals are sorted
+def make_clause(literals) -> IntClause:
+    return tuple(sorted(set(literals)))
+
+# A clause is a tautology if it contains some literal together with its negation, like (-1, 1)
+def is_int_tautology(clause: IntClause) -> bool:
+    lits = set(clause)
+    return any(-lit in lits for lit in lits)
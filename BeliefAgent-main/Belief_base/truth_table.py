@@ -0,0 +1,109 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+from Belief_base.symbols import IntClause
+
+"""
+Truth tables as Python ints, one bit per assignment.
+
+With n atoms there are 2^n assignments. Assignment number a makes atom k true exactly when bit k of a is set, so
+the table of atom k is the int whose bit a is that bit of a. For n = 2:
+
+    assignment a    3 2 1 0
+    atom 0 (p)      1 0 1 0     = 0b1010
+    atom 1 (q)      1 1 0 0     = 0b1100
+    p ∧ ¬q          0 0 1 0     = 0b1010 & ~0b1100
+
+Every connective is one bitwise operation over all 2^n assignments at once, so the table of a whole belief base is
+a handful of big int operations, and KB ⊨ φ is KB_table & ~φ_table == 0 (no model of KB is a model of ¬φ).
+A table takes 2^n bits, which is why this is only used for small vocabularies (MAX_ATOMS).
+"""
+
+# Up to this many atoms a table is 8 KiB and a check over a few dozen beliefs takes well under a millisecond. Each
+# extra atom doubles both, and around 20 atoms resolution is faster again on the easy bases contraction sees
+MAX_ATOMS = 16
+
+# (tables of atoms 0 .. n-1, table of "true") for n atoms
+# The table of atom k is 2^k zeros then 2^k ones, repeated. It is built by doubling the pattern with shifts, which
+# stays linear in 2^n (a division by 2^(2^(k+1)) - 1 would do the same but takes seconds at 20 atoms)
+@lru_cache(maxsize=4)
+def atom_tables(n: int) -> Tuple[Tuple[int, ...], int]:
+    size = 1 << n
+    tables = []
+    for k in range(n):
+        width = 1 << k
+        table = ((1 << width) - 1) << width
+        period = 2 * width
+        while period < size:
+            table |= table << period
+            period *= 2
+        tables.append(table)
+    return tuple(tables), (1 << size) - 1
+
+# Names of the atoms in the formulas, without recursion (parsed formulas can be nested very deep)
+def formula_atoms(formulas: Iterable[Formula]) -> set:
+    names = set()
+    seen = set()
+    stack = list(formulas)
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if isinstance(node, Atom):
+            names.add(node.name)
+        else:
+            stack.extend(node.children())
+    return names
+
+# Table of a formula. columns maps atom name -> table of that atom, memo maps formula -> table and is shared between
+# calls with the same columns, so a belief is only evaluated once for all the subsets it appears in
+def formula_table(formula: Formula, columns: Dict[str, int], everything: int, memo: Dict[Formula, int]) -> int:
+    stack = [(formula, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if node in memo:
+            continue
+        if isinstance(node, Atom):
+            memo[node] = columns[node.name]
+            continue
+        children = node.children()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children if child not in memo)
+            continue
+        if isinstance(node, Not):
+            table = everything ^ memo[node.formula]
+        elif isinstance(node, And):
+            table = everything
+            for child in node.formulas:
+                table &= memo[child]
+        elif isinstance(node, Or):
+            table = 0
+            for child in node.formulas:
+                table |= memo[child]
+        elif isinstance(node, Implies):
+            table = (everything ^ memo[node.premise]) | memo[node.conclusion]
+        elif isinstance(node, Equiv):
+            table = everything ^ (memo[node.left] ^ memo[node.right])
+        else:
+            raise ValueError(f"Unsupported formula: {node}")
+        memo[node] = table
+    return memo[formula]
+
+# Table of a set of integer clauses, atom numbers are first renumbered to 0 .. n-1
+# Stops early once no assignment is left. Returns 0 exactly when the clauses are unsatisfiable
+def clauses_table(clauses: Sequence[IntClause], atoms: List[int], meter=None) -> int:
+    tables, everything = atom_tables(len(atoms))
+    column = {atom: tables[k] for k, atom in enumerate(atoms)}
+    result = everything
+    for clause in clauses:
+        if meter is not None:
+            meter.check()
+        table = 0
+        for lit in clause:
+            table |= column[lit] if lit > 0 else everything ^ column[-lit]
+        result &= table
+        if not result:
+            break
+    return result
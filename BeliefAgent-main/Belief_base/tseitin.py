@@ -0,0 +1,176 @@
+from typing import Dict, List, Set, Tuple
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+from Belief_base.symbols import SymbolTable, IntClause, make_clause
+from Belief_base.truth_table import formula_atoms
+
+# The two ways a formula can be turned into clauses:
+# "distribute" uses Formula.to_cnf, which distributes ∨ over ∧ and gives an equivalent CNF (can be exponential)
+# "tseitin" names subformulas with fresh auxiliary atoms and gives an equisatisfiable CNF of linear size
+DISTRIBUTE = "distribute"
+TSEITIN = "tseitin"
+CNF_MODES = (DISTRIBUTE, TSEITIN)
+
+"""
+Plaisted-Greenbaum version of the Tseitin transformation.
+
+Every compound subformula gets a fresh atom x that stands for it. Example for (p ∧ q) ∨ r:
+
+    x ↔ (p ∧ q) would be (¬x ∨ p) ∧ (¬x ∨ q) ∧ (x ∨ ¬p ∨ ¬q)
+
+but (p ∧ q) only occurs positively, so only x → (p ∧ q) is needed and we get
+
+    (¬x ∨ p) ∧ (¬x ∨ q) ∧ (x ∨ r)
+
+The result is not equivalent to the formula (it talks about x) but it is satisfiable exactly when the formula is,
+and that is all refutation needs. A chain of n biconditionals gives O(n) clauses instead of 2^n.
+
+The auxiliary atoms of a belief come from SymbolTable.fresh(), they have no user visible name, so they never show up
+in a BeliefBase and can not be mixed up with real atoms. A query is encoded again and again (caches forget it,
+sessions are rebuilt), so its auxiliary atoms are scratch atoms instead: numbered from len(symbols) + 1 on and never
+stored in the table, every encoding reuses the same numbers (see SymbolTable.is_scratch).
+"""
+class _Encoder:
+    def __init__(self, symbols: SymbolTable, scratch: bool = False):
+        self.symbols = symbols
+        # Next scratch number, None when the auxiliary atoms are taken from the symbol table
+        self.next_scratch = len(symbols.names) if scratch else None
+        self.clauses: List[IntClause] = []
+        # Literal chosen for each compound subformula, so shared subformulas are only named once
+        self.names: Dict[Formula, int] = {}
+        # (subformula, polarity) pairs whose defining clauses were already emitted
+        self.done: Set[Tuple[Formula, int]] = set()
+        # (subformula, polarity) pairs handed out by literal whose defining clauses still have to be emitted
+        self.pending: List[Tuple[Formula, int]] = []
+
+    # The literal that stands for node: the atom number for an atom, the negated literal for ¬A and the name of the
+    # subformula for anything else. The ¬ in front are counted off in a loop, parsed formulas can be deeply nested
+    def _name(self, node: Formula) -> int:
+        sign = 1
+        while isinstance(node, Not):
+            node, sign = node.formula, -sign
+        if isinstance(node, Atom):
+            return sign * self.symbols.atom(node.name)
+        x = self.names.get(node)
+        if x is None:
+            x = self._fresh()
+            self.names[node] = x
+        return sign * x
+
+    # Returns a literal that stands for node. polarity +1 means we only need literal → node,
+    # -1 means we only need node → literal and 0 means both (used below ↔)
+    # The clauses that say so are queued and emitted by define_pending, so nothing here recurses into the children
+    def literal(self, node: Formula, polarity: int) -> int:
+        self.pending.append((node, polarity))
+        return self._name(node)
+
+    # Emits the defining clauses of everything literal queued. define queues the children of each node in turn, so a
+    # formula nested deeper than the recursion limit is handled with this one loop
+    def define_pending(self):
+        while self.pending:
+            node, polarity = self.pending.pop()
+            # ¬A is named by the negation of the literal for A, with the polarity flipped
+            while isinstance(node, Not):
+                node, polarity = node.formula, -polarity
+            if isinstance(node, Atom):
+                continue
+            x = self.names[node]
+            for pol in ((1, -1) if polarity == 0 else (polarity,)):
+                if (node, pol) not in self.done:
+                    self.done.add((node, pol))
+                    self.define(node, x, pol)
+
+    def _fresh(self) -> int:
+        if self.next_scratch is None:
+            return self.symbols.fresh()
+        self.next_scratch += 1
+        return self.next_scratch - 1
+
+    # Emits the clauses for x → node (pol = +1) or node → x (pol = -1)
+    def define(self, node: Formula, x: int, pol: int):
+        emit = self.clauses.append
+        if isinstance(node, And):
+            lits = [self.literal(f, pol) for f in node.formulas]
+            if pol > 0:
+                # x → A ∧ B gives (¬x ∨ A) ∧ (¬x ∨ B)
+                for lit in lits:
+                    emit(make_clause((-x, lit)))
+            else:
+                # A ∧ B → x gives (x ∨ ¬A ∨ ¬B)
+                emit(make_clause([x] + [-lit for lit in lits]))
+        elif isinstance(node, Or):
+            lits = [self.literal(f, pol) for f in node.formulas]
+            if pol > 0:
+                # x → A ∨ B gives (¬x ∨ A ∨ B)
+                emit(make_clause([-x] + lits))
+            else:
+                # A ∨ B → x gives (x ∨ ¬A) ∧ (x ∨ ¬B)
+                for lit in lits:
+                    emit(make_clause((x, -lit)))
+        elif isinstance(node, Implies):
+            # A → B is ¬A ∨ B, so A appears with the opposite polarity
+            a = self.literal(node.premise, -pol)
+            b = self.literal(node.conclusion, pol)
+            if pol > 0:
+                emit(make_clause((-x, -a, b)))
+            else:
+                emit(make_clause((x, a)))
+                emit(make_clause((x, -b)))
+        elif isinstance(node, Equiv):
+            # Both sides of ↔ occur positively and negatively
+            a = self.literal(node.left, 0)
+            b = self.literal(node.right, 0)
+            if pol > 0:
+                emit(make_clause((-x, -a, b)))
+                emit(make_clause((-x, a, -b)))
+            else:
+                emit(make_clause((x, a, b)))
+                emit(make_clause((x, -a, -b)))
+        else:
+            raise ValueError(f"Unknown formula type: {node}")
+
+    # Adds clauses that force node to be true. Top level ∧ and ∨ are split up directly so that
+    # plain clauses like (¬p ∨ q) come out exactly as they are, without any auxiliary atom
+    def assert_true(self, formula: Formula):
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, And):
+                stack.extend(reversed(node.formulas))
+            elif isinstance(node, Or):
+                self.clauses.append(make_clause(self.literal(f, 1) for f in self._disjuncts(node)))
+            elif isinstance(node, Implies):
+                self.clauses.append(make_clause((-self.literal(node.premise, -1), self.literal(node.conclusion, 1))))
+            elif isinstance(node, Not) and isinstance(node.formula, Not):
+                stack.append(node.formula.formula)
+            elif isinstance(node, Not) and isinstance(node.formula, Or):
+                # ¬(A ∨ B) is ¬A ∧ ¬B
+                stack.extend(Not(f) for f in reversed(node.formula.formulas))
+            elif isinstance(node, Not) and isinstance(node.formula, Implies):
+                # ¬(A → B) is A ∧ ¬B
+                stack.append(Not(node.formula.conclusion))
+                stack.append(node.formula.premise)
+            else:
+                self.clauses.append((self.literal(node, 1),))
+        self.define_pending()
+
+    # Or(Or(p, q), r) has the disjuncts p, q and r
+    def _disjuncts(self, node: Formula):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Or):
+                stack.extend(reversed(node.formulas))
+            else:
+                yield node
+
+# Clauses that are satisfiable exactly when formula is, fresh atoms are taken from symbols
+# Example: tseitin_clauses(Or(And(p, q), r), symbols) gives [(-3, 1), (-3, 2), (3, 4)] with x = 3 naming p ∧ q
+# With scratch=True the auxiliary atoms are scratch atoms, the real atoms are all added to symbols first so the
+# scratch numbers start after them
+def tseitin_clauses(formula: Formula, symbols: SymbolTable, scratch: bool = False) -> List[IntClause]:
+    if scratch:
+        for name in sorted(formula_atoms([formula])):
+            symbols.atom(name)
+    encoder = _Encoder(symbols, scratch)
+    encoder.assert_true(formula)
+    return encoder.clauses
@@ -0,0 +1,72 @@
+import random
+from functools import reduce
+from Belief_base.formula import Formula, Atom, Not, And, Or, Implies, Equiv
+
+"""
+Seeded generators for the benchmark inputs. Every generator takes a random.Random (or only a size) so the same
+seed always gives the same formulas, and the timings of two runs are about the same work.
+"""
+
+# p0, p1, p2, ...
+def atoms(n: int) -> list[Atom]:
+    return [Atom(f"p{i}") for i in range(n)]
+
+# A random literal over the given atoms, p or ¬p with the same chance
+def random_literal(rng: random.Random, pool: list[Atom]) -> Formula:
+    atom = rng.choice(pool)
+    return atom if rng.random() < 0.5 else Not(atom)
+
+# One literal, or two random literals joined by one of the connectives in kinds, each with the same chance
+# Example: random_small_formula(rng, pool, (Or, And)) gives formulas like p0, ¬p1 ∨ p3 or p2 ∧ ¬p0
+def random_small_formula(rng: random.Random, pool: list[Atom], kinds=(Or, Implies)) -> Formula:
+    kind = rng.choice((None,) + tuple(kinds))
+    if kind is None:
+        return random_literal(rng, pool)
+    return kind(random_literal(rng, pool), random_literal(rng, pool))
+
+# A random formula with all five connectives, nested at most depth levels. Example: (p ∧ ¬q) ↔ ¬r
+def random_formula(rng: random.Random, pool: list[Atom], depth: int = 2) -> Formula:
+    if depth == 0 or rng.random() < 0.3:
+        return random_literal(rng, pool)
+    kind = rng.choice([And, Or, Implies, Equiv, Not])
+    if kind is Not:
+        return Not(random_formula(rng, pool, depth - 1))
+    return kind(random_formula(rng, pool, depth - 1), random_formula(rng, pool, depth - 1))
+
+# n_clauses random clauses with k distinct atoms each, like the classic random k-SAT instances
+# Example: random_kcnf(rng, 3, 2, 2) could give [p0 ∨ ¬p2, ¬p1 ∨ p2]
+def random_kcnf(rng: random.Random, n_atoms: int, n_clauses: int, k: int = 3) -> list[Formula]:
+    pool = atoms(n_atoms)
+    clauses = []
+    for _ in range(n_clauses):
+        chosen = rng.sample(pool, k)
+        clauses.append(Or(*[a if rng.random() < 0.5 else Not(a) for a in chosen]))
+    return clauses
+
+# [p0, p0 → p1, p1 → p2, ..., p(n-1) → pn], which entails pn only through the whole chain
+def implication_chain(n: int) -> list[Formula]:
+    pool = atoms(n + 1)
+    return [pool[0]] + [Implies(pool[i], pool[i + 1]) for i in range(n)]
+
+# ((p0 ↔ p1) ↔ p2) ↔ ... ↔ p(n-1), the worst case for distributing ∨ over ∧ (2^n clauses)
+def biconditional_chain(n: int) -> Formula:
+    return reduce(Equiv, atoms(n))
+
+# n beliefs with priorities 0..3, a mix of literals, clauses and implications over n // 2 + 2 atoms so that
+# contractions have several remainders to choose from. Every belief is true in one hidden random model, so the base
+# is consistent and contractions have real derivations to break
+def prioritized_base(rng: random.Random, n: int) -> list[tuple[Formula, int]]:
+    pool = atoms(n // 2 + 2)
+    model = {atom.name: rng.random() < 0.5 for atom in pool}
+    beliefs = []
+    while len(beliefs) < n:
+        kind = rng.random()
+        if kind < 0.3:
+            belief = random_literal(rng, pool)
+        elif kind < 0.6:
+            belief = Or(random_literal(rng, pool), random_literal(rng, pool))
+        else:
+            belief = Implies(random_literal(rng, pool), random_literal(rng, pool))
+        if belief.evaluate(model):
+            beliefs.append((belief, rng.randint(0, 3)))
+    return beliefs
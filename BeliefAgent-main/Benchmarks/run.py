@@ -0,0 +1,186 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from Belief_base.belief_base import BeliefBase
+from Belief_base.entailment import resolution_entails
+from Belief_base.formula import Atom, Not, And, clear_conversion_caches
+from Belief_base.parser import parse_formula
+from Agent.agent import BeliefRevisionAgent
+from Benchmarks.generators import random_kcnf, implication_chain, biconditional_chain, prioritized_base, atoms
+
+"""
+Benchmark suite. Run it from the BeliefAgent-main folder:
+
+    python -m Benchmarks.run --out results.json
+    python -m Benchmarks.run --baseline Benchmarks/baseline.json
+
+Every benchmark is a setup function that gets a size n and a seeded random.Random and returns the call to time.
+The setup is done again before every repetition, after the previous call is dropped, the CNF caches are cleared
+and the garbage collector has run, so no memoized conversion and no interned node marked as CNF survives from one
+repetition to the next and every timing is a cold one. The reported time is the best of --repeat runs, the peak memory
+is measured with tracemalloc in one extra run.
+"""
+
+def _base_of(beliefs):
+    kb = BeliefBase()
+    kb.add_many(beliefs)
+    return kb
+
+def _agent_of(beliefs):
+    agent = BeliefRevisionAgent(cache_size=0)
+    agent.base.add_many(beliefs)
+    return agent
+
+# Parse one long conjunction of 3-clauses, n is the number of clauses
+def bench_parse(n, rng):
+    text = " ∧ ".join(f"({clause})" for clause in random_kcnf(rng, max(3, n // 4), n))
+    return lambda: parse_formula(text)
+
+# CNF of a biconditional chain over n atoms
+def bench_to_cnf_biconditional(n, rng):
+    formula = biconditional_chain(n)
+    return formula.to_cnf
+
+# CNF of a random 3-CNF conjunction wrapped in a double negation ¬¬(C1 ∧ ... ∧ Cn). The wrapper is not in CNF, so the
+# shortcut for formulas that already are doesn't apply: to_nnf removes the ¬¬ and then every clause is converted
+# and the clauses are collected again
+def bench_to_cnf_kcnf(n, rng):
+    formula = Not(Not(And(*random_kcnf(rng, max(3, n // 4), n))))
+    return formula.to_cnf
+
+# p0, p0 → p1, ..., entails the last atom, n is the length of the chain
+def bench_entails_chain(n, rng):
+    kb = _base_of((belief, 0) for belief in implication_chain(n))
+    query = atoms(n + 1)[-1]
+    return lambda: resolution_entails(kb, query)
+
+# Random 3-CNF with n atoms and 2n clauses (mostly satisfiable, so resolution has to saturate)
+def bench_entails_kcnf(n, rng):
+    kb = _base_of((clause, 0) for clause in random_kcnf(rng, n, 2 * n))
+    query = atoms(n)[0]
+    return lambda: resolution_entails(kb, query)
+
+# A literal the base entails without holding it as a belief, so contracting it has to break a derivation
+# Falls back to the most important belief when there is no such literal
+def _derived_literal(kb):
+    stored = set(kb.get_beliefs())
+    for atom in sorted({name for belief in stored for name in belief.symbols()}):
+        for literal in (Atom(atom), Not(Atom(atom))):
+            if literal.to_cnf() not in stored and resolution_entails(kb, literal):
+                return literal
+    return kb.beliefs[0][0]
+
+def bench_compute_remainders(n, rng):
+    kb = _base_of(prioritized_base(rng, n))
+    phi = _derived_literal(kb)
+    return lambda: kb.compute_remainders(phi)
+
+def bench_contract(n, rng):
+    agent = _agent_of(prioritized_base(rng, n))
+    phi = _derived_literal(agent.base)
+    return lambda: agent.contract_partial_meet(phi)
+
+def bench_revise(n, rng):
+    agent = _agent_of(prioritized_base(rng, n))
+    phi = Not(_derived_literal(agent.base))
+    return lambda: agent.revise(phi)
+
+# name -> (sizes, setup)
+BENCHMARKS = {
+    "parse_formula": ((100, 1000, 10000), bench_parse),
+    "to_cnf/biconditional_chain": ((6, 8, 10), bench_to_cnf_biconditional),
+    "to_cnf/random_3cnf": ((100, 1000, 5000), bench_to_cnf_kcnf),
+    "resolution_entails/implication_chain": ((100, 200, 400), bench_entails_chain),
+    "resolution_entails/random_3cnf": ((4, 5, 6), bench_entails_kcnf),
+    "compute_remainders": ((8, 16, 32), bench_compute_remainders),
+    "contract_partial_meet": ((8, 16, 32), bench_contract),
+    "revise": ((8, 16, 32), bench_revise),
+}
+
+# The caller must drop the call of the previous repetition first. The interned nodes it kept alive would otherwise
+# be handed out again, already marked as CNF, and the next repetition would time the warm shortcut
+def _setup(name, n, seed):
+    clear_conversion_caches()
+    gc.collect()
+    # A string seed keeps every (benchmark, size) pair independent of the others
+    return BENCHMARKS[name][1](n, random.Random(f"{seed}/{name}/{n}"))
+
+def measure(name, n, seed=0, repeat=3):
+    """Best wall time of repeat runs and the peak traced memory of one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        call = _setup(name, n, seed)
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+        call = None
+    call = _setup(name, n, seed)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"benchmark": name, "n": n, "seconds": best, "peak_bytes": peak}
+
+def run(names=None, seed=0, repeat=3, quick=False, log=None):
+    """Runs the chosen benchmarks (all by default) and returns the JSON report as a dict."""
+    results = []
+    for name in names or BENCHMARKS:
+        sizes = BENCHMARKS[name][0]
+        for n in sizes[:1] if quick else sizes:
+            result = measure(name, n, seed, repeat)
+            results.append(result)
+            if log:
+                log(f"{name:40} n={n:<6} {result['seconds'] * 1000:10.2f} ms {result['peak_bytes'] / 1024:10.1f} KiB")
+    return {"seed": seed, "repeat": repeat, "python": platform.python_version(), "results": results}
+
+def compare(report, baseline, threshold=1.5, min_seconds=0.001):
+    """
+    Regressions of report against baseline: every (benchmark, n) that got more than threshold times slower or
+    more memory hungry. Times under min_seconds in both runs are too noisy to judge and are skipped.
+    """
+    before = {(r["benchmark"], r["n"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = before.get((result["benchmark"], result["n"]))
+        if old is None:
+            continue
+        label = f"{result['benchmark']} n={result['n']}"
+        if max(result["seconds"], old["seconds"]) >= min_seconds and result["seconds"] > threshold * old["seconds"]:
+            regressions.append(f"{label}: {old['seconds'] * 1000:.2f} ms -> {result['seconds'] * 1000:.2f} ms")
+        if result["peak_bytes"] > threshold * max(old["peak_bytes"], 1024):
+            regressions.append(f"{label}: {old['peak_bytes']} B -> {result['peak_bytes']} B peak memory")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Belief revision agent benchmarks")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file, exit code 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown factor counted as a regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="only the smallest size of each benchmark")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    args = parser.parse_args(argv)
+
+    report = run(args.only, args.seed, args.repeat, args.quick, log=print)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
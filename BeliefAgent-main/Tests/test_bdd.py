@@ -0,0 +1,89 @@
+import random
+from Belief_base import metrics
+from Belief_base.bdd import BDD, BDDTooLarge, TRUE, FALSE, variable_order
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, And, Or, Implies, Equiv
+from Belief_base.entailment import BDDEngine, get_engine
+from Agent.agent import BeliefRevisionAgent
+from Benchmarks.generators import biconditional_chain, random_formula
+
+def test_diagrams_are_canonical():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    assert variable_order([Implies(p, q), And(r, p)]) == ["p", "q", "r"]
+    bdd = BDD(["p", "q"])
+    # p → q: one node for p, one for q, and the two leaves
+    assert bdd.build(Implies(p, q)) == bdd.build(Or(Not(p), q))
+    assert bdd.size(bdd.build(Implies(p, q))) == 4
+    assert bdd.build(And(p, Not(p))) == FALSE
+    assert bdd.build(Equiv(Implies(p, q), Or(Not(p), q))) == TRUE
+    # r was not in the order, it goes below p and q
+    assert bdd.build(Or(r, p)) == bdd.build(Or(p, r)) and bdd.levels["r"] == 2
+    # The chain p0 ↔ p1 ↔ ... ↔ p9 is linear in size, its CNF is not
+    # (two nodes per atom below the first, one for the first, and the leaves)
+    bdd = BDD()
+    assert bdd.size(bdd.build(biconditional_chain(10))) == 21
+    try:
+        BDD(node_budget=10).build(biconditional_chain(10))
+        assert False, "the node budget was not enforced"
+    except BDDTooLarge:
+        pass
+
+# The diagrams must agree with resolution on random formulas
+def test_implies_agrees_with_resolution():
+    rng = random.Random(24)
+    atoms = [Atom(name) for name in "pqrs"]
+    resolution = get_engine("resolution")
+    for _ in range(200):
+        kb = BeliefBase()
+        for _ in range(rng.randint(0, 3)):
+            kb.add(random_formula(rng, atoms, depth=3))
+        query = random_formula(rng, atoms, depth=3)
+        bdd = BDD(variable_order(kb.get_beliefs()))
+        base = bdd.build(And(*kb.get_beliefs())) if kb.beliefs else TRUE
+        assert bdd.implies(base, bdd.build(query)) == resolution.entails(kb, query), f"{kb} / {query}"
+
+# The base is compiled once per version, and every change makes the next ask compile it again
+def test_agent_recompiles_lazily():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    metrics.reset()
+    metrics.enable()
+    try:
+        agent = BeliefRevisionAgent(bdd=True, cache_size=0)
+        agent.expand(Implies(p, q), 2)
+        agent.expand(p, 1)
+        assert agent.ask(q) and agent.ask(Or(q, r)) and not agent.ask(r)
+        assert metrics.counters["bdd.compilations"] == 1
+        agent.expand(r)
+        assert agent.ask(r)
+        assert metrics.counters["bdd.compilations"] == 2
+        agent.contract_partial_meet(q)
+        assert not agent.ask(q)
+        agent.base.remove(Implies(p, q).to_cnf())
+        assert not agent.ask(Implies(p, q))
+        assert metrics.counters["bdd.compilations"] == 4
+        assert "bdd.fallbacks" not in metrics.counters
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+# A base or a query over the node budget is answered by the fallback engine instead
+def test_node_budget_falls_back():
+    rng = random.Random(8)
+    atoms = [Atom(f"p{i}") for i in range(8)]
+    resolution = get_engine("resolution")
+    for node_budget in (3, 12, 40):
+        engine = BDDEngine(node_budget=node_budget)
+        for _ in range(40):
+            kb = BeliefBase()
+            for _ in range(rng.randint(1, 4)):
+                kb.add(random_formula(rng, atoms, depth=3))
+            for _ in range(3):
+                query = random_formula(rng, atoms, depth=3)
+                assert engine.entails(kb, query) == resolution.entails(kb, query), f"{kb} / {query}"
+            assert engine.consistent(kb) == resolution.consistent(kb)
+
+if __name__ == "__main__":
+    test_diagrams_are_canonical()
+    test_implies_agrees_with_resolution()
+    test_agent_recompiles_lazily()
+    test_node_budget_falls_back()
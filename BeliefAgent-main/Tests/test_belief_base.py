@@ -1,7 +1,13 @@
-from Belief_base.belief_base import BeliefBase
-from Belief_base.formula import Implies, Or, Not, Atom
+from Belief_base.belief_base import BeliefBase, select_remainders
+from Belief_base.formula import Implies, Or, Not, Atom, And
+from itertools import combinations
+import inspect
+import random
+import sys
 from Agent.agent import BeliefRevisionAgent
-from Belief_base.entailment import resolution_entails
+from Belief_base.entailment import resolution_entails, cnf_clauses_for_query, cnf_int_clauses_for_query, get_engine
+from Belief_base.symbols import SymbolTable
+from Benchmarks.generators import random_small_formula
 
 def test_entailment():
     KB = BeliefBase()
@@ -10,7 +16,168 @@ def test_entailment():
     KB.add(p)
     assert resolution_entails(KB, q)    # should be True
     assert not resolution_entails(KB, Not(q))  # KB ⊭ ¬q
+
+def test_clause_encoding():
+    KB = BeliefBase()
+    p, q = Atom("p"), Atom("q")
+    KB.add(Implies(p, q))
+    KB.add(p)
+    # The public clauses still use (atom name, is_positive) pairs
+    assert set(cnf_clauses_for_query(KB, q)) == {
+        frozenset({("p", False), ("q", True)}),
+        frozenset({("p", True)}),
+        frozenset({("q", False)}),
+    }
+    # Internally every literal is a signed int from the symbol table
+    symbols = SymbolTable()
+    clauses = cnf_int_clauses_for_query(KB, q, symbols)
+    pi, qi = symbols.atom("p"), symbols.atom("q")
+    assert set(clauses) == {tuple(sorted((-pi, qi))), (pi,), (-qi,)}
+    # The base keeps the clauses it extracted when each belief was added, in belief order
+    pk, qk = KB.symbols.atom("p"), KB.symbols.atom("q")
+    assert KB.clauses_of() == [tuple(sorted((-pk, qk))), (pk,)]
+    assert KB.clauses_of([1]) == [(pk,)]
     
+# The incremental session must answer every subset question like a fresh resolution run on that subset
+def test_incremental_session_matches_resolution():
+    KB = BeliefBase()
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    KB.add(Implies(p, q), priority=2)
+    KB.add(p, priority=1)
+    KB.add(Or(Not(q), r), priority=3)
+    KB.add(And(q, Not(r)), priority=0)
+    resolution, cdcl = get_engine("resolution"), get_engine("cdcl")
+    for query in (q, r, Not(p), And(p, r)):
+        for k in range(len(KB.beliefs) + 1):
+            for indexes in combinations(range(len(KB.beliefs)), k):
+                expected = resolution.entails_subset(KB, indexes, query)
+                assert cdcl.entails_subset(KB, indexes, query) == expected, (indexes, str(query))
+
+    # The session follows add, remove and clear
+    assert cdcl.entails(KB, q)
+    KB.remove(p)
+    KB.remove(And(q, Not(r)))
+    assert not cdcl.entails(KB, q)
+    KB.add(p, priority=5)
+    assert cdcl.entails(KB, r)
+    KB.clear()
+    assert not cdcl.entails(KB, p)
+
+# Retired selectors and queries are cleaned up, so a long lived session does not keep growing
+def test_session_stays_bounded():
+    KB = BeliefBase()
+    atoms = [Atom(f"p{i}") for i in range(6)]
+    for i in range(5):
+        KB.add(Implies(atoms[i], atoms[i + 1]), priority=i)
+    session = KB.session
+    session.MAX_QUERIES, session.GC_INTERVAL, session.MAX_RETIRED = 4, 8, 40
+    resolution = get_engine("resolution")
+    symbols = len(KB.symbols)
+    sizes = []
+    for step in range(200):
+        query = Implies(atoms[step % 6], Or(atoms[(step + 1) % 6], atoms[(step * 7) % 6], Atom(f"x{step % 13}")))
+        assert session.entails(KB.ids_of(range(len(KB.beliefs))), query) == resolution.entails(KB, query), query
+        if step % 10 == 0:
+            KB.remove(KB.beliefs[0][0])
+            KB.add(Implies(atoms[step % 5], atoms[step % 5 + 1]), priority=step % 5)
+        sizes.append((session.solver.num_vars, len(session.solver.clauses)))
+    # Only the 13 query atoms x0 .. x12 were new to the symbol table, no selector was added to it
+    assert len(KB.symbols) == symbols + 13
+    assert max(sizes[100:]) <= max(sizes[:100])
+
+# Enumerating minimal correction subsets must give exactly the remainders of the level by level search
+def test_mcs_remainders_match_levels():
+    rng = random.Random(3)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(60):
+        KB = BeliefBase()
+        for _ in range(rng.randint(1, 7)):
+            KB.add(random_small_formula(rng, atoms), priority=rng.randint(0, 3))
+        phi = random_small_formula(rng, atoms, (Or, And))
+        expected = KB.compute_remainders(phi, engine="cdcl")
+        assert KB.compute_remainders(phi, method="mcs") == expected, (str(KB), str(phi))
+
+# The parallel level search must find exactly the serial remainders, in the same order
+def test_parallel_remainders_match_serial():
+    rng = random.Random(8)
+    atoms = [Atom(name) for name in "pqrs"]
+    for engine in ("resolution", "cdcl"):
+        for _ in range(5):
+            KB = BeliefBase()
+            for _ in range(rng.randint(1, 7)):
+                KB.add(random_small_formula(rng, atoms))
+            phi = random_small_formula(rng, atoms, (Or,))
+            expected = KB.compute_remainders(phi, engine=engine)
+            assert KB.compute_remainders(phi, engine=engine, workers=2) == expected, (str(KB), str(phi))
+
+# Branch and bound must pick exactly the remainders that select_remainders picks from the full list
+def test_best_remainders_match_selection():
+    rng = random.Random(4)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(100):
+        KB = BeliefBase()
+        for _ in range(rng.randint(0, 7)):
+            KB.add(random_small_formula(rng, atoms), priority=rng.randint(-1, 4))
+        phi = random_small_formula(rng, atoms, (Or, And))
+        remainders = KB.compute_remainders(phi)
+        priorities = [priority for _, priority in KB.get_prioritized_beliefs()]
+        expected = select_remainders(remainders, priorities) if remainders else []
+        assert KB.best_remainders(phi) == expected, (str(KB), str(phi))
+
+# The search must not recurse once per belief: with a low recursion limit it still handles a base deeper than it
+def test_best_remainders_without_recursion():
+    KB = BeliefBase()
+    KB.add_many((Atom(f"p{i}"), i % 3) for i in range(400))
+    KB.add(Implies(Atom("p0"), Atom("q")), 5)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 200)
+    try:
+        best = KB.best_remainders(Atom("q"))
+    finally:
+        sys.setrecursionlimit(limit)
+    # Dropping p0 (priority 0) or p0 → q (priority 5) breaks the only derivation, p0 is the cheaper one
+    assert best == [set(range(401)) - {KB.beliefs.index((Atom("p0"), 0))}]
+
+def test_retain_in_place():
+    p, q, r, s = Atom("p"), Atom("q"), Atom("r"), Atom("s")
+    KB = BeliefBase()
+    for belief, priority in ((Implies(p, q), 2), (p, 3), (Or(q, r), 1), (Not(s), 0)):
+        KB.add(belief, priority)
+    KB.session
+    ids = KB.ids_of([0, 2])
+    clauses = KB.clauses_of([0, 2])
+    version = KB.version
+    removed = KB.retain([0, 2])
+    # The removal delta lists what went, the kept beliefs keep their ids and stored clauses
+    assert [(formula, priority) for _, formula, priority in removed] == [(Implies(p, q).to_cnf(), 2), (Not(s), 0)]
+    assert KB.beliefs == [(p, 3), (Or(q, r).to_cnf(), 1)]
+    assert KB.ids_of([0, 1]) == ids and KB.clauses_of() == clauses
+    assert KB.version == KB.shrink_version == version + 1
+    # The atom index and the SAT session follow the removal
+    assert KB.relevant_indexes(s) == []
+    assert not get_engine("cdcl").entails(KB, q) and get_engine("cdcl").entails(KB, Or(q, r))
+    # Keeping everything is not a change
+    assert KB.retain(range(2)) == [] and KB.version == version + 1
+
+# Contraction keeps the beliefs in place, the result must be the one a rebuild from scratch gives
+def test_contraction_keeps_beliefs_in_place():
+    rng = random.Random(25)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(60):
+        agent = BeliefRevisionAgent(engine="cdcl")
+        for _ in range(rng.randint(1, 5)):
+            agent.base.add(random_small_formula(rng, atoms), rng.randint(0, 3))
+        phi = random_small_formula(rng, atoms, (Or,))
+        KB = BeliefBase()
+        KB.add_many(agent.base.beliefs)
+        agent.contract_partial_meet(phi)
+        rebuilt = BeliefBase()
+        rebuilt.add_many(agent.base.beliefs)
+        for query in atoms + [phi]:
+            assert get_engine("cdcl").entails(agent.base, query) == resolution_entails(rebuilt, query)
+        # Everything that is left was in the base before, in the same order
+        assert [belief for belief in KB.beliefs if belief in agent.base.beliefs] == agent.base.beliefs
+
 def test_contraction():
     # Create your belief revision agent
     agent = BeliefRevisionAgent()
@@ -42,5 +209,13 @@ def test_contraction():
 
 if __name__ == "__main__":
     # test_entailment()
+    # test_incremental_session_matches_resolution()
+    test_session_stays_bounded()
+    # test_mcs_remainders_match_levels()
+    test_parallel_remainders_match_serial()
+    test_best_remainders_match_selection()
+    test_best_remainders_without_recursion()
+    test_retain_in_place()
+    test_contraction_keeps_beliefs_in_place()
     test_contraction()
     # print("All tests passed ✅")
\ No newline at end of file
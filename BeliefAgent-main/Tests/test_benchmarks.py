@@ -0,0 +1,25 @@
+import random
+from Belief_base.belief_base import BeliefBase
+from Belief_base.entailment import resolution_entails
+from Benchmarks.generators import random_kcnf, implication_chain, prioritized_base
+from Benchmarks.run import run, compare
+
+# The same seed must give the same inputs, otherwise timings of two runs can't be compared
+def test_generators_are_seeded():
+    assert random_kcnf(random.Random(1), 6, 10) == random_kcnf(random.Random(1), 6, 10)
+    assert prioritized_base(random.Random(1), 8) == prioritized_base(random.Random(1), 8)
+    kb = BeliefBase()
+    kb.add_many((belief, 0) for belief in implication_chain(5))
+    assert resolution_entails(kb, implication_chain(5)[-1].conclusion)
+
+def test_run_and_compare():
+    report = run(["resolution_entails/implication_chain"], repeat=1, quick=True)
+    (result,) = report["results"]
+    assert result["benchmark"] == "resolution_entails/implication_chain" and result["peak_bytes"] > 0
+    assert compare(report, report) == []
+    faster = {"results": [dict(result, seconds=result["seconds"] / 10, peak_bytes=result["peak_bytes"] // 10)]}
+    assert len(compare(report, faster, min_seconds=0)) == 2
+
+if __name__ == "__main__":
+    test_generators_are_seeded()
+    test_run_and_compare()
@@ -0,0 +1,78 @@
+import random
+import pytest
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, And, Or
+from Belief_base.entailment import resolution_entails, get_engine
+from Belief_base.budget import Budget, BudgetExceeded, CancellationToken, UNKNOWN
+from Agent.agent import BeliefRevisionAgent
+from Benchmarks.generators import random_kcnf
+
+# n + 1 pigeons in n holes, unsatisfiable and hard for both resolution and CDCL
+def pigeonhole(n):
+    at = lambda i, j: Atom(f"x{i}_{j}")
+    beliefs = [Or(*[at(i, j) for j in range(n)]) for i in range(n + 1)]
+    beliefs += [Or(Not(at(i, j)), Not(at(k, j))) for j in range(n) for i in range(n + 1) for k in range(i + 1, n + 1)]
+    return beliefs
+
+def test_limits_stop_both_engines():
+    kb = BeliefBase()
+    kb.add_many((belief, 0) for belief in pigeonhole(5))
+    query = Atom("unrelated")
+    for engine in ("resolution", "cdcl"):
+        with pytest.raises(BudgetExceeded) as info:
+            get_engine(engine).entails(kb, query, budget=Budget(max_clauses=20))
+        assert "clauses" in info.value.reason
+        with pytest.raises(BudgetExceeded, match="bytes"):
+            get_engine(engine).entails(kb, query, budget=Budget(max_memory=2000))
+        token = CancellationToken()
+        token.cancel()
+        with pytest.raises(BudgetExceeded, match="cancelled"):
+            get_engine(engine).entails(kb, query, budget=Budget(token=token))
+    # The incremental session is still usable after a stopped check
+    assert get_engine("cdcl").entails(kb, query)
+    with pytest.raises(BudgetExceeded, match="time limit"):
+        resolution_entails(kb, query, budget=Budget(seconds=0))
+    assert resolution_entails(kb, query, budget=Budget(max_clauses=20), on_unknown="unknown") is UNKNOWN
+
+# A budget that is never reached must not change any answer
+def test_large_budget_changes_nothing():
+    rng = random.Random(6)
+    budget = Budget(seconds=60, max_clauses=10 ** 6, max_memory=10 ** 9)
+    for _ in range(30):
+        kb = BeliefBase()
+        kb.add_many((clause, 0) for clause in random_kcnf(rng, 5, rng.randint(1, 12)))
+        query = Or(Atom("p0"), Not(Atom("p1")))
+        for engine in ("resolution", "cdcl"):
+            assert get_engine(engine).entails(kb, query, budget=budget) == get_engine(engine).entails(kb, query)
+
+def test_agent_on_unknown_policies():
+    beliefs = pigeonhole(5)
+    tiny = Budget(max_clauses=5)
+    agent = BeliefRevisionAgent(engine="resolution", budget=tiny, on_unknown="unknown")
+    agent.base.add_many((belief, 0) for belief in beliefs)
+    assert agent.ask(Atom("q")) is UNKNOWN
+    # UNKNOWN answers are not cached
+    assert agent.cache_info()["size"] == 0
+    with pytest.raises(TypeError):
+        bool(UNKNOWN)
+    # Contraction can't use "unknown", it raises instead
+    with pytest.raises(BudgetExceeded):
+        agent.contract_partial_meet(Atom("q"))
+    # Treating unknown as entailed is the conservative choice. With no time at all only the subsets that the
+    # preprocessing settles on its own (here: the ones with a pure literal) can be shown safe
+    p, r = Atom("p"), Atom("r")
+    agent = BeliefRevisionAgent(engine="resolution", budget=Budget(seconds=0), on_unknown="entailed")
+    agent.base.add_many((belief, 0) for belief in (Or(p, r), Or(Not(p), r), Or(p, Not(r)), Or(Not(p), Not(r))))
+    agent.contract_partial_meet(Atom("q"))
+    assert agent.base.beliefs == []
+    agent = BeliefRevisionAgent(engine="resolution", budget=Budget(seconds=0), on_unknown="entailed")
+    agent.base.add_many((belief, 0) for belief in beliefs[:4])
+    agent.contract_partial_meet(Atom("q"))
+    assert len(agent.base.beliefs) == 4
+    with pytest.raises(ValueError):
+        BeliefRevisionAgent(on_unknown="maybe")
+
+if __name__ == "__main__":
+    test_limits_stop_both_engines()
+    test_large_budget_changes_nothing()
+    test_agent_on_unknown_policies()
@@ -0,0 +1,244 @@
+import random
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, And, Or, Implies, Equiv
+from Belief_base.entailment import resolution_entails, get_engine, cnf_int_clauses_for_query, simplify_clauses, resolution_refutes, \
+    ResolutionEngine, TruthTableEngine
+from Belief_base.truth_table import atom_tables
+from Belief_base.symbols import SymbolTable
+from Agent.agent import BeliefRevisionAgent
+from Benchmarks.generators import random_kcnf, random_formula, biconditional_chain
+from Belief_base.parser import parse_formula
+
+# Every engine must give the same answer as the resolution reference
+def test_engines_agree_with_resolution():
+    rng = random.Random(7)
+    atoms = [Atom(name) for name in "pqrs"]
+    reference = get_engine("resolution")
+    engines = [get_engine("cdcl"), get_engine("truth_table"), get_engine("bdd")]
+    for _ in range(150):
+        kb = BeliefBase(cnf_mode=rng.choice(["distribute", "tseitin"]))
+        for _ in range(rng.randint(0, 3)):
+            kb.add(random_formula(rng, atoms))
+        query = random_formula(rng, atoms)
+        for engine in engines:
+            assert engine.entails(kb, query) == reference.entails(kb, query), f"{engine.name}: {kb} / {query}"
+
+# Tseitin clauses are only equisatisfiable, but the entailment answers must not change
+def test_tseitin_mode_agrees_with_distribution():
+    rng = random.Random(11)
+    atoms = [Atom(name) for name in "pqrs"]
+    engine = get_engine("cdcl")
+    for _ in range(150):
+        plain, tseitin = BeliefBase(), BeliefBase(cnf_mode="tseitin")
+        for _ in range(rng.randint(0, 3)):
+            belief = random_formula(rng, atoms, depth=3)
+            plain.add(belief)
+            tseitin.add(belief)
+        query = random_formula(rng, atoms, depth=3)
+        assert engine.entails(tseitin, query) == engine.entails(plain, query), f"{plain} / {query}"
+
+# The auxiliary atoms of Tseitin queries are scratch atoms, asking again and again must not grow the symbol table,
+# and an atom added later that takes a scratch number must not be confused with it
+def test_tseitin_queries_keep_the_symbol_table_flat():
+    rng = random.Random(12)
+    atoms = [Atom(f"p{i}") for i in range(5)]
+    for engine in ("cdcl", "resolution"):
+        agent = BeliefRevisionAgent(engine=engine, cnf_mode="tseitin", cache_size=0)
+        plain = BeliefBase()
+        for _ in range(4):
+            belief = random_formula(rng, atoms, depth=3)
+            agent.expand(belief)
+            plain.add(belief)
+        queries = [random_formula(rng, atoms, depth=3) for _ in range(60)]
+        sizes = []
+        for _ in range(3):
+            for query in queries:
+                assert agent.ask(query) == resolution_entails(plain, query), f"{plain} / {query}"
+            sizes.append(len(agent.base.symbols))
+        assert sizes[0] == sizes[1] == sizes[2]
+        # New atoms now get the numbers the scratch atoms had
+        for i in range(8):
+            belief = Implies(atoms[i % 5], Atom(f"new{i}"))
+            agent.expand(belief)
+            plain.add(belief)
+        for query in queries + [Atom(f"new{i}") for i in range(8)]:
+            assert agent.ask(query) == resolution_entails(plain, query), f"{plain} / {query}"
+    # ¬((p ∧ q) ∨ r) names p ∧ q with the scratch atom 4, and the atom added next is number 4 as well
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    kb = BeliefBase(cnf_mode="tseitin")
+    query = Or(And(p, q), r)
+    for engine in ("resolution", "cdcl"):
+        assert not get_engine(engine).entails(kb, query)
+    kb.add(Atom("x"))
+    assert kb.symbols.atom("x") == 4
+    for engine in ("resolution", "cdcl"):
+        assert not get_engine(engine).entails(kb, query)
+
+def test_tseitin_biconditional_chain_is_linear():
+    atoms = [Atom(f"p{i}") for i in range(12)]
+    chain = atoms[0]
+    for atom in atoms[1:]:
+        chain = Equiv(chain, atom)
+    kb = BeliefBase(cnf_mode="tseitin")
+    kb.add(chain)
+    # The belief is stored as written, auxiliary atoms never show up in the base
+    assert str(kb) == f"0: {chain}"
+    clauses = cnf_int_clauses_for_query(kb, atoms[0], SymbolTable())
+    assert len(clauses) < 100
+    # The chain is true with all atoms true, so it does not entail ¬p0
+    assert not get_engine("cdcl").entails(kb, Not(atoms[0]))
+
+# Deep formulas are what Tseitin mode is for, the encoder must not recurse once per nesting level
+def test_tseitin_deep_chain():
+    kb = BeliefBase(cnf_mode="tseitin")
+    kb.add(biconditional_chain(2000))
+    kb.add(parse_formula("¬" * 3000 + "p1"))
+    engine = get_engine("cdcl")
+    assert engine.entails(kb, Atom("p1"))
+    assert not engine.entails(kb, Atom("p0"))
+
+def test_cdcl_agent_contraction():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    for method in ("levels", "mcs", "best"):
+        agent = BeliefRevisionAgent(engine="cdcl", remainder_method=method)
+        agent.base.add(Implies(p, q), priority=2)
+        agent.base.add(p, priority=1)
+        agent.base.add(Or(Not(q), r), priority=3)
+        assert agent.ask(q)
+        agent.contract_partial_meet(q)
+        assert not agent.ask(q)
+        # p has the lowest priority so it is the belief that goes
+        assert set(agent.base.get_beliefs()) == {Implies(p, q).to_cnf(), Or(Not(q), r).to_cnf()}
+
+# Restricting to the connected beliefs must never change an answer, also after removals make the base consistent again
+def test_relevance_filtering_agrees():
+    rng = random.Random(5)
+    atoms = [Atom(name) for name in "pqrstu"]
+    for name in ("resolution", "cdcl", "truth_table", "bdd"):
+        engine = get_engine(name)
+        for _ in range(100):
+            kb = BeliefBase()
+            beliefs = [random_formula(rng, atoms) for _ in range(rng.randint(0, 4))]
+            for belief in beliefs:
+                kb.add(belief)
+            if beliefs and rng.random() < 0.5:
+                kb.remove(kb.beliefs[0][0])
+            query = random_formula(rng, atoms)
+            assert engine.entails(kb, query, relevance=True) == engine.entails(kb, query), f"{kb} / {query}"
+
+def test_relevance_index():
+    p, q, r, s = Atom("p"), Atom("q"), Atom("r"), Atom("s")
+    kb = BeliefBase()
+    kb.add(Implies(p, q))
+    kb.add(Implies(q, r))
+    kb.add(s)
+    # r is reached through q → r and then p → q through q, s is not connected
+    assert {kb.beliefs[i][0] for i in kb.relevant_indexes(r)} == {Implies(p, q).to_cnf(), Implies(q, r).to_cnf()}
+    assert [kb.beliefs[i][0] for i in kb.relevant_indexes(s)] == [s]
+    # s ∧ ¬s has nothing to do with p, but an inconsistent base still entails it
+    kb.add(Not(s))
+    assert not kb.is_consistent()
+    agent = BeliefRevisionAgent(relevance=True)
+    agent.base = kb
+    assert agent.ask(Not(p))
+    kb.remove(Not(s))
+    assert kb.is_consistent()
+    assert not agent.ask(Not(p))
+
+def test_ask_cache():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    agent = BeliefRevisionAgent(cache_size=2)
+    agent.expand(Implies(p, q))
+    agent.expand(p)
+    assert agent.ask(q) and agent.ask(q)
+    assert agent.cache_info()["hits"] == 1
+    # An entailed answer survives an expansion, a non-entailed one does not
+    assert not agent.ask(r)
+    agent.expand(r)
+    assert agent.ask(q) and agent.ask(r)
+    assert agent.cache_info() == {"hits": 2, "misses": 3, "size": 2, "max_size": 2}
+    # Contraction removes beliefs, so nothing cached before it is trusted
+    agent.contract_partial_meet(q)
+    assert not agent.ask(q)
+    # Replacing the base drops the cache
+    agent.base = BeliefBase()
+    assert not agent.ask(r)
+
+# The pool must give the same answers as ask, in the order of the queries
+def test_ask_many_matches_ask():
+    rng = random.Random(3)
+    atoms = [Atom(name) for name in "pqrs"]
+    for engine in ("resolution", "cdcl", "truth_table"):
+        agent = BeliefRevisionAgent(engine=engine, cache_size=0)
+        for _ in range(3):
+            agent.expand(random_formula(rng, atoms))
+        queries = [random_formula(rng, atoms) for _ in range(30)] + [Atom("new")]
+        assert agent.ask_many(queries, workers=2) == [agent.ask(query) for query in queries]
+
+def test_truth_table_engine():
+    assert atom_tables(2) == ((0b1010, 0b1100), 0b1111)
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    # Above max_atoms the fallback answers
+    calls = []
+    class CountingResolution(ResolutionEngine):
+        def entails_subset(self, kb, indexes, query, budget=None):
+            calls.append(query)
+            return super().entails_subset(kb, indexes, query, budget)
+    engine = TruthTableEngine(max_atoms=2, fallback=CountingResolution())
+    kb = BeliefBase()
+    kb.add(Implies(p, q))
+    kb.add(p)
+    assert engine.entails(kb, q) and calls == []
+    assert not engine.entails(kb, r) and calls == [r]
+    assert engine.unsatisfiable([(1,), (-1,)]) and not engine.unsatisfiable([(1, 2), (-1, 2)])
+    # The agent picks truth tables by itself unless told otherwise
+    assert BeliefRevisionAgent().engine.name == "truth_table"
+    assert BeliefRevisionAgent(truth_table_atoms=0).engine.name == "resolution"
+    assert BeliefRevisionAgent(engine="cdcl").engine.name == "cdcl"
+    # Contraction gives the same base as with resolution
+    rng = random.Random(23)
+    atoms = [Atom(name) for name in "pqrs"]
+    for _ in range(40):
+        beliefs = [(random_formula(rng, atoms), rng.randint(0, 3)) for _ in range(rng.randint(1, 4))]
+        query = random_formula(rng, atoms)
+        results = []
+        for agent in (BeliefRevisionAgent(), BeliefRevisionAgent(engine="resolution")):
+            agent.base.add_many(beliefs)
+            agent.contract_partial_meet(query)
+            results.append(agent.base.beliefs)
+        assert results[0] == results[1]
+
+def test_simplify_clauses():
+    # p, p → q, q → (r ∨ s): propagation leaves r ∨ s, and then r and s are pure
+    assert simplify_clauses([(1,), (-1, 2), (-2, 3, 4)]) == []
+    # p, p → q, ¬q: propagation alone reaches the empty clause
+    assert simplify_clauses([(1,), (-1, 2), (-2,)]) is None
+    # No units and no pure literals: nothing changes
+    clauses = [(1, 2), (-1, 2), (1, -2), (-1, -2)]
+    assert simplify_clauses(clauses) == clauses
+    # Tautologies and duplicates go, the false literal ¬p is removed from what is left
+    assert simplify_clauses([(1,), (-1, 2, 3), (-2, -3), (2, 3), (2, 3), (-4, 4)]) == [(2, 3), (-2, -3)]
+
+# Preprocessing must never change the answer of the resolution loop
+def test_preprocessing_agrees():
+    rng = random.Random(21)
+    for _ in range(300):
+        kb = BeliefBase()
+        kb.add_many((clause, 0) for clause in random_kcnf(rng, 5, rng.randint(1, 14), k=rng.randint(1, 3)))
+        clauses = cnf_int_clauses_for_query(kb, random_formula(rng, [Atom(f"p{i}") for i in range(5)]))
+        assert resolution_refutes(clauses) == resolution_refutes(clauses, preprocess=False)
+
+if __name__ == "__main__":
+    test_engines_agree_with_resolution()
+    test_tseitin_mode_agrees_with_distribution()
+    test_tseitin_queries_keep_the_symbol_table_flat()
+    test_tseitin_biconditional_chain_is_linear()
+    test_tseitin_deep_chain()
+    test_cdcl_agent_contraction()
+    test_relevance_filtering_agrees()
+    test_relevance_index()
+    test_ask_cache()
+    test_ask_many_matches_ask()
+    test_truth_table_engine()
+    test_simplify_clauses()
+    test_preprocessing_agrees()
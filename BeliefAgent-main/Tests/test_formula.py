@@ -0,0 +1,92 @@
+import os
+import pickle
+import subprocess
+import sys
+from Belief_base.formula import Atom, Not, And, Or, Implies, Equiv, _CNF_CACHE, clear_conversion_caches
+
+# Structurally equal formulas are built only once
+def test_formulas_are_interned():
+    p, q = Atom("p"), Atom("q")
+    assert Atom("p") is p
+    assert Implies(p, q) is Implies(Atom("p"), Atom("q"))
+    assert Implies(p, q) is not Implies(q, p)
+    # ∧, ∨ and ↔ ignore the order of their arguments, like the old set based equality did
+    assert And(p, q) is And(q, p)
+    assert Or(p, q, p) is Or(q, p)
+    assert Equiv(p, q) is Equiv(q, p)
+    assert Not(And(p, q)) is Not(And(q, p))
+    assert len({Or(p, q), Or(q, p), Or(p, q)}) == 1
+    assert Or(p, q) != And(p, q)
+
+# The operands of ∧, ∨ and ↔ are put in a fixed order, so a node looks the same whichever call built it first
+def test_operand_order_does_not_depend_on_history():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    assert Or(q, p).formulas == (p, q) and str(Or(q, p)) == "(p) ∨ (q)"
+    assert And(p, p).formulas == (p,) and And(p) is And(p, p)
+    assert Or(Not(p), r, p).formulas == (p, Not(p), r)
+    f = Equiv(q, p)
+    assert (f.left, f.right) == (p, q) and str(f) == "(p) ↔ (q)"
+    assert Equiv(Or(r, q), p).left is p
+    # Compound operands come after the literals, in an order that is the same in every run
+    g = Or(And(q, r), Implies(p, q), r)
+    assert g.formulas[0] is r
+    assert Or(Implies(p, q), r, And(r, q)).formulas == g.formulas
+
+# String hashes change from run to run, the operand order must not
+def test_operand_order_is_the_same_in_every_run():
+    code = ("from Belief_base.formula import *; p, q, r = Atom('p'), Atom('q'), Atom('r'); "
+            "print(Or(And(q, r), Implies(p, q), Not(Equiv(p, r)), Not(Not(p)), Or(q, Not(r))))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = {subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True,
+                              env=dict(os.environ, PYTHONHASHSEED=str(seed))).stdout for seed in (1, 2, 3)}
+    assert len(outputs) == 1
+
+def test_children():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    assert p.children() == ()
+    assert Not(p).children() == (p,)
+    assert Or(r, q, p).children() == (p, q, r)
+    assert Implies(q, p).children() == (q, p)
+    assert Equiv(q, p).children() == (p, q)
+
+def test_interned_formulas_survive_pickling():
+    p, q = Atom("p"), Atom("q")
+    f = Equiv(Not(p), Or(p, And(q, Not(q))))
+    assert pickle.loads(pickle.dumps(f)) is f
+
+# to_cnf is memoized and a formula that is already in CNF is returned as it is
+def test_cnf_conversion_is_memoized():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    f = Or(p, And(q, Implies(r, p)))
+    cnf = f.to_cnf()
+    assert cnf is f.to_cnf()
+    assert cnf.to_cnf() is cnf
+    assert cnf is And(Or(p, q), Or(p, Not(r)))
+    assert f.to_nnf() is Or(p, And(q, Or(Not(r), p)))
+
+# Literals and clauses are returned as they are, without going through the conversion caches
+def test_clauses_skip_conversion():
+    p, q = Atom("p"), Atom("q")
+    clear_conversion_caches()
+    for clause in (Not(p), Or(p, Not(q)), Or(p, Not(p))):
+        assert clause.to_cnf() is clause and clause._is_cnf
+    assert not _CNF_CACHE.entries
+    assert Or(p, Not(Not(q))).to_cnf() is Or(p, q)
+
+def test_biconditional_chain_cnf_has_no_redundant_clauses():
+    atoms = [Atom(f"p{i}") for i in range(8)]
+    chain = atoms[0]
+    for atom in atoms[1:]:
+        chain = Equiv(chain, atom)
+    # A parity constraint over 8 atoms needs exactly 2^7 clauses
+    assert len(chain.to_cnf().formulas) == 2 ** 7
+
+if __name__ == "__main__":
+    test_formulas_are_interned()
+    test_operand_order_does_not_depend_on_history()
+    test_operand_order_is_the_same_in_every_run()
+    test_children()
+    test_interned_formulas_survive_pickling()
+    test_cnf_conversion_is_memoized()
+    test_clauses_skip_conversion()
+    test_biconditional_chain_cnf_has_no_redundant_clauses()
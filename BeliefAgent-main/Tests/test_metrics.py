@@ -0,0 +1,50 @@
+from Belief_base import metrics
+from Belief_base.formula import Atom, Not, Or, Implies, Equiv, clear_conversion_caches
+from Belief_base.entailment import resolution_entails
+from Belief_base.belief_base import BeliefBase
+from Agent.agent import BeliefRevisionAgent
+
+def test_metrics_are_off_by_default():
+    metrics.reset()
+    kb = BeliefBase()
+    kb.add(Implies(Atom("p"), Atom("q")))
+    assert not resolution_entails(kb, Atom("q"))
+    assert not metrics.counters and not metrics.timers
+
+def test_revise_reports_to_sinks():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    records = []
+    metrics.reset()
+    clear_conversion_caches()
+    metrics.enable(records.append)
+    try:
+        agent = BeliefRevisionAgent(engine="resolution")
+        agent.expand(Implies(p, q), 2)
+        agent.expand(p, 1)
+        agent.expand(Equiv(q, r), 3)
+        agent.revise(Not(q))
+    finally:
+        metrics.disable()
+    # contract_partial_meet ends first (it runs inside revise), then revise itself
+    assert [record["operation"] for record in records] == ["contract_partial_meet", "revise"]
+    contract, revise = records
+    assert {"contract.vacuity", "contract.remainders", "contract.select", "contract.rebuild"} <= set(contract["timers"])
+    assert {"revise.contract", "revise.expand"} <= set(revise["timers"])
+    assert contract["counters"]["remainders.tested"] > 0
+    assert revise["counters"]["resolution.calls"] > 0
+    # Every check in this small base is settled by unit propagation and pure literals, no pairwise resolution
+    assert revise["counters"]["preprocess.settled"] == revise["counters"]["resolution.calls"]
+    assert "resolution.resolvents" not in revise["counters"]
+    assert metrics.counters["to_cnf.clauses"] > 0
+    text = metrics.prometheus_text()
+    assert "# TYPE belief_agent_resolution_resolvents_total counter" in text
+    assert "belief_agent_revise_seconds_count 1" in text
+    # Off again: nothing more is recorded
+    totals = dict(metrics.counters)
+    agent.revise(Or(p, q))
+    assert dict(metrics.counters) == totals
+    metrics.reset()
+
+if __name__ == "__main__":
+    test_metrics_are_off_by_default()
+    test_revise_reports_to_sinks()
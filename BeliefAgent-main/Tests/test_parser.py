@@ -1,5 +1,71 @@
 import os
-from Belief_base.parser import parse_file
+import pytest
+from Belief_base.parser import parse_formula, parse_file, iter_file, iter_lines, ParseError
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, And, Or, Not, Implies, Equiv
+from Agent.agent import BeliefRevisionAgent
+
+TXT_PATH = os.path.join(os.path.dirname(__file__), "test_parser.txt")
+
+def test_iter_file_matches_parse_file():
+    assert list(iter_file(TXT_PATH)) == parse_file(TXT_PATH)
+
+def test_iter_lines_reports_errors():
+    errors = []
+    items = list(iter_lines(["p ; 1", "", "p ∧", "q ∧ ¬r ; 2"], on_error=errors.append))
+    assert items == [(Atom("p"), 1), (And(Atom("q"), Not(Atom("r"))), 2)]
+    assert [(e.line_number, e.line) for e in errors] == [(3, "p ∧")]
+    # Without a handler the first bad line stops the parse
+    with pytest.raises(ParseError) as info:
+        list(iter_lines(["p", "q ; high"]))
+    assert info.value.line_number == 2
+
+def test_precedence_and_associativity():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    assert parse_formula("p ↔ q → ¬p ∨ q ∧ r") == Equiv(p, Implies(q, Or(Not(p), And(q, r))))
+    assert parse_formula("p → q → r") == Implies(Implies(p, q), r)
+    assert parse_formula("¬¬(p ∨ q) ∧ r") == And(Not(Not(Or(p, q))), r)
+    for bad, message in [("", "Unexpected end"), ("(p ∧ q", "Missing closing"), ("p ∧ )", "Unexpected token"),
+                         ("p q", "Extra tokens"), ("(p q)", "Missing closing")]:
+        with pytest.raises(ValueError, match=message):
+            parse_formula(bad)
+
+# Far beyond the recursion limit, the parser must not recurse per token
+def test_parse_deep_and_long_formulas():
+    assert parse_formula("¬" * 20000 + "p") is not None
+    assert parse_formula("(" * 20000 + "p" + ")" * 20000) == Atom("p")
+    long = parse_formula(" ∨ ".join(f"a{i}" for i in range(20000)))
+    assert isinstance(long, Or) and Atom("a19999") in long.formulas
+
+# Loading a file in one go must give the same base as adding its lines one by one
+def test_add_many_matches_add():
+    one_by_one, bulk = BeliefBase(), BeliefBase()
+    one_by_one.add(Atom("s"), 3)
+    bulk.add(Atom("s"), 3)
+    for formula, priority in parse_file(TXT_PATH) * 2:
+        one_by_one.add(formula, priority)
+    assert bulk.add_many(list(iter_file(TXT_PATH)) * 2) == 10
+    assert bulk.beliefs == one_by_one.beliefs
+    assert bulk.clauses_of() == one_by_one.clauses_of()
+
+# A file that fails partway through still leaves the lines before the error in the base, sorted and with a new
+# version, so an answer cached before the load is not reused
+def test_add_many_keeps_items_before_an_error():
+    agent = BeliefRevisionAgent(cache_size=16)
+    agent.expand(Atom("s"), 1)
+    assert not agent.ask(Atom("p"))
+    version = agent.base.version
+    with pytest.raises(ParseError):
+        agent.base.add_many(iter_lines(["p ; 0", "q ; 2", "p ∧", "r ; 3"]))
+    assert agent.base.version > version
+    assert agent.base.beliefs == [(Atom("q"), 2), (Atom("s"), 1), (Atom("p"), 0)]
+    assert agent.ask(Atom("p")) and not agent.ask(Atom("r"))
+    # The same with a batch boundary before the error
+    kb = BeliefBase()
+    kb.BATCH_SIZE = 2
+    with pytest.raises(ParseError):
+        kb.add_many(iter_lines(["p ; 0", "q ; 2", "r ; 1", "p ∧"]))
+    assert kb.beliefs == [(Atom("q"), 2), (Atom("r"), 1), (Atom("p"), 0)]
 
 if __name__ == "__main__":
     # build path to the .txt in this tests folder
@@ -0,0 +1,59 @@
+import random
+import pytest
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, Or, Implies, Equiv
+from Belief_base.snapshot import save_snapshot, load_snapshot, SnapshotError
+from Belief_base.entailment import get_engine
+from Benchmarks.generators import random_formula
+
+# A loaded snapshot must hold the same beliefs and clauses and give the same answers
+def test_snapshot_round_trip(tmp_path):
+    rng = random.Random(2)
+    atoms = [Atom(name) for name in "pqrs"]
+    for mode in ("distribute", "tseitin"):
+        kb = BeliefBase(cnf_mode=mode)
+        for _ in range(6):
+            kb.add(random_formula(rng, atoms, depth=3), priority=rng.randint(0, 3))
+        path = tmp_path / f"{mode}.bbs"
+        save_snapshot(kb, path)
+        loaded = load_snapshot(path)
+        assert loaded.cnf_mode == mode
+        assert loaded.beliefs == kb.beliefs
+        # Nothing is decoded until it is needed
+        assert len(loaded._clauses) == 0
+        assert loaded.clauses_of() == kb.clauses_of()
+        assert loaded.symbols.names == kb.symbols.names and loaded.symbols.ids == kb.symbols.ids
+        for engine in ("resolution", "cdcl"):
+            for _ in range(10):
+                query = random_formula(rng, atoms)
+                assert get_engine(engine).entails(loaded, query) == get_engine(engine).entails(kb, query)
+
+# The loaded base is an ordinary BeliefBase: beliefs can be added and removed before their clauses were read
+def test_snapshot_base_can_change(tmp_path):
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    kb = BeliefBase()
+    kb.add(Implies(p, q), priority=2)
+    kb.add(Equiv(q, r), priority=1)
+    kb.add(p)
+    save_snapshot(kb, tmp_path / "kb.bbs")
+    loaded = load_snapshot(tmp_path / "kb.bbs")
+    assert get_engine().entails(loaded, r, relevance=True)
+    loaded.remove(p)
+    loaded.add(Not(r), priority=5)
+    assert [belief for belief, _ in loaded.beliefs] == [Not(r), Implies(p, q).to_cnf(), Equiv(q, r).to_cnf()]
+    assert get_engine("cdcl").entails(loaded, Not(q))
+    assert not get_engine("cdcl").entails(loaded, Or(p, q))
+
+def test_snapshot_rejects_other_files(tmp_path):
+    for content in (b"", b"not a snapshot at all, just some text......."):
+        path = tmp_path / "bad.bbs"
+        path.write_bytes(content)
+        with pytest.raises(SnapshotError):
+            load_snapshot(path)
+
+if __name__ == "__main__":
+    import pathlib, tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        test_snapshot_round_trip(pathlib.Path(directory))
+        test_snapshot_base_can_change(pathlib.Path(directory))
+        test_snapshot_rejects_other_files(pathlib.Path(directory))
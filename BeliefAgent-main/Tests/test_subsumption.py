@@ -0,0 +1,84 @@
+import random
+from Belief_base.belief_base import BeliefBase
+from Belief_base.formula import Atom, Not, Or, And, Implies
+from Belief_base.entailment import resolution_refutes, resolution_entails, cnf_int_clauses_for_query
+from Belief_base.subsumption import ClauseIndex, subsumes, remove_subsumed
+from Benchmarks.generators import random_kcnf, random_formula
+
+def test_clause_index():
+    assert subsumes((1,), (1, 2)) and subsumes((1, 2), (1, 2)) and not subsumes((1, 2), (1, -2))
+    # Literals 1 and 65 share a signature bit, the subset test still tells them apart
+    assert not subsumes((65,), (1, 2))
+    index = ClauseIndex([(1, 2, 3), (-1, 2), (2, 4), (1, -3)])
+    assert set(index.subsuming((-1, 2, 5))) == {(-1, 2)}
+    assert list(index.subsuming((3, 4))) == []
+    assert sorted(index.subsumed_by((2,))) == [(-1, 2), (1, 2, 3), (2, 4)]
+    index.remove((2, 4))
+    assert sorted(index.subsumed_by((2,))) == [(-1, 2), (1, 2, 3)]
+    assert len(index) == 3 and (2, 4) not in index
+    # The empty clause subsumes everything
+    index.add(())
+    assert list(index.subsuming((5,))) == [()]
+    assert remove_subsumed([(1, 2), (1,), (2, 3), (1,)]) == [(1,), (2, 3)]
+
+# Subsumption must never change the answer of the resolution loop
+def test_resolution_with_subsumption_agrees():
+    rng = random.Random(22)
+    atoms = [Atom(f"p{i}") for i in range(5)]
+    for _ in range(300):
+        kb = BeliefBase()
+        kb.add_many((clause, 0) for clause in random_kcnf(rng, 5, rng.randint(1, 14), k=rng.randint(1, 3)))
+        clauses = cnf_int_clauses_for_query(kb, random_formula(rng, atoms))
+        expected = resolution_refutes(clauses, preprocess=False, subsumption=False)
+        assert resolution_refutes(clauses, preprocess=False) == expected
+        assert resolution_refutes(clauses) == expected
+
+def test_belief_clauses_are_reduced():
+    p, q = Atom("p"), Atom("q")
+    kb = BeliefBase()
+    kb.add(Or(And(p, q), p))
+    assert kb.clauses_of() == [(kb.symbols.atom("p"),)]
+
+def test_redundant_indexes():
+    p, q, r = Atom("p"), Atom("q"), Atom("r")
+    kb = BeliefBase()
+    kb.add(p, 3)
+    kb.add(Or(p, q), 1)
+    kb.add(Implies(q, q), 0)
+    kb.add(Or(q, r), 2)
+    # Order by priority: p (3), q ∨ r (2), p ∨ q (1), q → q (0)
+    assert kb.redundant_indexes() == [2, 3]
+    # A lower priority belief does not make a higher one redundant
+    kb = BeliefBase()
+    kb.add(Or(p, q), 2)
+    kb.add(p, 1)
+    assert kb.redundant_indexes() == []
+    # Two copies with the same priority: only one of them goes
+    kb = BeliefBase()
+    kb.add(p, 1)
+    kb.add(And(p, p), 1)
+    assert kb.redundant_indexes() == [0]
+
+# Every reported belief follows from the unreported beliefs of higher or equal priority
+def test_redundant_beliefs_are_entailed():
+    rng = random.Random(5)
+    atoms = [Atom(name) for name in "pqr"]
+    for _ in range(100):
+        kb = BeliefBase()
+        for _ in range(rng.randint(1, 6)):
+            kb.add(random_formula(rng, atoms), rng.randint(0, 2))
+        redundant = kb.redundant_indexes()
+        for i in redundant:
+            formula, priority = kb.beliefs[i]
+            support = BeliefBase()
+            for j, (other, other_priority) in enumerate(kb.beliefs):
+                if j not in redundant and other_priority >= priority:
+                    support.add(other, other_priority)
+            assert resolution_entails(support, formula)
+
+if __name__ == "__main__":
+    test_clause_index()
+    test_resolution_with_subsumption_agrees()
+    test_belief_clauses_are_reduced()
+    test_redundant_indexes()
+    test_redundant_beliefs_are_entailed()